@@ -0,0 +1,6 @@
+"""
+Benchmarks and offline load-test tooling for the RAG Agent.
+
+Run modules from the project root, e.g.:
+    python -m benchmarks.bench_hedging
+"""
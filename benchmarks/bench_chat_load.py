@@ -0,0 +1,254 @@
+"""
+End-to-end load test of /api/chat against the local OpenAI stand-in.
+
+Starts the mock OpenAI server in this process, builds a small synthetic
+corpus, launches `uvicorn src.app.main:app` as a subprocess pointed at
+both, then drives concurrent virtual users that each post chat turns and
+read the SSE stream to the end. Reports throughput, time to first token,
+full-response percentiles and error rates by kind.
+
+Each turn uses its own X-Forwarded-For address, so the per-IP chat rate
+limit behaves as it would for many distinct users. The answer cache is
+off unless --cache is given, so every turn reaches the (mock) LLM. The
+server's session and retrieval logs are written to logs/ as usual.
+
+Usage:
+    python -m benchmarks.bench_chat_load --users 20 --duration 30
+    python -m benchmarks.bench_chat_load --users 100 --tokens-per-second 80 --error-rate 0.02 --workers 2
+    python -m benchmarks.bench_chat_load --target http://127.0.0.1:8000 --users 10   # existing server
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.mock_openai import MockConfig, base_url, start_server
+from benchmarks.stats import git_commit, summarize, write_results
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+QUESTIONS = [
+    "What notice must a landlord give before eviction under RCW?",
+    "Seattle zoning setback rules under SMC",
+    "IBC egress width for assembly occupancy",
+    "Does state law preempt the Seattle minimum wage ordinance?",
+    "Department of Ecology stormwater permit requirements",
+    "Tree protection rules in Seattle Director's Rules",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(openai_url: str, db_path: Path, workers: int, cache: bool, api_key: str) -> tuple:
+    """Run the chat server in a subprocess; returns (process, base URL)."""
+    port = _free_port()
+    env = dict(
+        os.environ,
+        OPENAI_BASE_URL=openai_url,
+        OPENAI_API_KEY="sk-mock",
+        VECTOR_DB_PATH=str(db_path),
+        API_ACCESS_KEY=api_key,
+        ANSWER_CACHE_ENABLED="true" if cache else "false",
+        WEB_CONCURRENCY=str(workers),
+        SHARED_STATE_PATH=str(db_path / "state.db"),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.app.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Chat server exited during startup")
+        try:
+            # Wait for warm-up too, or the first turns would pay for it
+            if httpx.get(f"{url}/readyz", timeout=1).status_code == 200:
+                return process, url
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Chat server did not start within 60 s")
+
+
+class Stats:
+    def __init__(self):
+        self.ttft_ms, self.total_ms = [], []
+        self.tokens = 0  # LLM output tokens, from usage events
+        self.completed = 0
+        self.errors = Counter()
+        self.queued_turns = 0
+
+
+async def run_turn(client: httpx.AsyncClient, url: str, headers: dict, payload: dict, stats: Stats) -> None:
+    start = time.perf_counter()
+    first_token = None
+    outcome, queued = None, False
+    try:
+        async with client.stream("POST", f"{url}/api/chat", json=payload, headers=headers) as response:
+            if response.status_code != 200:
+                stats.errors[f"http_{response.status_code}"] += 1
+                await response.aread()
+                return
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                kind = event.get("type")
+                if kind == "token":
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                elif kind == "usage":
+                    stats.tokens += event["data"].get("output_tokens", 0)
+                elif kind == "queue":
+                    queued = True
+                elif kind in ("done", "error"):
+                    outcome = kind
+                    break
+    except httpx.HTTPError as e:
+        stats.errors[type(e).__name__] += 1
+        return
+
+    stats.queued_turns += queued
+    if outcome != "done":
+        stats.errors["sse_error" if outcome == "error" else "incomplete"] += 1
+        return
+    end = time.perf_counter()
+    stats.completed += 1
+    stats.total_ms.append((end - start) * 1000)
+    if first_token is not None:
+        stats.ttft_ms.append((first_token - start) * 1000)
+
+
+async def virtual_user(user: int, url: str, api_key: str, stop_at: float, turns: int, think: float, stats: Stats):
+    async with httpx.AsyncClient(timeout=httpx.Timeout(300, connect=10)) as client:
+        turn = 0
+        while time.monotonic() < stop_at and (not turns or turn < turns):
+            headers = {
+                "x-api-key": api_key,
+                "x-forwarded-for": f"10.{user // 250 % 256}.{user % 250}.{turn % 250 + 1}",
+            }
+            payload = {"message": QUESTIONS[(user + turn) % len(QUESTIONS)], "session_id": f"load-{user}"}
+            await run_turn(client, url, headers, payload, stats)
+            turn += 1
+            if think:
+                await asyncio.sleep(think)
+
+
+async def drive(url: str, api_key: str, users: int, duration: float, turns: int, think: float, ramp: float) -> tuple:
+    stats = Stats()
+    start = time.monotonic()
+    stop_at = start + duration
+
+    async def delayed(user: int):
+        await asyncio.sleep(ramp * user / max(users, 1))
+        await virtual_user(user, url, api_key, stop_at, turns, think, stats)
+
+    await asyncio.gather(*(delayed(u) for u in range(users)))
+    return stats, time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /api/chat with a mock OpenAI backend")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep starting turns")
+    parser.add_argument("--turns", type=int, default=0, help="Max turns per user (0 = until duration)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between a user's turns")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which users start")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--cache", action="store_true", help="Leave the answer cache on")
+    parser.add_argument("--target", help="Base URL of an already running server (skips mock + app)")
+    parser.add_argument("--api-key", default="", help="X-API-Key for --target")
+    parser.add_argument("--scale", type=float, default=0.005, help="Synthetic corpus scale")
+    # Mock OpenAI behaviour
+    parser.add_argument("--base-ms", type=float, default=300.0, help="Mock time to first token / response")
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--answer-tokens", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    args = parser.parse_args()
+
+    process = None
+    if args.target:
+        url = args.target.rstrip("/")
+    else:
+        db_path = Path(tempfile.mkdtemp(prefix="bench-chroma-")).resolve()
+        # Must be set before src.core.config is imported
+        os.environ["VECTOR_DB_PATH"] = str(db_path)
+        os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+        from benchmarks.synthetic import FakeEmbedder, build_corpus
+        from src.core.config import EMBEDDING_DIMENSIONS
+
+        print(f"Building synthetic corpus (scale {args.scale}) ...")
+        build_corpus(db_path, scale=args.scale, dimensions=EMBEDDING_DIMENSIONS)
+        mock = start_server(MockConfig(
+            base_ms=args.base_ms, jitter_ms=args.jitter_ms,
+            tokens_per_second=args.tokens_per_second, answer_tokens=args.answer_tokens,
+            error_rate=args.error_rate, drop_rate=args.drop_rate,
+            dimensions=EMBEDDING_DIMENSIONS, embedder=FakeEmbedder(EMBEDDING_DIMENSIONS),
+        ))
+        process, url = start_app(base_url(mock), db_path, args.workers, args.cache, args.api_key)
+
+    try:
+        print(f"Driving {args.users} users against {url} for {args.duration:.0f}s ...")
+        stats, elapsed = asyncio.run(drive(
+            url, args.api_key, args.users, args.duration, args.turns, args.think_ms / 1000, args.ramp,
+        ))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    attempted = stats.completed + sum(stats.errors.values())
+    results = {
+        "turns_completed": stats.completed,
+        "turns_attempted": attempted,
+        "elapsed_s": round(elapsed, 2),
+        "turns_per_s": round(stats.completed / elapsed, 2) if elapsed else 0.0,
+        "tokens_per_s": round(stats.tokens / elapsed, 1) if elapsed else 0.0,
+        "error_rate": round(sum(stats.errors.values()) / attempted, 4) if attempted else 0.0,
+        "errors": dict(stats.errors),
+        "queued_turns": stats.queued_turns,
+        "ttft": summarize(stats.ttft_ms),
+        "full_response": summarize(stats.total_ms),
+    }
+
+    print(f"\nturns: {stats.completed}/{attempted} in {elapsed:.1f}s  "
+          f"({results['turns_per_s']} turns/s, {results['tokens_per_s']} tokens/s)")
+    print(f"errors: {results['error_rate']:.2%} {dict(stats.errors) or ''}   queued turns: {stats.queued_turns}")
+    print(f"\n{'':<14} | {'p50':>8} | {'p95':>8} | {'p99':>8} | {'max':>8}")
+    print("-" * 58)
+    for label in ("ttft", "full_response"):
+        s = results[label]
+        print(f"{label:<14} | {s['p50_ms']:>8.0f} | {s['p95_ms']:>8.0f} | {s['p99_ms']:>8.0f} | {s['max_ms']:>8.0f}")
+
+    if args.output:
+        write_results(args.output, {
+            "commit": git_commit(),
+            "params": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "results": results,
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Tail-latency benchmark for hedged `embed_query` calls.
+
+Starts the local OpenAI stand-in with a slow tail (e.g. 5% of responses
+take an extra 800 ms), then times sequential `embed_query` calls with
+hedging off and on through the shared HTTP transport.
+
+Usage:
+    python -m benchmarks.bench_hedging
+    python -m benchmarks.bench_hedging --requests 500 --tail-prob 0.05 --tail-ms 800
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.mock_openai import MockConfig, base_url, start_server
+from benchmarks.stats import git_commit, summarize, write_results
+
+
+def run(requests: int, hedge: bool) -> list:
+    from src.core import embedder
+
+    embedder.EMBED_HEDGE_ENABLED = hedge
+    embedder._query_latency = embedder.LatencyTracker()
+    samples = []
+    for i in range(requests):
+        start = time.perf_counter()
+        embedder.embed_query(f"benchmark query {i} {'hedged' if hedge else 'plain'}")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hedged query embeddings")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--base-ms", type=float, default=30.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--tail-prob", type=float, default=0.05)
+    parser.add_argument("--tail-ms", type=float, default=800.0)
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    args = parser.parse_args()
+
+    server = start_server(MockConfig(
+        base_ms=args.base_ms, jitter_ms=args.jitter_ms,
+        tail_prob=args.tail_prob, tail_ms=args.tail_ms,
+    ))
+    # Must be set before src.core.config is imported
+    os.environ["OPENAI_BASE_URL"] = base_url(server)
+    os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+    results = {}
+    for label, hedge in (("plain", False), ("hedged", True)):
+        results[label] = summarize(run(args.requests, hedge))
+
+    print(f"\n{'mode':<8} | {'p50':>8} | {'p95':>8} | {'p99':>8} | {'max':>8}")
+    print("-" * 52)
+    for label, s in results.items():
+        print(f"{label:<8} | {s['p50_ms']:>8.1f} | {s['p95_ms']:>8.1f} | {s['p99_ms']:>8.1f} | {s['max_ms']:>8.1f}")
+
+    if args.output:
+        write_results(args.output, {"commit": git_commit(), "params": vars(args) | {"output": str(args.output)}, "results": results})
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+HNSW recall-vs-latency harness.
+
+For each library, compares ChromaDB's approximate top-k against exact
+brute-force cosine top-k (numpy over every stored vector) for a sample of
+real questions from logs/retrievals.jsonl, and reports recall@k and query
+latency for each search_ef. `--rebuild M:construction_ef` additionally
+copies the vectors into scratch indexes built with other graph parameters.
+The cheapest setting that meets the recall target is suggested for the
+library's "hnsw" entry in LIBRARIES.
+
+search_ef is swept on the live collection and restored afterwards; run it
+against a copy of the database if the server must not see the changes.
+Loading a large library's vectors takes memory: 200k × 3072 floats ≈ 2.5 GB.
+
+Usage:
+    python -m benchmarks.bench_hnsw --libraries smc_chapters --sample 100
+    python -m benchmarks.bench_hnsw --libraries rcw_chapters --search-ef 32 64 128 256 --rebuild 16:100 32:200
+    python -m benchmarks.bench_hnsw --synthetic 0.02      # offline, synthetic corpus + fake embedder
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.stats import git_commit, summarize, write_results
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+RETRIEVAL_LOG = PROJECT_ROOT / "logs" / "retrievals.jsonl"
+
+
+def load_questions(log_path: Path, sample: int, seed: int) -> list:
+    """Distinct logged questions (including rotated .gz archives), sampled."""
+    paths = [log_path] + sorted(log_path.parent.glob(f"{log_path.stem}.*.jsonl.gz"))
+    questions = set()
+    for path in paths:
+        if not path.exists():
+            continue
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    question = json.loads(line).get("question")
+                except json.JSONDecodeError:
+                    continue
+                if question:
+                    questions.add(question.strip())
+    ordered = sorted(questions)
+    random.Random(seed).shuffle(ordered)
+    return ordered[:sample]
+
+
+def load_vectors(collection, page: int = 5000):
+    """All ids and unit-normalized embeddings of a collection."""
+    ids, chunks = [], []
+    for offset in range(0, collection.count(), page):
+        batch = collection.get(include=["embeddings"], limit=page, offset=offset)
+        ids.extend(batch["ids"])
+        chunks.append(np.asarray(batch["embeddings"], dtype=np.float32))
+    matrix = np.vstack(chunks)
+    return ids, matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def exact_top_k(ids: list, matrix: np.ndarray, queries: np.ndarray, k: int) -> list:
+    """Brute-force cosine top-k id sets, one per query."""
+    scores = queries @ matrix.T
+    k = min(k, len(ids))
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [{ids[i] for i in row} for row in top]
+
+
+def measure(collection, queries: np.ndarray, exact: list, k: int) -> dict:
+    recalls, latencies = [], []
+    for query, truth in zip(queries, exact):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=["distances"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(truth & set(result["ids"][0])) / len(truth))
+    row = summarize(latencies)
+    row["recall_mean"] = round(float(np.mean(recalls)), 4)
+    row["recall_min"] = round(float(np.min(recalls)), 4)
+    return row
+
+
+def open_collection(db_path: str, name: str):
+    """
+    Open a collection on a fresh client. ChromaDB keeps a loaded index's
+    search_ef for the life of the client, so every setting needs a reopen.
+    """
+    import chromadb
+    from chromadb.api.client import SharedSystemClient
+
+    SharedSystemClient.clear_system_cache()
+    return chromadb.PersistentClient(path=db_path).get_collection(name)
+
+
+def sweep(db_path: str, name: str, label: str, search_efs: list, queries, exact, k: int) -> list:
+    from src.core.vector_store import set_search_ef
+
+    rows = []
+    for ef in search_efs:
+        collection = open_collection(db_path, name)
+        set_search_ef(collection, ef)
+        measure(collection, queries[: min(5, len(queries))], exact, k)  # warm the index
+        row = {"index": label, "search_ef": ef, **measure(collection, queries, exact, k)}
+        rows.append(row)
+        print(
+            f"  {label:<18} ef={ef:<5} recall@{k}={row['recall_mean']:.4f} "
+            f"(min {row['recall_min']:.2f})  p50={row['p50_ms']:.2f}ms  p95={row['p95_ms']:.2f}ms"
+        )
+    return rows
+
+
+def rebuild(ids: list, matrix: np.ndarray, m: int, construction_ef: int, scratch: Path):
+    """Copy vectors into a scratch collection built with other graph parameters."""
+    import chromadb
+
+    db_path = str(scratch / f"m{m}-ef{construction_ef}")
+    name = f"bench-m{m}-ef{construction_ef}"
+    collection = chromadb.PersistentClient(path=db_path).get_or_create_collection(
+        name=name,
+        metadata={"hnsw:space": "cosine", "hnsw:M": m, "hnsw:construction_ef": construction_ef},
+    )
+    start = time.perf_counter()
+    for i in range(0, len(ids), 5000):
+        collection.add(ids=ids[i : i + 5000], embeddings=matrix[i : i + 5000])
+    return db_path, name, time.perf_counter() - start
+
+
+def recommend(rows: list, target: float):
+    """Fastest (p50) setting whose mean recall meets the target."""
+    passing = [r for r in rows if r["recall_mean"] >= target]
+    return min(passing, key=lambda r: r["p50_ms"]) if passing else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HNSW recall@k vs latency per library")
+    parser.add_argument("--libraries", nargs="+", help="Library keys (default: all)")
+    parser.add_argument("--sample", type=int, default=100, help="Logged questions to sample")
+    parser.add_argument("--k", type=int, default=25, help="k for recall@k (retrieve's per_library_k)")
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[25, 50, 100, 200],
+                        help="Values below k behave like k")
+    parser.add_argument("--rebuild", nargs="*", default=[], metavar="M:CONSTRUCTION_EF")
+    parser.add_argument("--target", type=float, default=0.99, help="Recall target")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log", type=Path, default=RETRIEVAL_LOG)
+    parser.add_argument("--synthetic", type=float, metavar="SCALE", help="Use a synthetic corpus")
+    parser.add_argument("--dimensions", type=int, default=3072, help="Synthetic corpus only")
+    parser.add_argument("--db-path", type=Path, help="Synthetic corpus location")
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        db_path = args.db_path or Path(tempfile.mkdtemp(prefix="bench-chroma-"))
+        # Must be set before src.core.config is imported
+        os.environ["VECTOR_DB_PATH"] = str(db_path.resolve())
+        os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+    from src.core.config import LIBRARIES, LIBRARY_ORDER, VECTOR_DB_PATH
+    from src.core.vector_store import set_search_ef
+
+    libraries = args.libraries or list(LIBRARY_ORDER)
+    if args.synthetic:
+        from benchmarks.bench_retrieval import QUERIES
+        from benchmarks.synthetic import FakeEmbedder, build_corpus
+
+        build_corpus(db_path, scale=args.synthetic, dimensions=args.dimensions, seed=args.seed, libraries=libraries)
+        embed = FakeEmbedder(args.dimensions, seed=args.seed)
+        questions = [f"{q} #{i}" for i in range(args.sample) for q in QUERIES][: args.sample]
+        vectors = [embed(q) for q in questions]
+    else:
+        from src.core.embedder import embed_texts
+
+        questions = load_questions(args.log, args.sample, args.seed)
+        if not questions:
+            sys.exit(f"No questions found in {args.log}")
+        vectors = embed_texts(questions)
+    queries = np.asarray(vectors, dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    print(f"{len(questions)} queries, recall@{args.k}, target {args.target}")
+
+    scratch = Path(tempfile.mkdtemp(prefix="bench-hnsw-"))
+    results = {}
+    for library in libraries:
+        try:
+            collection = open_collection(VECTOR_DB_PATH, library)
+        except Exception:
+            collection = None
+        if collection is None or collection.count() == 0:
+            print(f"\n{library}: missing or empty, skipped")
+            continue
+        ids, matrix = load_vectors(collection)
+        exact = exact_top_k(ids, matrix, queries, args.k)
+        configured = LIBRARIES.get(library, {}).get("hnsw", {})
+        print(f"\n{library} ({len(ids):,} vectors, configured {configured or 'defaults'})")
+
+        live_ef = ((collection.configuration or {}).get("hnsw") or {}).get("ef_search")
+        try:
+            rows = sweep(VECTOR_DB_PATH, library, "live", args.search_ef, queries, exact, args.k)
+        finally:
+            if live_ef is not None:
+                set_search_ef(open_collection(VECTOR_DB_PATH, library), live_ef)
+
+        builds = {}
+        for spec in args.rebuild:
+            m, construction_ef = (int(x) for x in spec.split(":"))
+            copy_path, copy_name, build_s = rebuild(ids, matrix, m, construction_ef, scratch)
+            label = f"M={m},cef={construction_ef}"
+            builds[label] = round(build_s, 1)
+            print(f"  built {label} in {build_s:.1f}s")
+            rows += sweep(copy_path, copy_name, label, args.search_ef, queries, exact, args.k)
+
+        best = recommend(rows, args.target)
+        if best:
+            print(f"  → cheapest meeting {args.target}: {best['index']} search_ef={best['search_ef']}")
+        else:
+            print(f"  → no setting reached recall {args.target}; try larger search_ef / M")
+        results[library] = {"vectors": len(ids), "configured": configured, "build_seconds": builds,
+                            "rows": rows, "recommended": best}
+        del matrix
+
+    if args.output:
+        write_results(args.output, {
+            "commit": git_commit(),
+            "params": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "queries": len(questions),
+            "results": results,
+        })
+
+
+if __name__ == "__main__":
+    main()
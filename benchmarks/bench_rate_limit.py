@@ -0,0 +1,171 @@
+"""
+Per-IP rate limiter benchmark — cost per check and memory at 100k IPs.
+
+Replays a request stream in which most requests come from a large pool of
+distinct client addresses (a crawler rotating X-Forwarded-For) and the rest
+from a few hot addresses that sit at their limit. Compares the old
+sliding-window limiter (a timestamp list per IP, rebuilt on every check)
+with the token-bucket backends in src.core.shared_state:
+
+    sliding  previous in-memory implementation, kept here as the baseline
+    memory   MemoryState token buckets (idle eviction + RATE_LIMIT_MAX_KEYS)
+    sqlite   SQLiteState token buckets in a scratch WAL file
+
+Each backend is timed on its own, then replayed once more under
+tracemalloc to measure the memory its per-IP state holds. A last phase,
+with a short window, sends one request from every address, waits for the
+window to pass and repeats with new addresses: it shows whether state for
+clients that went quiet is ever dropped.
+
+Usage:
+    python -m benchmarks.bench_rate_limit
+    python -m benchmarks.bench_rate_limit --ips 100000 --requests 1000000 --max-keys 50000 --limit 1000
+    python -m benchmarks.bench_rate_limit --backends memory sqlite --sqlite-requests 20000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.stats import git_commit, summarize, write_results
+
+BACKENDS = ("sliding", "memory", "sqlite")
+
+
+class SlidingWindowLimiter:
+    """The pre-token-bucket RateLimiter logic, for comparison."""
+
+    def __init__(self):
+        self._hits = defaultdict(list)
+
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        now = time.time()
+        cutoff = now - window
+        self._hits[key] = [t for t in self._hits[key] if t > cutoff]
+        if len(self._hits[key]) >= limit:
+            return False
+        self._hits[key].append(now)
+        return True
+
+    @property
+    def rate_keys(self) -> int:
+        return len(self._hits)
+
+
+def make_stream(ips: int, requests: int, hot_ips: int, hot_share: float, seed: int, prefix: str = "10") -> list:
+    rng = random.Random(seed)
+    stream = []
+    for _ in range(requests):
+        if rng.random() < hot_share:
+            n = rng.randrange(hot_ips)
+            stream.append(f"rate:chat:192.168.0.{n}")
+        else:
+            n = rng.randrange(ips)
+            stream.append(f"rate:chat:{prefix}.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}")
+    return stream
+
+
+def make_backend(name: str, max_keys: int, scratch: Path):
+    from src.core.shared_state import MemoryState, SQLiteState
+
+    if name == "sliding":
+        return SlidingWindowLimiter()
+    if name == "memory":
+        return MemoryState(max_rate_keys=max_keys)
+    return SQLiteState(str(scratch / "state.db"))  # scratch: a fresh directory per run
+
+
+def tracked_keys(backend) -> int:
+    if hasattr(backend, "rate_keys"):
+        return backend.rate_keys
+    return backend._conn.execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+
+
+def run(backend, stream: list, limit: int, window: float, sample_every: int) -> dict:
+    hit = backend.hit
+    samples, allowed = [], 0
+    start = time.perf_counter()
+    for i, key in enumerate(stream):
+        if i % sample_every:
+            allowed += hit(key, limit, window)
+        else:
+            t = time.perf_counter_ns()
+            allowed += hit(key, limit, window)
+            samples.append((time.perf_counter_ns() - t) / 1e3)
+    elapsed = time.perf_counter() - start
+    row = {"checks_per_s": round(len(stream) / elapsed), "allowed": allowed, "denied": len(stream) - allowed}
+    # summarize() labels its fields _ms; the samples here are microseconds
+    row.update({k.replace("_ms", "_us"): v for k, v in summarize(samples).items() if k != "n"})
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-IP rate limiting at many distinct IPs")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["sliding", "memory"])
+    parser.add_argument("--ips", type=int, default=100_000, help="Distinct client addresses")
+    parser.add_argument("--requests", type=int, default=1_000_000)
+    parser.add_argument("--sqlite-requests", type=int, default=50_000, help="Shorter stream for sqlite")
+    parser.add_argument("--hot-ips", type=int, default=20, help="Addresses sending at their limit")
+    parser.add_argument("--hot-share", type=float, default=0.3, help="Fraction of requests from hot IPs")
+    parser.add_argument("--limit", type=int, default=120, help="Requests per window (the chunk tier)")
+    parser.add_argument("--window", type=float, default=60.0, help="Limiter window in seconds")
+    parser.add_argument("--idle-window", type=float, default=1.0, help="Window for the idle phase")
+    parser.add_argument("--max-keys", type=int, default=100_000, help="MemoryState key cap")
+    parser.add_argument("--sample-every", type=int, default=10, help="Time every Nth check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    args = parser.parse_args()
+
+    scratch = Path(tempfile.mkdtemp(prefix="bench-ratelimit-"))
+    results = {}
+    print(f"{args.ips:,} IPs, {args.hot_ips} hot ({args.hot_share:.0%} of requests), "
+          f"limit {args.limit}/{args.window:g}s, key cap {args.max_keys:,}")
+    print(f"\n{'backend':<8} | {'checks/s':>10} | {'p50 µs':>7} | {'p99 µs':>7} | {'max µs':>8} | "
+          f"{'keys':>8} | {'MB':>6} | {'keys after idle':>15}")
+    print("-" * 94)
+    for name in args.backends:
+        requests = args.sqlite_requests if name == "sqlite" else args.requests
+        stream = make_stream(args.ips, requests, args.hot_ips, args.hot_share, args.seed)
+        backend = make_backend(name, args.max_keys, scratch / f"{name}-timed")
+        row = run(backend, stream, args.limit, args.window, args.sample_every)
+        row["keys"] = tracked_keys(backend)
+        if hasattr(backend, "rate_keys_evicted"):
+            row["evicted_by_cap"] = backend.rate_keys_evicted
+        del backend
+
+        tracemalloc.start()
+        backend = make_backend(name, args.max_keys, scratch / f"{name}-traced")
+        run(backend, stream, args.limit, args.window, len(stream) + 1)
+        row["traced_mb"] = round(tracemalloc.get_traced_memory()[0] / 2**20, 1)
+        tracemalloc.stop()
+        del backend
+
+        # One request per address, a quiet window, then the same from new addresses
+        backend = make_backend(name, args.max_keys, scratch / f"{name}-idle")
+        first = make_stream(args.ips, min(requests, args.ips), 1, 0.0, args.seed + 1, prefix="11")
+        second = make_stream(args.ips, min(requests, args.ips), 1, 0.0, args.seed + 2, prefix="12")
+        run(backend, first, args.limit, args.idle_window, len(first) + 1)
+        time.sleep(args.idle_window * 1.1)
+        run(backend, second, args.limit, args.idle_window, len(second) + 1)
+        row["keys_after_idle"] = tracked_keys(backend)
+        results[name] = row
+        print(f"{name:<8} | {row['checks_per_s']:>10,} | {row['p50_us']:>7.2f} | {row['p99_us']:>7.2f} | "
+              f"{row['max_us']:>8.1f} | {row['keys']:>8,} | {row['traced_mb']:>6.1f} | {row['keys_after_idle']:>15,}")
+
+    if args.output:
+        write_results(args.output, {
+            "commit": git_commit(),
+            "params": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "results": results,
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Retrieval latency benchmark on a synthetic corpus.
+
+Builds (or reuses) scaled copies of every library in a scratch ChromaDB,
+swaps `embed_query` for a deterministic fake embedder and times
+`retrieve()` across routing modes, `top_k` and `per_library_k`:
+
+    auto     keyword routing, as the chat path uses it
+    all      every library (auto_route=False)
+    single   only the largest library (wac_chapters)
+
+Scale 1.0 reproduces the real ~400k-chunk corpus (needs tens of GB of
+disk and a long build); the default 0.05 keeps a run to a few minutes.
+
+Usage:
+    python -m benchmarks.bench_retrieval
+    python -m benchmarks.bench_retrieval --scale 0.2 --iterations 200 --output results/retrieval.json
+    python -m benchmarks.bench_retrieval --compare results/retrieval-main.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.stats import git_commit, summarize, write_results
+
+QUERIES = [
+    "What does RCW say about landlord eviction notice periods?",
+    "WAC requirements for on-site sewage systems",
+    "Seattle zoning setback rules under SMC",
+    "IBC means of egress width for assembly occupancy",
+    "SPU design standard for pump station SCADA",
+    "Director's rule on green factor landscaping",
+    "Governor executive order on clean energy permitting",
+    "Court of appeals ruling on summary judgment in a negligence case",
+    "Minimum wage conflict between Seattle ordinance and state law",
+    "Fire sprinkler requirements in residential code",
+    "Department of Ecology water quality permit conditions",
+    "Tenant relocation assistance in Seattle",
+    "Does state law preempt city rules on rental inspections?",
+    "Seismic design requirements for over-height buildings",
+    "How are stormwater permits enforced?",
+    "What is a small efficiency dwelling unit?",
+    "Child custody and visitation schedules",
+    "Asbestos abatement rules for contractors",
+    "Property tax exemptions for seniors",
+    "Who approves tree removal on private property?",
+]
+
+MODES = ("auto", "all", "single")
+
+
+def _retrieve_kwargs(mode: str) -> dict:
+    if mode == "auto":
+        return {"auto_route": True}
+    if mode == "all":
+        return {"auto_route": False}
+    return {"libraries": ["wac_chapters"]}
+
+
+def run_config(retrieve, mode: str, top_k: int, per_library_k: int, iterations: int, warmup: int) -> dict:
+    kwargs = _retrieve_kwargs(mode)
+    samples, libraries = [], []
+    for i in range(warmup + iterations):
+        query = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        result = retrieve(query, top_k=top_k, per_library_k=per_library_k, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        if i >= warmup:
+            samples.append(elapsed)
+            libraries.append(len(result.libraries_searched))
+    summary = summarize(samples)
+    summary["mean_libraries"] = round(sum(libraries) / len(libraries), 2)
+    return summary
+
+
+def compare(previous: dict, current: dict, threshold: float) -> None:
+    """Print per-config percentile changes against an earlier results file."""
+    print(f"\nCompared with {previous.get('commit', '?')} (flagging > {threshold:.0%} slower)")
+    print(f"{'config':<26} | {'p50':>15} | {'p95':>15} | {'p99':>15}")
+    print("-" * 80)
+    for key, now in current["results"].items():
+        before = previous.get("results", {}).get(key)
+        if before is None:
+            continue
+        cells, regressed = [], False
+        for p in ("p50_ms", "p95_ms", "p99_ms"):
+            change = (now[p] - before[p]) / before[p] if before[p] else 0.0
+            regressed |= change > threshold
+            cells.append(f"{before[p]:>6.1f}→{now[p]:>6.1f}")
+        print(f"{key:<26} | {' | '.join(cells)}{'  ⚠' if regressed else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieve() on a synthetic corpus")
+    parser.add_argument("--scale", type=float, default=0.05, help="Fraction of real library sizes")
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db-path", type=Path, help="Reuse/keep the synthetic ChromaDB here")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--top-k", type=int, nargs="+", default=[12, 24])
+    parser.add_argument("--per-library-k", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    parser.add_argument("--compare", type=Path, help="Earlier JSON results to diff against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Regression flag for --compare")
+    args = parser.parse_args()
+
+    db_path = args.db_path or Path(tempfile.mkdtemp(prefix="bench-chroma-"))
+    # Must be set before src.core.config is imported
+    os.environ["VECTOR_DB_PATH"] = str(db_path.resolve())
+    os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+    from benchmarks.synthetic import FakeEmbedder, build_corpus
+    from src.core import retriever
+
+    print(f"Synthetic corpus (scale {args.scale}, {args.dimensions}-dim) at {db_path}")
+    sizes = build_corpus(db_path, scale=args.scale, dimensions=args.dimensions, seed=args.seed)
+    retriever.embed_query = FakeEmbedder(args.dimensions, seed=args.seed)
+
+    results = {}
+    print(f"\n{'config':<26} | {'libs':>5} | {'p50':>8} | {'p95':>8} | {'p99':>8}")
+    print("-" * 68)
+    for mode in args.modes:
+        for top_k in args.top_k:
+            for per_library_k in args.per_library_k:
+                key = f"{mode}/top{top_k}/per{per_library_k}"
+                s = run_config(retriever.retrieve, mode, top_k, per_library_k, args.iterations, args.warmup)
+                results[key] = s
+                print(
+                    f"{key:<26} | {s['mean_libraries']:>5.1f} | {s['p50_ms']:>8.1f} | "
+                    f"{s['p95_ms']:>8.1f} | {s['p99_ms']:>8.1f}"
+                )
+
+    payload = {
+        "commit": git_commit(),
+        "params": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        "corpus": sizes,
+        "results": results,
+    }
+    if args.compare:
+        compare(json.loads(args.compare.read_text(encoding="utf-8")), payload, args.threshold)
+    if args.output:
+        write_results(args.output, payload)
+
+
+if __name__ == "__main__":
+    main()
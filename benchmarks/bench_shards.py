@@ -0,0 +1,180 @@
+"""
+Sharded retrieval harness with local processes standing in for nodes.
+
+Builds a synthetic library, splits it into N hash partitions
+(scripts/split_shards.py) and starts one retrieval server per partition
+plus one holding the whole library. Then:
+
+  1. healthy   — latency of the sharded scatter-gather vs the single node,
+                 and overlap of the merged top-k with the single node's
+  2. stalled   — one node is SIGSTOPped: searches are bounded by the
+                 per-node timeout until the node is marked down, then
+                 answer from the remaining partitions without waiting
+  3. recovered — the node is resumed and comes back after a probe
+
+Usage:
+    python -m benchmarks.bench_shards
+    python -m benchmarks.bench_shards --library rcw_chapters --scale 0.05 --partitions 3 --timeout 0.5
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.stats import git_commit, summarize, write_results
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def start_node(db_path: Path, address: str) -> subprocess.Popen:
+    env = dict(os.environ, VECTOR_DB_PATH=str(db_path))
+    return subprocess.Popen(
+        [sys.executable, "scripts/run_retrieval_server.py", "--address", address],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(client, process: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Retrieval node {client.address} exited during startup")
+        try:
+            client.ping()
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"Retrieval node {client.address} did not start")
+
+
+def timed_queries(search, queries, k: int):
+    samples, results = [], []
+    for vector in queries:
+        start = time.perf_counter()
+        results.append(search(vector, k)["ids"][0])
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, results
+
+
+def overlap(results, reference) -> float:
+    hits = sum(len(set(a) & set(b)) for a, b in zip(results, reference))
+    return round(hits / max(1, sum(len(b) for b in reference)), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scatter-gather retrieval over local nodes")
+    parser.add_argument("--library", default="wac_chapters")
+    parser.add_argument("--scale", type=float, default=0.02, help="Fraction of the real library size")
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--partitions", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=25)
+    parser.add_argument("--timeout", type=float, default=0.5, help="Per-node request timeout (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db-path", type=Path, help="Reuse/keep the synthetic ChromaDB here")
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench-shards-"))
+    db_path = (args.db_path or work / "full").resolve()
+    # Must be set before src.core.config is imported
+    os.environ["VECTOR_DB_PATH"] = str(db_path)
+    os.environ["RETRIEVAL_SERVICE"] = ""
+    os.environ["RETRIEVAL_SHARDS"] = ""
+
+    from benchmarks.synthetic import FakeEmbedder, build_corpus
+    from src.core.retrieval_service import RetrievalClient
+    from src.core.shard_router import ShardRouter
+
+    print(f"Synthetic {args.library} (scale {args.scale}, {args.dimensions}-dim) at {db_path}")
+    sizes = build_corpus(db_path, scale=args.scale, dimensions=args.dimensions, seed=args.seed, libraries=[args.library])
+    subprocess.run(
+        [sys.executable, "scripts/split_shards.py", "--library", args.library,
+         "--partitions", str(args.partitions), "--out", str(work / "shards")],
+        cwd=PROJECT_ROOT, env=dict(os.environ), check=True,
+    )
+
+    single_address = f"unix:{work / 'single.sock'}"
+    addresses = [f"unix:{work / f'node-{i}.sock'}" for i in range(args.partitions)]
+    nodes = [start_node(work / "shards" / f"node-{i}", a) for i, a in enumerate(addresses)]
+    single = start_node(db_path, single_address)
+    try:
+        for process, address in zip(nodes + [single], addresses + [single_address]):
+            wait_ready(RetrievalClient(address), process)
+
+        embed = FakeEmbedder(args.dimensions, seed=args.seed)
+        queries = [embed(f"shard benchmark query {i}") for i in range(args.queries)]
+        single_router = ShardRouter({args.library: [single_address]}, args.timeout, failure_threshold=2)
+        router = ShardRouter({args.library: addresses}, args.timeout, failure_threshold=2)
+
+        def search_single(vector, k):
+            return single_router.query(args.library, [vector], k)
+
+        def search_sharded(vector, k):
+            return router.query(args.library, [vector], k)
+
+        # Warm both paths (connections, thread pool)
+        timed_queries(search_single, queries[:10], args.k)
+        timed_queries(search_sharded, queries[:10], args.k)
+
+        single_ms, reference = timed_queries(search_single, queries, args.k)
+        sharded_ms, sharded = timed_queries(search_sharded, queries, args.k)
+        phases = {
+            "single_node": {**summarize(single_ms), "overlap": 1.0},
+            "sharded": {**summarize(sharded_ms), "overlap": overlap(sharded, reference)},
+        }
+
+        os.kill(nodes[-1].pid, signal.SIGSTOP)
+        stalled_ms, stalled = timed_queries(search_sharded, queries, args.k)
+        phases["one_node_stalled"] = {
+            **summarize(stalled_ms), "overlap": overlap(stalled, reference),
+            "first_queries_ms": [round(ms, 1) for ms in stalled_ms[:4]],
+            "node_up": router.health[addresses[-1]].up,
+        }
+
+        os.kill(nodes[-1].pid, signal.SIGCONT)
+        deadline = time.monotonic() + 70
+        while not router.health[addresses[-1]].up and time.monotonic() < deadline:
+            search_sharded(queries[0], args.k)
+            time.sleep(0.2)
+        recovered_ms, recovered = timed_queries(search_sharded, queries, args.k)
+        phases["recovered"] = {**summarize(recovered_ms), "overlap": overlap(recovered, reference)}
+    finally:
+        for process in nodes + [single]:
+            try:
+                os.kill(process.pid, signal.SIGCONT)
+            except ProcessLookupError:
+                pass
+            process.terminate()
+            process.wait()
+
+    print(f"\n{args.partitions} partitions of {sizes[args.library]:,} chunks, top-{args.k}, "
+          f"{args.queries} queries, per-node timeout {args.timeout}s")
+    print(f"{'phase':<18} | {'p50':>7} | {'p95':>7} | {'max':>7} | {'overlap':>7}")
+    print("-" * 58)
+    for name, s in phases.items():
+        print(f"{name:<18} | {s['p50_ms']:>7.2f} | {s['p95_ms']:>7.2f} | {s['max_ms']:>7.1f} | {s['overlap']:>7.3f}")
+    print(f"\nStalled node, first queries (ms): {phases['one_node_stalled']['first_queries_ms']}")
+    print("Node health:", {a.split('/')[-1]: h["up"] for a, h in router.node_report().items()})
+
+    if args.output:
+        write_results(args.output, {
+            "commit": git_commit(),
+            "library": args.library,
+            "chunks": sizes[args.library],
+            "partitions": args.partitions,
+            "k": args.k,
+            "timeout_s": args.timeout,
+            "phases": phases,
+        })
+
+
+if __name__ == "__main__":
+    main()
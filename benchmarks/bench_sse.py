@@ -0,0 +1,105 @@
+"""
+SSE framing benchmark — frames, bytes and CPU per answer.
+
+Feeds a synthetic answer of small model deltas (1–3 characters, like real
+GPT streaming) through `sse_stream` at a fixed token rate, writing every
+frame to a local socket as the ASGI server would, and compares per-token
+framing with time-window coalescing. CPU is reported net of the cost of
+generating the synthetic stream itself.
+
+Usage:
+    python -m benchmarks.bench_sse
+    python -m benchmarks.bench_sse --tokens 8000 --rate 400 --windows 0 25 50
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.stats import git_commit, write_results
+from src.app.sse import sse_stream
+
+
+def make_deltas(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz     .,\n"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 3))) for _ in range(n)]
+
+
+async def fake_chat(deltas: list, rate: float):
+    """Emit deltas at roughly `rate` tokens/s, the way the LLM stream does."""
+    yield {"type": "sources", "data": []}
+    burst = max(1, int(rate / 200))  # sleep every ~5 ms
+    for i, delta in enumerate(deltas):
+        yield {"type": "token", "data": delta}
+        if i % burst == burst - 1:
+            await asyncio.sleep(burst / rate)
+    yield {"type": "usage", "data": {"input_tokens": 0, "output_tokens": len(deltas)}}
+    yield {"type": "done"}
+
+
+def _drain(sock: socket.socket) -> None:
+    while sock.recv(65536):
+        pass
+
+
+async def measure(deltas: list, rate: float, window_ms: float, max_bytes: int) -> dict:
+    writer, reader = socket.socketpair()
+    threading.Thread(target=_drain, args=(reader,), daemon=True).start()
+
+    # Baseline: CPU spent producing the synthetic stream with no framing
+    cpu_start = time.process_time()
+    async for _ in fake_chat(deltas, rate):
+        pass
+    baseline_cpu = time.process_time() - cpu_start
+
+    frames = 0
+    sent = 0
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    async for frame in sse_stream(fake_chat(deltas, rate), window_ms, max_bytes):
+        data = frame.encode("utf-8")
+        writer.sendall(data)
+        frames += 1
+        sent += len(data)
+    cpu = time.process_time() - cpu_start
+    writer.close()
+    return {
+        "window_ms": window_ms,
+        "frames": frames,
+        "bytes": sent,
+        "framing_cpu_ms": round(max(0.0, cpu - baseline_cpu) * 1000, 1),
+        "wall_ms": round((time.perf_counter() - wall_start) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SSE token coalescing")
+    parser.add_argument("--tokens", type=int, default=6000, help="Deltas per answer")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Deltas per second")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 25, 50])
+    parser.add_argument("--max-bytes", type=int, default=1024)
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    args = parser.parse_args()
+
+    deltas = make_deltas(args.tokens)
+    results = [asyncio.run(measure(deltas, args.rate, w, args.max_bytes)) for w in args.windows]
+
+    print(f"\n{'window':>8} | {'frames':>7} | {'bytes':>9} | {'framing cpu ms':>14} | {'wall ms':>8}")
+    print("-" * 58)
+    for r in results:
+        print(f"{r['window_ms']:>6.0f}ms | {r['frames']:>7} | {r['bytes']:>9} | {r['framing_cpu_ms']:>14.1f} | {r['wall_ms']:>8.1f}")
+
+    if args.output:
+        write_results(args.output, {"commit": git_commit(), "tokens": args.tokens, "rate": args.rate, "results": results})
+
+
+if __name__ == "__main__":
+    main()
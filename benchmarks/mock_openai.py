@@ -0,0 +1,394 @@
+"""
+Local OpenAI stand-in for benchmarks — no API key, no spend.
+
+Serves `POST /v1/embeddings` with deterministic fake vectors and
+`POST /v1/chat/completions`, both plain (the query classifier, which splits
+comparison questions into sub-queries) and streamed (the answer) as the real SSE chunk format with usage. Latency is
+injectable: a base delay plus jitter before the response (or first token),
+an occasional slow "tail" response, a paced token rate, and error
+injection — HTTP 429/500 responses and streams cut off mid-answer.
+
+For batch ingest (src/core/batch_ingest.py) it also serves the Files and
+Batches endpoints: uploaded JSONL jobs of `/v1/embeddings` requests
+complete after `batch_seconds`, with `batch_error_rate` of the requests
+failing into the error file.
+
+Usage:
+    python -m benchmarks.mock_openai --port 8900 --tail-prob 0.05 --tail-ms 800
+    python -m benchmarks.mock_openai --tokens-per-second 60 --error-rate 0.02 --drop-rate 0.01
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 python scripts/run_chat.py
+"""
+
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import random
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import parse_qsl
+
+
+@dataclass
+class MockConfig:
+    """Latency profile of the stand-in server."""
+    base_ms: float = 30.0
+    jitter_ms: float = 10.0
+    tail_prob: float = 0.0
+    tail_ms: float = 500.0
+    dimensions: int = 3072
+    tokens_per_second: float = 50.0    # streamed answer pace
+    answer_tokens: int = 200           # streamed answer length
+    error_rate: float = 0.0            # share of requests answered 429 / 500
+    drop_rate: float = 0.0             # share of streams cut off mid-answer
+    embedder: Optional[Callable[[str], list]] = None  # overrides fake_embedding
+    batch_seconds: float = 2.0         # time for a batch job to complete
+    batch_error_rate: float = 0.0      # share of batch requests that fail
+    batch_fails: Optional[Callable[[dict], bool]] = None  # picks failing requests; overrides batch_error_rate
+
+    def sample_delay(self) -> float:
+        delay = self.base_ms + random.uniform(0, self.jitter_ms)
+        if random.random() < self.tail_prob:
+            delay += self.tail_ms
+        return delay / 1000
+
+
+_ANSWER_WORDS = (
+    "Under the cited section the applicant must file a permit application with the "
+    "department before work begins and the director may waive the requirement when "
+    "the work is minor [Source 1]. The state statute sets the minimum standard while "
+    "the city code may impose stricter conditions [Source 2]."
+).split()
+
+
+def fake_answer_tokens(n: int) -> list:
+    """Streamed deltas of a plausible answer, one word (plus space) each."""
+    return [_ANSWER_WORDS[i % len(_ANSWER_WORDS)] + " " for i in range(n)]
+
+
+def fake_embedding(text: str, dimensions: int) -> list:
+    """Deterministic unit-ish vector derived from the text hash."""
+    seed = struct.unpack("<Q", hashlib.sha256(text.encode("utf-8")).digest()[:8])[0]
+    rng = random.Random(seed)
+    vec = [rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = sum(v * v for v in vec) ** 0.5 or 1.0
+    return [v / norm for v in vec]
+
+
+def embedding_response(body: dict, embed: Callable[[str], list]) -> dict:
+    """Body of a /v1/embeddings response, float lists or base64 float32."""
+    inputs = body.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+
+    def encode(vector: list):
+        if body.get("encoding_format") == "base64":
+            return base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+        return vector
+
+    return {
+        "object": "list",
+        "model": body.get("model", "mock"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": encode(embed(text))}
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": sum(len(t.split()) for t in inputs), "total_tokens": 0},
+    }
+
+
+class BatchStore:
+    """In-memory files and batch jobs; a job completes `batch_seconds` after creation."""
+
+    def __init__(self):
+        self.files = {}    # id -> (filename, bytes)
+        self.batches = {}  # id -> batch object
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add_file(self, filename: str, content: bytes, purpose: str) -> dict:
+        with self._lock:
+            file_id = f"file-mock{next(self._ids)}"
+            self.files[file_id] = (filename, content)
+        return {
+            "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed",
+        }
+
+    def create_batch(self, body: dict) -> dict:
+        with self._lock:
+            batch_id = f"batch_mock{next(self._ids)}"
+            batch = {
+                "id": batch_id, "object": "batch", "endpoint": body["endpoint"],
+                "input_file_id": body["input_file_id"], "completion_window": body["completion_window"],
+                "status": "validating", "created_at": int(time.time()), "metadata": body.get("metadata"),
+                "output_file_id": None, "error_file_id": None, "errors": None,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            }
+            self.batches[batch_id] = batch
+        return batch
+
+    def refresh(self, batch: dict, config: MockConfig) -> dict:
+        """Advance a job by wall-clock time; runs its requests on completion."""
+        with self._lock:
+            age = time.time() - batch["created_at"]
+            if batch["status"] in ("validating", "in_progress") and age >= config.batch_seconds:
+                self._complete(batch, config)
+            elif batch["status"] == "validating" and age >= config.batch_seconds / 4:
+                batch["status"] = "in_progress"
+        return batch
+
+    def _complete(self, batch: dict, config: MockConfig) -> None:
+        dims = config.dimensions
+        embed = config.embedder or (lambda text: fake_embedding(text, dims))
+        output, errors = [], []
+        for n, line in enumerate(self.files[batch["input_file_id"]][1].decode("utf-8").splitlines()):
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            row = {"id": f"batch_req_{n}", "custom_id": request["custom_id"], "error": None}
+            fails = config.batch_fails(request) if config.batch_fails else random.random() < config.batch_error_rate
+            if fails:
+                row["response"] = {"status_code": 500, "body": {"error": {"message": "Injected failure"}}}
+                errors.append(row)
+            else:
+                row["response"] = {"status_code": 200, "body": embedding_response(request["body"], embed)}
+                output.append(row)
+        for key, rows in (("output_file_id", output), ("error_file_id", errors)):
+            if rows:
+                file_id = f"file-mock{next(self._ids)}"
+                self.files[file_id] = (f"{batch['id']}_{key}.jsonl", "".join(json.dumps(r) + "\n" for r in rows).encode())
+                batch[key] = file_id
+        batch["status"] = "completed"
+        batch["request_counts"] = {"total": len(output) + len(errors), "completed": len(output), "failed": len(errors)}
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    config = MockConfig()
+    store = BatchStore()
+
+    def log_message(self, format, *args):  # keep benchmark output clean
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("content-length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        path = path.rstrip("/")
+        parts = path.split("/")
+        if path.endswith("/batches"):
+            # Newest first, paged with `limit` and `after` like the real API
+            params = dict(parse_qsl(query))
+            batches = [self.store.refresh(b, self.config) for b in self.store.batches.values()][::-1]
+            ids = [b["id"] for b in batches]
+            start = ids.index(params["after"]) + 1 if params.get("after") in ids else 0
+            limit = int(params.get("limit", 20))
+            self._send_json(200, {
+                "object": "list", "data": batches[start:start + limit], "has_more": start + limit < len(batches),
+            })
+        elif parts[-2] == "batches" and parts[-1] in self.store.batches:
+            self._send_json(200, self.store.refresh(self.store.batches[parts[-1]], self.config))
+        elif parts[-1] == "content" and parts[-2] in self.store.files:
+            content = self.store.files[parts[-2]][1]
+            self.send_response(200)
+            self.send_header("content-type", "application/octet-stream")
+            self.send_header("content-length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _upload(self) -> None:
+        """multipart/form-data upload of a batch input file."""
+        length = int(self.headers.get("content-length", 0))
+        header = f"Content-Type: {self.headers['content-type']}\r\n\r\n".encode()
+        form = BytesParser(policy=HTTP).parsebytes(header + self.rfile.read(length))
+        fields = {part.get_param("name", header="content-disposition"): part for part in form.iter_parts()}
+        upload = fields["file"]
+        self._send_json(200, self.store.add_file(
+            upload.get_filename() or "upload.jsonl",
+            upload.get_payload(decode=True),
+            fields["purpose"].get_content().strip(),
+        ))
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        if path.endswith("/files"):
+            if not self._inject_error():
+                self._upload()
+            return
+        body = self._read_json()
+        if self._inject_error():
+            return
+        if path.endswith("/batches"):
+            self._send_json(200, self.store.create_batch(body))
+        elif path.endswith("/embeddings"):
+            self._embeddings(body)
+        elif path.endswith("/chat/completions"):
+            if body.get("stream"):
+                self._chat_stream(body)
+            else:
+                self._chat(body)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _inject_error(self) -> bool:
+        if random.random() >= self.config.error_rate:
+            return False
+        status = random.choice((429, 500))
+        self._send_json(status, {"error": {"message": "Injected failure", "type": "mock_error"}})
+        return True
+
+    def _embeddings(self, body: dict) -> None:
+        time.sleep(self.config.sample_delay())
+        dims = body.get("dimensions") or self.config.dimensions
+        embed = self.config.embedder or (lambda text: fake_embedding(text, dims))
+        self._send_json(200, embedding_response(body, embed))
+
+    @staticmethod
+    def _prompt_tokens(body: dict) -> int:
+        return sum(len(str(m.get("content", ""))) // 4 for m in body.get("messages", []))
+
+    @staticmethod
+    def _classify(body: dict) -> str:
+        """SIMPLE, or COMPLEX with two sub-queries for comparison questions."""
+        question = str(body.get("messages", [{}])[-1].get("content", ""))
+        if not any(word in question.lower() for word in ("conflict", "differ", "compare", " vs ")):
+            return "SIMPLE"
+        return f"COMPLEX\n1. What the city code says: {question}\n2. What state law says: {question}"
+
+    def _chat(self, body: dict) -> None:
+        """Non-streamed completion; the query classifier is the only caller."""
+        time.sleep(self.config.sample_delay())
+        self._send_json(200, {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self._classify(body)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": self._prompt_tokens(body), "completion_tokens": 1, "total_tokens": 0},
+        })
+
+    def _write_chunk(self, payload) -> None:
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        frame = f"data: {data}\n\n".encode("utf-8")
+        # Chunked transfer encoding keeps the connection reusable
+        self.wfile.write(f"{len(frame):x}\r\n".encode() + frame + b"\r\n")
+        self.wfile.flush()
+
+    def _chat_stream(self, body: dict) -> None:
+        """Streamed completion in the chat.completion.chunk SSE format."""
+        config = self.config
+        time.sleep(config.sample_delay())  # time to first token
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+
+        def chunk(delta: dict, finish_reason=None) -> dict:
+            return {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        tokens = fake_answer_tokens(config.answer_tokens)
+        drop_at = random.randrange(len(tokens)) if random.random() < config.drop_rate else None
+        interval = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        try:
+            self._write_chunk(chunk({"role": "assistant", "content": ""}))
+            for i, token in enumerate(tokens):
+                if i == drop_at:
+                    self.close_connection = True  # abort without the terminating chunk
+                    return
+                if interval:
+                    time.sleep(interval)
+                self._write_chunk(chunk({"content": token}))
+            self._write_chunk(chunk({}, "stop"))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = chunk({})
+                usage["choices"] = []
+                usage["usage"] = {
+                    "prompt_tokens": self._prompt_tokens(body),
+                    "completion_tokens": len(tokens),
+                    "total_tokens": self._prompt_tokens(body) + len(tokens),
+                }
+                self._write_chunk(usage)
+            self._write_chunk("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # client closed the stream early
+
+
+def start_server(config: MockConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the mock in a daemon thread; returns the server (see .server_address)."""
+    handler = type("ConfiguredHandler", (MockOpenAIHandler,), {"config": config, "store": BatchStore()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def base_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenAI stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--base-ms", type=float, default=30.0, help="Base response latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Uniform extra latency")
+    parser.add_argument("--tail-prob", type=float, default=0.0, help="Probability of a slow response")
+    parser.add_argument("--tail-ms", type=float, default=500.0, help="Extra latency of a slow response")
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Streamed answer pace")
+    parser.add_argument("--answer-tokens", type=int, default=200, help="Streamed answer length")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 429/500 responses")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Share of streams cut mid-answer")
+    parser.add_argument("--batch-seconds", type=float, default=2.0, help="Time for a batch job to complete")
+    parser.add_argument("--batch-error-rate", type=float, default=0.0, help="Share of batch requests that fail")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        base_ms=args.base_ms, jitter_ms=args.jitter_ms,
+        tail_prob=args.tail_prob, tail_ms=args.tail_ms, dimensions=args.dimensions,
+        tokens_per_second=args.tokens_per_second, answer_tokens=args.answer_tokens,
+        error_rate=args.error_rate, drop_rate=args.drop_rate,
+        batch_seconds=args.batch_seconds, batch_error_rate=args.batch_error_rate,
+    )
+    server = start_server(config, args.host, args.port)
+    print(f"Mock OpenAI listening at {base_url(server)}  (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Small helpers shared by the benchmark scripts.
+"""
+
+import json
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Nearest-rank percentile (p in 0–100) of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """p50 / p95 / p99 / mean / max of latency samples in milliseconds."""
+    return {
+        "n": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 2),
+        "p95_ms": round(percentile(samples_ms, 95), 2),
+        "p99_ms": round(percentile(samples_ms, 99), 2),
+        "mean_ms": round(statistics.fmean(samples_ms), 2) if samples_ms else 0.0,
+        "max_ms": round(max(samples_ms), 2) if samples_ms else 0.0,
+    }
+
+
+def git_commit() -> str:
+    """Short hash of HEAD, or 'unknown' outside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def write_results(path: Path, payload: Dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    print(f"Results written to {path}")
@@ -0,0 +1,137 @@
+"""
+Synthetic corpus and deterministic fake embedder for retrieval benchmarks.
+
+Collections mirror the real libraries' chunk counts (scaled by `scale`) and
+are filled with clustered unit vectors: every library draws its chunks
+around a shared set of topic centroids, so HNSW graphs and score
+distributions look like a real corpus rather than uniform noise. The fake
+embedder maps any text to a point near one of the same centroids, so
+queries land in populated regions without calling OpenAI.
+
+The corpus is built through src.core.vector_store, so point VECTOR_DB_PATH
+at a scratch directory *before* importing anything from src.
+"""
+
+import hashlib
+import json
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Chunk counts per library at scale 1.0 (see README "Document Libraries")
+LIBRARY_SIZES = {
+    "wa_governor_orders": 146,
+    "ibc_wa_docs": 3_120,
+    "spu_design_standards": 3_962,
+    "seattle_dir_rules": 5_606,
+    "washington_court_opinions": 16_281,
+    "smc_chapters": 22_288,
+    "rcw_chapters": 147_316,
+    "wac_chapters": 200_661,
+}
+
+DEFAULT_TOPICS = 256
+_BATCH = 5000
+_MANIFEST = "synthetic_corpus.json"
+
+
+def _seed_of(text: str) -> int:
+    return struct.unpack("<Q", hashlib.sha256(text.encode("utf-8")).digest()[:8])[0]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def topic_centroids(dimensions: int, topics: int = DEFAULT_TOPICS, seed: int = 0) -> np.ndarray:
+    """Unit-length topic centers shared by the corpus and the fake embedder."""
+    rng = np.random.default_rng(seed)
+    return _normalize(rng.standard_normal((topics, dimensions), dtype=np.float32))
+
+
+class FakeEmbedder:
+    """Deterministic stand-in for `embed_query`: same text, same vector."""
+
+    def __init__(self, dimensions: int, topics: int = DEFAULT_TOPICS, seed: int = 0, noise: float = 0.8):
+        self.centroids = topic_centroids(dimensions, topics, seed)
+        self.noise = noise
+
+    def __call__(self, text: str) -> List[float]:
+        rng = np.random.default_rng(_seed_of(text))
+        center = self.centroids[rng.integers(len(self.centroids))]
+        vec = center + self.noise * rng.standard_normal(center.shape, dtype=np.float32) / np.sqrt(center.size)
+        return _normalize(vec).tolist()
+
+
+def scaled_sizes(scale: float) -> Dict[str, int]:
+    """Chunk count per library at a given scale (at least 50 each)."""
+    return {lib: max(50, int(n * scale)) for lib, n in LIBRARY_SIZES.items()}
+
+
+def _synthetic_batch(rng, centroids: np.ndarray, library: str, start: int, count: int, noise: float):
+    # Each library favours its own slice of topics, with some overlap
+    topics_per_lib = max(8, len(centroids) // 4)
+    offset = _seed_of(library) % len(centroids)
+    topic_ids = (offset + rng.integers(topics_per_lib, size=count)) % len(centroids)
+    dims = centroids.shape[1]
+    vectors = centroids[topic_ids] + noise * rng.standard_normal((count, dims), dtype=np.float32) / np.sqrt(dims)
+    vectors = _normalize(vectors)
+
+    ids, documents, metadatas = [], [], []
+    for i, topic in zip(range(start, start + count), topic_ids):
+        source_file = f"{library}_{i // 40:05d}.pdf"
+        ids.append(f"{library}-{i:07d}")
+        documents.append(f"Synthetic {library} chunk {i} on topic {topic}. " * 8)
+        metadatas.append({
+            "library": library,
+            "source_file": source_file,
+            "page_number": (i % 40) // 2 + 1,
+            "chunk_index": i % 40,
+            "title": source_file[:-4],
+        })
+    return ids, vectors, documents, metadatas
+
+
+def build_corpus(
+    db_path: Path,
+    scale: float = 0.05,
+    dimensions: int = 3072,
+    seed: int = 0,
+    noise: float = 0.8,
+    libraries: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    """
+    Fill the ChromaDB at `db_path` with synthetic collections.
+
+    Skips the build when a manifest with identical parameters exists, so
+    repeated benchmark runs reuse the corpus. Returns chunk counts.
+    """
+    from src.core.vector_store import add_chunks, collection_stats_local as collection_stats
+
+    sizes = scaled_sizes(scale)
+    if libraries:
+        sizes = {lib: n for lib, n in sizes.items() if lib in libraries}
+    params = {"scale": scale, "dimensions": dimensions, "seed": seed, "noise": noise, "sizes": sizes}
+
+    manifest = Path(db_path) / _MANIFEST
+    if manifest.exists() and json.loads(manifest.read_text()) == params:
+        print(f"Reusing synthetic corpus at {db_path}")
+        return sizes
+
+    centroids = topic_centroids(dimensions, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    for library, total in sizes.items():
+        if collection_stats(library)["count"] >= total:
+            continue
+        start_time = time.perf_counter()
+        for start in range(0, total, _BATCH):
+            count = min(_BATCH, total - start)
+            ids, vectors, documents, metadatas = _synthetic_batch(rng, centroids, library, start, count, noise)
+            add_chunks(library, ids, vectors, documents, metadatas)
+        print(f"  {library:<28} {total:>8,} chunks in {time.perf_counter() - start_time:6.1f}s")
+
+    manifest.write_text(json.dumps(params, indent=2), encoding="utf-8")
+    return sizes
@@ -1,4 +1,5 @@
 
+import argparse
 import sys
 import os
 from pathlib import Path
@@ -8,6 +9,7 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.append(str(PROJECT_ROOT))
 
 from src.core.retriever import retrieve
+from src.core.profiling import profile_path, profiled
 
 def debug_query(query: str, top_k: int = 20):
     print(f"\n Query: {query}")
@@ -29,11 +31,26 @@ def debug_query(query: str, top_k: int = 20):
         print(f"Error: {e}")
 
 if __name__ == "__main__":
-    queries = [
+    parser = argparse.ArgumentParser(description="Print retrieval results for test queries")
+    parser.add_argument("queries", nargs="*", help="Queries to run (default: built-in examples)")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Sample each query with the profiler and save reports to logs/profiles/",
+    )
+    args = parser.parse_args()
+
+    queries = args.queries or [
         "Does Seattle's minimum wage ordinance conflict with state RCW?",
         "Conflict between IBC egress width and ADA requirements?",
         "What are the requirements for ADUs in Seattle under SMC?"
     ]
     
     for q in queries:
-        debug_query(q)
+        if args.profile:
+            path_stem = profile_path("debug-retrieval")
+            with profiled(path_stem):
+                debug_query(q, args.top_k)
+            print(f"📈 Profile: {path_stem}.txt / .folded")
+        else:
+            debug_query(q, args.top_k)
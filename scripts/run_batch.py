@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Answer a file of questions offline.
+
+Reads questions from JSONL (one object per line) or CSV (header row), with a
+`question` field and optional `id`, `top_k`, `system_prompt` and
+`temperature`. Every question runs through the same pipeline as the chat
+UI (`chat_stream`), several at a time, and each answer is appended to the
+output JSONL with its sources, token usage and per-stage timings as soon as
+it finishes.
+
+All query embeddings are fetched up front in batched API calls, and
+retrieval results are cached in-process, so repeated questions cost one
+search. Re-running with the same output file skips questions that already
+have an answer (errors are retried); questions without an `id` are keyed by
+a hash of their text.
+
+Usage:
+    python scripts/run_batch.py questions.jsonl --output results/answers.jsonl
+    python scripts/run_batch.py questions.csv -o answers.jsonl --concurrency 8 --top-k 12
+    python scripts/run_batch.py questions.jsonl -o answers.jsonl --limit 20 --report results/batch_report.json
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def read_questions(path: Path) -> list:
+    """[{id, question, ...}] from a .jsonl or .csv file."""
+    with path.open(encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    questions = []
+    for n, row in enumerate(rows, 1):
+        question = (row.get("question") or "").strip()
+        if not question:
+            raise ValueError(f"{path}: row {n} has no 'question'")
+        item = {"id": str(row.get("id") or "").strip() or hashlib.sha256(question.encode("utf-8")).hexdigest()[:12],
+                "question": question}
+        for key, cast in (("top_k", int), ("temperature", float), ("system_prompt", str)):
+            if row.get(key) not in (None, ""):
+                item[key] = cast(row[key])
+        questions.append(item)
+    return questions
+
+
+def completed_ids(path: Path) -> set:
+    """Ids already answered without error in an earlier run."""
+    done = set()
+    if path.exists():
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by an interrupted run
+                if not record.get("error"):
+                    done.add(record["id"])
+    return done
+
+
+def answer(item: dict, chat_stream, args) -> dict:
+    """Run one question through chat_stream and collect its events."""
+    start = time.perf_counter()
+    tokens, sources, usage, timings, error = [], [], {}, {}, None
+    temperature = item.get("temperature", args.temperature)
+    for event in chat_stream(
+        item["question"],
+        [],
+        system_prompt=item.get("system_prompt"),
+        top_k=item.get("top_k", args.top_k),
+        temperature=temperature,
+        use_cache=not args.no_answer_cache,
+    ):
+        kind = event["type"]
+        if kind == "token":
+            tokens.append(event["data"])
+        elif kind == "sources":
+            sources = event["data"]
+        elif kind == "usage":
+            usage = event["data"]
+        elif kind == "timing":
+            timings = event["data"]
+        elif kind == "error":
+            error = event["data"]
+    return {
+        "id": item["id"],
+        "question": item["question"],
+        "answer": "".join(tokens),
+        "sources": sources,
+        "usage": usage,
+        "timings": timings,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "cached": bool(usage.get("cached")),
+        "error": error,
+    }
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def throughput_report(records: list, wall_s: float) -> dict:
+    ok = [r for r in records if not r["error"]]
+    input_tokens = sum(r["usage"].get("input_tokens", 0) for r in ok)
+    output_tokens = sum(r["usage"].get("output_tokens", 0) for r in ok)
+    elapsed = [r["elapsed_ms"] for r in ok]
+    ttft = [r["timings"]["llm_ttft"] for r in ok if "llm_ttft" in r["timings"]]
+    return {
+        "questions": len(records),
+        "answered": len(ok),
+        "errors": len(records) - len(ok),
+        "cached": sum(r["cached"] for r in ok),
+        "wall_s": round(wall_s, 2),
+        "questions_per_min": round(len(ok) / wall_s * 60, 2) if wall_s else 0.0,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "output_tokens_per_s": round(output_tokens / wall_s, 1) if wall_s else 0.0,
+        "elapsed_p50_ms": percentile(elapsed, 50),
+        "elapsed_p95_ms": percentile(elapsed, 95),
+        "llm_ttft_p50_ms": percentile(ttft, 50),
+        "llm_ttft_p95_ms": percentile(ttft, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL/CSV file of questions")
+    parser.add_argument("input", type=Path, help="Questions (.jsonl or .csv)")
+    parser.add_argument("--output", "-o", type=Path, required=True, help="Answers JSONL (appended; enables resume)")
+    parser.add_argument("--concurrency", "-c", type=int, default=4, help="Questions in flight")
+    parser.add_argument("--top-k", "-k", type=int, help="Chunks per answer (default: classify each question)")
+    parser.add_argument("--temperature", type=float, help="Default LLM temperature")
+    parser.add_argument("--limit", type=int, help="Answer at most this many pending questions")
+    parser.add_argument("--retrieval-cache", type=int, default=4096, help="Cached retrieve() results (0 = off)")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Always call the LLM")
+    parser.add_argument("--report", type=Path, help="Write the throughput report as JSON here")
+    args = parser.parse_args()
+
+    questions = read_questions(args.input)
+    done = completed_ids(args.output)
+    pending = list({q["id"]: q for q in questions if q["id"] not in done}.values())
+    if args.limit is not None:
+        pending = pending[:args.limit]
+    print(f"{len(questions)} questions, {len(questions) - len(pending)} already answered or skipped, "
+          f"{len(pending)} to run")
+    if not pending:
+        return
+
+    # Cache sizes are read when src.core is imported
+    os.environ["QUERY_EMBED_CACHE_SIZE"] = str(max(len(pending), int(os.environ.get("QUERY_EMBED_CACHE_SIZE", "1024"))))
+    os.environ["RETRIEVAL_CACHE_SIZE"] = str(args.retrieval_cache)
+
+    from src.core.embedder import embed_queries
+    from src.core.rag_chain import chat_stream
+
+    start = time.perf_counter()
+    embed_queries([q["question"] for q in pending])
+    print(f"Embedded {len(pending)} questions in {time.perf_counter() - start:.1f}s")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    write_lock = threading.Lock()
+    records = []
+    with args.output.open("a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = {pool.submit(answer, item, chat_stream, args): item for item in pending}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {"id": item["id"], "question": item["question"], "answer": "", "sources": [],
+                          "usage": {}, "timings": {}, "elapsed_ms": 0.0, "cached": False, "error": str(e)}
+            with write_lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                records.append(record)
+            status = f"ERROR {record['error']}" if record["error"] else f"{record['elapsed_ms'] / 1000:.1f}s"
+            print(f"  [{len(records)}/{len(pending)}] {record['id']}: {status}")
+
+    report = throughput_report(records, time.perf_counter() - start)
+    print(f"\n{report['answered']}/{report['questions']} answered ({report['errors']} errors, "
+          f"{report['cached']} from the answer cache) in {report['wall_s']:.1f}s — "
+          f"{report['questions_per_min']:.1f} questions/min")
+    print(f"Tokens: {report['input_tokens']:,} in, {report['output_tokens']:,} out "
+          f"({report['output_tokens_per_s']:.0f} out/s)")
+    print(f"Per question p50/p95: {report['elapsed_p50_ms'] / 1000:.1f}s / {report['elapsed_p95_ms'] / 1000:.1f}s, "
+          f"LLM first token {report['llm_ttft_p50_ms']:.0f} / {report['llm_ttft_p95_ms']:.0f} ms")
+
+    if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,11 @@ Start the RAG Agent chat server.
 Usage:
     python scripts/run_chat.py              # default port 8000
     python scripts/run_chat.py --port 9000  # custom port
+    python scripts/run_chat.py --workers 4  # one process per core
 """
 
 import argparse
+import os
 import sys
 from pathlib import Path
 
@@ -16,15 +18,31 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 import uvicorn
 
+from src.core.config import SHARED_STATE_BACKEND, WORKERS
+
 
 def main():
     parser = argparse.ArgumentParser(description="Start the RAG Agent chat server")
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
     parser.add_argument("--reload", action="store_true", help="Auto-reload on code changes")
+    parser.add_argument(
+        "--workers", type=int, default=WORKERS,
+        help="Worker processes (sessions and rate limits are shared through SHARED_STATE_BACKEND)",
+    )
     args = parser.parse_args()
 
+    if args.workers > 1:
+        if args.reload:
+            parser.error("--reload runs a single process; drop --workers")
+        if SHARED_STATE_BACKEND == "memory":
+            parser.error("SHARED_STATE_BACKEND=memory cannot be shared between workers")
+    # Read by every worker's config, so they know state must be shared
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+
     print(f"\n🚀  RAG Agent starting at  http://localhost:{args.port}")
+    if args.workers > 1:
+        print(f"⚙️   {args.workers} workers")
     print(f"📚  Press Ctrl+C to stop\n")
 
     uvicorn.run(
@@ -32,6 +50,7 @@ def main():
         host=args.host,
         port=args.port,
         reload=args.reload,
+        workers=args.workers,
     )
 
 
@@ -5,6 +5,8 @@ CLI entry point for document ingestion.
 Usage:
     python scripts/run_ingest.py --library wa_governor_orders
     python scripts/run_ingest.py --all
+    python scripts/run_ingest.py --all --batch             # Batch API: half price, resumable
+    python scripts/run_ingest.py -l rcw_chapters --batch --no-wait
 """
 
 import argparse
@@ -15,7 +17,7 @@ from pathlib import Path
 # Ensure project root is on the path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from src.core.config import LIBRARIES, LIBRARY_ORDER
+from src.core.config import BATCH_INGEST_POLL_SECONDS, LIBRARIES, LIBRARY_ORDER
 from src.core.ingest import ingest_library
 from src.core.vector_store import collection_stats
 
@@ -38,6 +40,27 @@ def main():
         action="store_true",
         help="Print collection stats and exit",
     )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Embed through OpenAI batch jobs (resumes an unfinished run)",
+    )
+    parser.add_argument(
+        "--no-wait",
+        action="store_true",
+        help="With --batch: submit, store finished jobs and exit; rerun to continue",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="With --batch: discard an unfinished run and start over",
+    )
+    parser.add_argument(
+        "--poll-seconds",
+        type=float,
+        default=BATCH_INGEST_POLL_SECONDS,
+        help="With --batch: seconds between job status checks",
+    )
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -52,14 +75,25 @@ def main():
             print(f"  {key:35s}  {s['count']:>8,} chunks")
         return
 
+    ingest = ingest_library
+    if args.batch:
+        from src.core.batch_ingest import ingest_library_batch
+
+        def ingest(key):
+            return ingest_library_batch(
+                key, wait=not args.no_wait, poll_seconds=args.poll_seconds, fresh=args.fresh,
+            )
+
     if args.library:
-        summary = ingest_library(args.library)
+        summary = ingest(args.library)
         print(f"\n{'='*60}")
         print(f"Library:   {summary.get('library_name', summary['library'])}")
         print(f"Files:     {summary['total_files']}")
         print(f"Chunks:    {summary['total_chunks']}")
         print(f"Stored:    {summary.get('collection_count', 'N/A')}")
         print(f"Time:      {summary['elapsed_seconds']}s")
+        if summary.get('pending_jobs'):
+            print(f"Pending:   {len(summary['pending_jobs'])} of {summary['jobs']} batch jobs (rerun to continue)")
         if summary['errors']:
             print(f"Errors:    {len(summary['errors'])}")
             for e in summary['errors'][:10]:
@@ -68,8 +102,9 @@ def main():
 
     elif args.all:
         for key in LIBRARY_ORDER:
-            summary = ingest_library(key)
-            print(f"  ✓ {key}: {summary['total_chunks']} chunks in {summary['elapsed_seconds']}s")
+            summary = ingest(key)
+            pending = f", {len(summary['pending_jobs'])} batch jobs pending" if summary.get('pending_jobs') else ""
+            print(f"  ✓ {key}: {summary['total_chunks']} chunks in {summary['elapsed_seconds']}s{pending}")
     else:
         parser.print_help()
 
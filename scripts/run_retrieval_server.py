@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Start the retrieval service: one process holding the ChromaDB index that
+every web worker queries (set RETRIEVAL_SERVICE to the same address).
+
+Usage:
+    python scripts/run_retrieval_server.py                            # unix:data/retrieval.sock
+    python scripts/run_retrieval_server.py --address tcp:127.0.0.1:7070
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# This process is the one that opens ChromaDB; never route back to a service
+os.environ["RETRIEVAL_SERVICE"] = ""
+os.environ["RETRIEVAL_SHARDS"] = ""
+
+from src.core.config import PROJECT_ROOT, RETRIEVAL_SERVER_THREADS
+from src.core.retrieval_service import RetrievalServer
+from src.core.vector_store import warm_up
+
+logger = logging.getLogger("retrieval_server")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start the RAG Agent retrieval service")
+    parser.add_argument(
+        "--address", default=f"unix:{PROJECT_ROOT / 'data' / 'retrieval.sock'}",
+        help="unix:/path/to.sock or tcp:host:port",
+    )
+    parser.add_argument("--threads", type=int, default=RETRIEVAL_SERVER_THREADS, help="Concurrent Chroma queries")
+    parser.add_argument("--no-warm", action="store_true", help="Skip loading indexes at startup")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.no_warm:
+        for key, count in warm_up().items():
+            logger.info("Warmed %s (%d chunks)", key, count)
+
+    print(f"\n🔎  Retrieval service listening on {args.address}")
+    print(f"    Web workers: RETRIEVAL_SERVICE={args.address}")
+    print(f"📚  Press Ctrl+C to stop\n")
+    try:
+        asyncio.run(RetrievalServer(args.address, threads=args.threads).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
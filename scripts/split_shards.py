@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Split libraries of the local ChromaDB into hash partitions for retrieval nodes.
+
+Writes partition i of every given library to <out>/node-<i>; start node i
+with VECTOR_DB_PATH=<out>/node-<i> and list the nodes in the same order in
+RETRIEVAL_SHARDS (see src/core/shard_router.py).
+
+Usage:
+    python scripts/split_shards.py --library wac_chapters --partitions 2 --out data/shards
+    python scripts/split_shards.py --library wac_chapters rcw_chapters --partitions 3 --out /mnt/shards
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import chromadb
+
+from src.core.config import LIBRARIES
+from src.core.shard_router import partition_of
+from src.core.vector_store import get_or_create_collection, hnsw_metadata
+
+PAGE = 5000
+
+
+def split_library(library: str, targets: list) -> list:
+    """Copy every chunk of `library` into the target client owning its partition."""
+    source = get_or_create_collection(library)
+    outputs = [client.get_or_create_collection(name=library, metadata=hnsw_metadata(library)) for client in targets]
+    counts = [0] * len(targets)
+    total = source.count()
+    for offset in range(0, total, PAGE):
+        batch = source.get(include=["embeddings", "documents", "metadatas"], limit=PAGE, offset=offset)
+        parts = [([], [], [], []) for _ in targets]
+        for chunk_id, embedding, document, metadata in zip(
+            batch["ids"], batch["embeddings"], batch["documents"], batch["metadatas"]
+        ):
+            part = parts[partition_of(chunk_id, len(targets))]
+            part[0].append(chunk_id)
+            part[1].append(embedding)
+            part[2].append(document)
+            part[3].append(metadata)
+        for i, (ids, embeddings, documents, metadatas) in enumerate(parts):
+            if ids:
+                outputs[i].upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+                counts[i] += len(ids)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash-partition libraries for retrieval nodes")
+    parser.add_argument("--library", "-l", nargs="+", required=True, choices=list(LIBRARIES.keys()))
+    parser.add_argument("--partitions", "-n", type=int, required=True, help="Number of nodes")
+    parser.add_argument("--out", type=Path, required=True, help="Directory for node-<i> databases")
+    args = parser.parse_args()
+    if args.partitions < 2:
+        parser.error("--partitions must be at least 2")
+
+    targets = []
+    for i in range(args.partitions):
+        path = args.out / f"node-{i}"
+        path.mkdir(parents=True, exist_ok=True)
+        targets.append(chromadb.PersistentClient(path=str(path)))
+
+    for library in args.library:
+        start = time.perf_counter()
+        counts = split_library(library, targets)
+        print(f"  {library:<28} {sum(counts):>8,} chunks → {counts} in {time.perf_counter() - start:.1f}s")
+
+    nodes = "|".join(f"tcp:HOST{i}:7070" for i in range(args.partitions))
+    print("\nStart each node with VECTOR_DB_PATH=<out>/node-<i>, then e.g.:")
+    print("  RETRIEVAL_SHARDS=" + ";".join(f"{library}={nodes}" for library in args.library))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Report where start-up time goes.
+
+Runs `python -X importtime -c "import src.app.main"` in fresh interpreters and
+summarizes the slowest imports (cumulative, and self time grouped by
+top-level package). With --serve it also starts uvicorn and times how long
+the server takes to accept connections (/healthz) and to finish warm-up
+(/readyz), with the warm-up steps reported by the app.
+
+Usage:
+    python scripts/startup_report.py
+    python scripts/startup_report.py --runs 5 --top 20
+    python scripts/startup_report.py --serve --output results/startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module: str) -> list:
+    """[(module, self_us, cumulative_us, depth)] from one fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            rows.append((name, int(own), int(cumulative), len(indent) // 2))
+    return rows
+
+
+def summarize_imports(rows: list, top: int) -> dict:
+    total_us = sum(own for _, own, _, _ in rows)
+    by_package = defaultdict(int)
+    for name, own, _, _ in rows:
+        by_package[name.split(".")[0]] += own
+    slowest = sorted(rows, key=lambda r: r[2], reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "modules": len(rows),
+        "packages_ms": {k: round(v / 1000, 1) for k, v in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]},
+        "slowest_cumulative_ms": [(name, round(cum / 1000, 1)) for name, _, cum, _ in slowest],
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status, json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def serve_timings(timeout: float = 180) -> dict:
+    """Seconds from spawning uvicorn until /healthz answers and until /readyz is 200."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=dict(os.environ),
+    )
+    timings = {}
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            try:
+                if "listening_s" not in timings:
+                    _get(f"{url}/healthz")
+                    timings["listening_s"] = round(time.perf_counter() - start, 3)
+                status, body = _get(f"{url}/readyz")
+                if status == 200:
+                    timings["ready_s"] = round(time.perf_counter() - start, 3)
+                    timings["warmup_ms"] = body.get("warmup_ms", {})
+                    return timings
+                if body.get("error"):
+                    raise RuntimeError(f"Warm-up failed: {body['error']}")
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.02)
+        raise RuntimeError(f"Server not ready within {timeout:.0f} s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start-up time report")
+    parser.add_argument("--module", default="src.app.main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters (median total is reported)")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--serve", action="store_true", help="Also time uvicorn to /healthz and /readyz")
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    args = parser.parse_args()
+
+    runs = [summarize_imports(import_profile(args.module), args.top) for _ in range(args.runs)]
+    report = min(runs, key=lambda r: abs(r["total_ms"] - statistics.median(x["total_ms"] for x in runs)))
+    report["runs_total_ms"] = [r["total_ms"] for r in runs]
+
+    print(f"\nimport {args.module}: {report['total_ms']:.0f} ms median of {args.runs} "
+          f"({report['modules']} modules)  runs: {report['runs_total_ms']}")
+    print(f"\n{'package (self time)':<40} {'ms':>8}")
+    for package, ms in report["packages_ms"].items():
+        print(f"  {package:<38} {ms:>8.1f}")
+    print(f"\n{'slowest imports (cumulative)':<40} {'ms':>8}")
+    for name, ms in report["slowest_cumulative_ms"]:
+        print(f"  {name:<38} {ms:>8.1f}")
+
+    if args.serve:
+        report["serve"] = serve_timings()
+        s = report["serve"]
+        print(f"\nuvicorn: accepting connections after {s['listening_s']:.2f} s, ready after {s['ready_s']:.2f} s")
+        for step, ms in s["warmup_ms"].items():
+            print(f"  warm-up {step:<30} {ms:>8.1f} ms")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,34 +2,52 @@
 FastAPI Chat Server — SSE streaming RAG chat with settings management.
 """
 
+import asyncio
+import hashlib
 import hmac
 import json
+import logging
 import secrets
-import sqlite3
 import time
-from collections import defaultdict
-from datetime import datetime, timedelta, timezone
+from collections import defaultdict, deque
 from pathlib import Path
 from typing import Optional
 
-from fastapi import FastAPI, Depends, HTTPException, Request, status, Security
-from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status, Security
+from fastapi.responses import FileResponse, HTMLResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel, Field
 from typing import Dict, List
 
 from src.core.config import (
-    DEFAULT_SYSTEM_PROMPT,
-    LLM_TEMPERATURE,
     API_ACCESS_KEY,
-    LIBRARIES,
-    ALL_DOCUMENTS_DIR,
+    ADMIN_ACCESS_KEY,
+    ADMISSION_RETRIEVAL_MAX_IN_FLIGHT,
+    ADMISSION_LLM_MAX_IN_FLIGHT,
+    ADMISSION_MAX_QUEUE,
+    SSE_COALESCE_MS,
+    SSE_COALESCE_BYTES,
+    SSE_TIMING_EVENTS,
+    SEARCH_BATCH_MAX,
+    SEARCH_CACHE_TTL_SECONDS,
+    WORKERS,
 )
-from src.core.rag_chain import chat_stream
 from src.core.session_logger import log_session
 from src.core.retrieval_logger import log_retrieval
-
+from src.core.log_writer import get_log_writer
+from src.core.session_store import get_session_store
+from src.core.shares import ShareExpired, get_shares_repository
+from src.core.document_index import DocumentIndexNotReady, get_document_index
+from src.core.page_extract import FORMATS as PAGE_FORMATS, PageRangeError, extract_pages
+from src.core.shared_state import MemoryState, SharedState, get_shared_state
+from src.core import metrics
+from src.core.profiling import aprofiled, profile_path
+from src.core.shard_router import get_shard_router
+from src.core.vector_store import get_chunks
+from src.app.sse import sse_stream
+
+logger = logging.getLogger(__name__)
 
 # ── App setup ────────────────────────────────────────────────────────────
 app = FastAPI(title="RAG Agent — WA Legal Research", version="1.0.0")
@@ -37,55 +55,105 @@ app = FastAPI(title="RAG Agent — WA Legal Research", version="1.0.0")
 STATIC_DIR = Path(__file__).parent / "static"
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
-# ── Shares DB ─────────────────────────────────────────────────────────────
-SHARES_DB_PATH = Path("./data/shares.db")
-
-_CREATE_SHARES_TABLE = """
-    CREATE TABLE IF NOT EXISTS shared_conversations (
-        share_id          TEXT PRIMARY KEY,
-        created_at        TEXT NOT NULL,
-        expires_at        TEXT,
-        title             TEXT NOT NULL,
-        conversation_json TEXT NOT NULL,
-        message_count     INTEGER NOT NULL
-    )
-"""
-
-def _get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(SHARES_DB_PATH, timeout=30)
-    conn.execute("PRAGMA journal_mode=WAL")
-    return conn
-
-def init_shares_db():
-    SHARES_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = _get_conn()
-    conn.execute(_CREATE_SHARES_TABLE)
-    # Migrate old schema where expires_at had NOT NULL constraint
-    col_info = conn.execute("PRAGMA table_info(shared_conversations)").fetchall()
-    for col in col_info:
-        # col = (cid, name, type, notnull, dflt_value, pk)
-        if col[1] == "expires_at" and col[3] == 1:
-            conn.execute("ALTER TABLE shared_conversations RENAME TO _shares_old")
-            conn.execute(_CREATE_SHARES_TABLE)
-            conn.execute("""
-                INSERT INTO shared_conversations
-                SELECT share_id, created_at, NULL, title, conversation_json, message_count
-                FROM _shares_old
-            """)
-            conn.execute("DROP TABLE _shares_old")
-            break
-    conn.commit()
-    conn.close()
-
 @app.on_event("startup")
 async def startup():
-    init_shares_db()
+    await asyncio.to_thread(shares.init_db)
+    # Heavy imports and index loading happen after the port is open; /readyz reports when done
+    _warmup["task"] = asyncio.create_task(_warm_up())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if _warmup["task"] is not None:
+        _warmup["task"].cancel()
+    # Write out any queued session / retrieval log records and session state
+    await asyncio.to_thread(get_log_writer().close)
+    await asyncio.to_thread(sessions.close)
+    shares.close()
+    documents.stop()
+
+
+# ── Session state ────────────────────────────────────────────────────────
+# Bounded in-memory tier backed by SQLite; call save_session_state() after changes
+sessions = get_session_store()
+
+# ── Shares and documents ─────────────────────────────────────────────────
+shares = get_shares_repository()
+documents = get_document_index()  # filename → PDF path, refreshed in the background
+
+# ── Warm-up and readiness ────────────────────────────────────────────────
+# The chat pipeline (OpenAI SDK, retriever, answer cache) is imported lazily
+# so the server accepts connections within a fraction of a second. _warm_up
+# then loads it, the document index and the vector indexes; /readyz answers
+# 503 until it has finished, so a load balancer only routes traffic to
+# workers that won't make the first users wait.
+_warmup: Dict = {"task": None, "ready": False, "started": time.monotonic(), "steps": {}, "error": None}
+
+
+def _import_chat_pipeline() -> None:
+    from src.core import rag_chain  # noqa: F401  (openai, retriever, embedder)
+
+
+def _open_clients() -> None:
+    from src.core.answer_cache import get_answer_cache
+    from src.core.http_transport import get_async_openai_client, get_openai_client
+
+    get_openai_client()
+    get_async_openai_client()
+    get_answer_cache()
+
+
+def _load_indexes() -> None:
+    from src.core.vector_store import warm_up
+
+    warm_up()
+
+
+async def _timed(name: str, fn) -> None:
+    start = time.perf_counter()
+    await asyncio.to_thread(fn)
+    _warmup["steps"][name] = round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _warm_up() -> None:
+    async def pipeline():
+        await _timed("import_chat_pipeline", _import_chat_pipeline)
+        await _timed("open_clients", _open_clients)
+        await _timed("load_indexes", _load_indexes)
 
+    try:
+        # The document walk is I/O bound; overlap it with the CPU-bound imports
+        await asyncio.gather(pipeline(), _timed("document_index", documents.refresh))
+        _warmup["ready"] = True
+        logger.info("Warm-up finished in %.0f ms", (time.monotonic() - _warmup["started"]) * 1000)
+    except Exception as e:
+        _warmup["error"] = f"{type(e).__name__}: {e}"
+        logger.exception("Warm-up failed")
+    finally:
+        # Background refresh from here on; it also builds whatever warm-up didn't
+        documents.start()
+
+
+@app.get("/healthz")
+async def liveness():
+    """Liveness: the process is up and serving HTTP."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness: 200 once warm-up has finished, 503 before (or if it failed)."""
+    body = {
+        "ready": _warmup["ready"],
+        "uptime_s": round(time.monotonic() - _warmup["started"], 2),
+        "warmup_ms": _warmup["steps"],
+    }
+    if _warmup["error"]:
+        body["error"] = _warmup["error"]
+    return Response(
+        json.dumps(body), status_code=200 if _warmup["ready"] else 503, media_type="application/json",
+    )
 
-# ── In-memory state ──────────────────────────────────────────────────────
-# ── In-memory state ──────────────────────────────────────────────────────
-# Map session_id (str) -> dict of state
-sessions: Dict[str, Dict] = {}
 
 # ── Auth ─────────────────────────────────────────────────────────────────
 API_KEY_HEADER = APIKeyHeader(name="x-api-key", auto_error=False)
@@ -103,15 +171,33 @@ async def verify_api_key(api_key: str = Security(API_KEY_HEADER)):
         )
     return api_key
 
-def get_session_state(session_id: str) -> Dict:
-    """Get or create session state."""
-    if session_id not in sessions:
-        sessions[session_id] = {
-            "system_prompt": DEFAULT_SYSTEM_PROMPT,
-            "conversation_history": [],
-            "temperature": LLM_TEMPERATURE,
-        }
-    return sessions[session_id]
+
+ADMIN_KEY_HEADER = APIKeyHeader(name="x-admin-key", auto_error=False)
+
+
+async def profile_requested(request: Request, admin_key: str = Security(ADMIN_KEY_HEADER)) -> bool:
+    """True if an admin asked to profile this request (?profile=1 or X-Profile: 1)."""
+    flag = request.query_params.get("profile") or request.headers.get("x-profile")
+    if not flag or flag.lower() in ("0", "false", "no"):
+        return False
+    if not ADMIN_ACCESS_KEY or not admin_key or not hmac.compare_digest(admin_key, ADMIN_ACCESS_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Profiling requires a valid admin key",
+        )
+    return True
+
+async def get_session_state(session_id: str) -> Dict:
+    """Get or create session state (may read the shared SQLite store)."""
+    return await asyncio.to_thread(sessions.get, session_id)
+
+
+async def save_session_state(session_id: str, state: Dict) -> None:
+    """
+    Persist session state off the event loop. Shielded, so a save that has
+    started completes even if the request is cancelled (client disconnect).
+    """
+    await asyncio.shield(asyncio.to_thread(sessions.save, session_id, state))
 
 
 # ── Rate Limiting ────────────────────────────────────────────────────────
@@ -125,42 +211,189 @@ def _get_client_ip(request: Request) -> str:
 
 
 class RateLimiter:
-    """Sliding-window per-IP rate limiter (in-memory, no dependencies)."""
-
-    def __init__(self, max_requests: int, window_seconds: int):
+    """
+    Per-IP token bucket: `max_requests` burst, refilled over `window_seconds`.
+    Buckets live in process memory with one worker, and in the shared-state
+    backend with several so the limit holds across all of them.
+    """
+
+    def __init__(self, name: str, max_requests: int, window_seconds: int, state: SharedState):
+        self.name = name
         self.max_requests = max_requests
         self.window = window_seconds
-        self._hits: Dict[str, list] = defaultdict(list)
-
-    def check(self, ip: str) -> None:
-        now = time.time()
-        cutoff = now - self.window
-        # Prune old timestamps
-        timestamps = self._hits[ip]
-        self._hits[ip] = [t for t in timestamps if t > cutoff]
-        if len(self._hits[ip]) >= self.max_requests:
+        self._state = state
+
+    def check(self, ip: str, cost: int = 1) -> None:
+        """Charge `cost` requests at once; nothing is charged when refused."""
+        if not self._state.hit(f"rate:{self.name}:{ip}", self.max_requests, self.window, cost):
             raise HTTPException(
                 status_code=429,
                 detail=f"Rate limit exceeded. Try again in {self.window} seconds.",
             )
-        self._hits[ip].append(now)
 
 
 # Tiered limiters
-_chat_limiter = RateLimiter(max_requests=10, window_seconds=60)     # 10 req/min
-_share_limiter = RateLimiter(max_requests=5, window_seconds=60)     # 5 req/min
-_doc_limiter = RateLimiter(max_requests=30, window_seconds=60)      # 30 req/min
+_limiter_state = get_shared_state() if WORKERS > 1 else MemoryState()
+_chat_limiter = RateLimiter("chat", 10, 60, _limiter_state)       # 10 req/min
+_share_limiter = RateLimiter("share", 5, 60, _limiter_state)      # 5 req/min
+_doc_limiter = RateLimiter("documents", 30, 60, _limiter_state)   # 30 req/min
+_chunk_limiter = RateLimiter("chunks", 120, 60, _limiter_state)   # 120 req/min
+_search_limiter = RateLimiter("search", 60, 60, _limiter_state)   # 60 queries/min
 
 
-async def rate_limit_chat(request: Request):
+# Plain `def`: FastAPI runs these in its threadpool, so a SQLite bucket
+# update waiting on another worker's write lock never blocks the event loop
+def rate_limit_chat(request: Request):
     _chat_limiter.check(_get_client_ip(request))
 
-async def rate_limit_share(request: Request):
+def rate_limit_share(request: Request):
     _share_limiter.check(_get_client_ip(request))
 
-async def rate_limit_documents(request: Request):
+def rate_limit_documents(request: Request):
     _doc_limiter.check(_get_client_ip(request))
 
+def rate_limit_chunks(request: Request):
+    _chunk_limiter.check(_get_client_ip(request))
+
+def rate_limit_search(request: Request, queries: int) -> None:
+    """
+    Search is charged per query, so a batch costs as much as its parts. The
+    whole batch is charged in one step: one that doesn't fit uses up nothing.
+    """
+    _search_limiter.check(_get_client_ip(request), cost=queries)
+
+
+# ── Admission Control ────────────────────────────────────────────────────
+
+class AdmissionRejected(Exception):
+    """Raised when a stage's wait queue is full and the request is shed."""
+
+
+class AdmissionController:
+    """
+    Global max-in-flight gate for one chat stage, with a bounded FIFO queue.
+
+    Unlike the per-IP RateLimiter this caps total concurrency, so a burst of
+    heavy queries waits its turn (reporting its queue position) instead of
+    saturating ChromaDB and the OpenAI rate limits for everyone.
+    """
+
+    POSITION_INTERVAL = 1.0  # seconds between queue-position refreshes
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self.admitted_total = 0
+        self.shed_total = 0
+        self._wait_times: deque = deque(maxlen=1000)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def has_capacity(self) -> bool:
+        """True if a new request could be admitted or queued right now."""
+        return self.in_flight < self.max_in_flight or len(self._waiters) < self.max_queue
+
+    async def wait(self):
+        """
+        Acquire a slot. Async generator yielding the 1-based queue position
+        while waiting; returns once the slot is held. Raises
+        AdmissionRejected if the queue is full.
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self._record_admit(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.shed_total += 1
+            raise AdmissionRejected(f"{self.name} queue is full")
+
+        ticket = asyncio.get_running_loop().create_future()
+        self._waiters.append(ticket)
+        enqueued_at = time.monotonic()
+        last_position = None
+        try:
+            while not ticket.done():
+                position = self._waiters.index(ticket) + 1
+                if position != last_position:
+                    last_position = position
+                    yield position
+                try:
+                    await asyncio.wait_for(asyncio.shield(ticket), self.POSITION_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            if ticket.done():
+                self.release()  # Slot was handed to us but nobody will use it
+            else:
+                self._waiters.remove(ticket)
+            raise
+        self._record_admit(time.monotonic() - enqueued_at)
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the next queued request."""
+        while self._waiters:
+            ticket = self._waiters.popleft()
+            if not ticket.done():
+                ticket.set_result(None)
+                return
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def _record_admit(self, waited: float) -> None:
+        self.admitted_total += 1
+        self._wait_times.append(waited)
+
+    def metrics(self) -> Dict:
+        waits = sorted(self._wait_times)
+
+        def pct(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1)
+
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "admitted_total": self.admitted_total,
+            "shed_total": self.shed_total,
+            "wait_ms_p50": pct(0.50),
+            "wait_ms_p95": pct(0.95),
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
+
+
+def _worker_share(limit: int) -> int:
+    """This worker's slice of a host-wide cap: each worker gates on its own."""
+    return max(1, limit // WORKERS)
+
+
+_admission = {
+    "retrieval": AdmissionController(
+        "retrieval", _worker_share(ADMISSION_RETRIEVAL_MAX_IN_FLIGHT), _worker_share(ADMISSION_MAX_QUEUE),
+    ),
+    "llm": AdmissionController(
+        "llm", _worker_share(ADMISSION_LLM_MAX_IN_FLIGHT), _worker_share(ADMISSION_MAX_QUEUE),
+    ),
+}
+
+
+async def admit_chat():
+    """Shed load fast with 503 when the entry stage cannot even queue us."""
+    gate = _admission["retrieval"]
+    if not gate.has_capacity():
+        gate.shed_total += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at capacity. Please try again shortly.",
+            headers={"Retry-After": "5"},
+        )
+
 
 # ── Request / Response models ────────────────────────────────────────────
 
@@ -168,6 +401,7 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=5000)
     session_id: str = Field(..., min_length=1, max_length=100)
     top_k: Optional[int] = Field(None, ge=1, le=100)
+    timing: bool = False  # ask for the per-stage `timing` event
 
 
 class SettingsRequest(BaseModel):
@@ -186,6 +420,19 @@ class RestoreRequest(BaseModel):
     conversation: List[Dict]
 
 
+class SearchQuery(BaseModel):
+    query: str = Field(..., min_length=1, max_length=2000)
+    libraries: Optional[List[str]] = None  # all libraries when empty
+    where: Optional[Dict] = None           # ChromaDB metadata filter
+    limit: int = Field(10, ge=1, le=50)
+    cursor: Optional[str] = Field(None, max_length=200)
+    min_score: float = Field(0.0, ge=0.0, le=1.0)
+
+
+class SearchRequest(BaseModel):
+    queries: List[SearchQuery] = Field(..., min_length=1, max_length=SEARCH_BATCH_MAX)
+
+
 # ── Routes ───────────────────────────────────────────────────────────────
 
 @app.get("/", response_class=HTMLResponse)
@@ -195,91 +442,326 @@ async def serve_ui():
     return HTMLResponse(content=index_path.read_text(), status_code=200)
 
 
-@app.post("/api/chat", dependencies=[Depends(verify_api_key), Depends(rate_limit_chat)])
-async def chat_endpoint(request: ChatRequest):
-    """Stream a RAG-augmented chat response via SSE."""
-    state = get_session_state(request.session_id)
+@app.post(
+    "/api/chat",
+    dependencies=[Depends(verify_api_key), Depends(rate_limit_chat), Depends(admit_chat)],
+)
+async def chat_endpoint(
+    req: ChatRequest,
+    request: Request,
+    profile: bool = Depends(profile_requested),
+):
+    """
+    Stream a RAG-augmented chat response via SSE.
+
+    Admins can profile the turn with ?profile=1 (or X-Profile: 1) plus
+    X-Admin-Key; the report name is returned in the X-Profile header.
+    """
+    state = await get_session_state(req.session_id)
     
     full_tokens = []
     usage_info = {"input_tokens": 0, "output_tokens": 0}
     sources_data = []  # Store full source objects for logging
+    timings = {}
+    send_timing = req.timing or SSE_TIMING_EVENTS
     start_time = time.time()
 
-    def event_generator():
+    async def event_generator():
         nonlocal sources_data
         history_saved = False
+        from src.core.rag_chain import achat_stream  # loaded by warm-up; instant after that
+
+        stream = achat_stream(
+            user_message=req.message,
+            conversation_history=state["conversation_history"],
+            system_prompt=state["system_prompt"],
+            top_k=req.top_k,
+            temperature=state["temperature"],
+            gates=_admission,
+        )
         try:
-            for event in chat_stream(
-                user_message=request.message,
-                conversation_history=state["conversation_history"],
-                system_prompt=state["system_prompt"],
-                top_k=request.top_k,
-                temperature=state["temperature"],
-            ):
+            async for event in stream:
+                if await request.is_disconnected():
+                    break  # Client went away — stop generating (and billing)
                 if event["type"] == "token":
                     full_tokens.append(event["data"])
                 elif event["type"] == "sources":
                     sources_data = event.get("data", [])
                 elif event["type"] == "usage":
                     usage_info.update(event.get("data", {}))
+                elif event["type"] == "timing":
+                    timings.update(event.get("data", {}))
+                    if not send_timing:
+                        continue
                 elif event["type"] == "done":
                     # Save to conversation history
                     answer_text = "".join(full_tokens)
                     state["conversation_history"].append(
-                        {"role": "user", "content": request.message}
+                        {"role": "user", "content": req.message}
                     )
                     state["conversation_history"].append(
                         {"role": "assistant", "content": answer_text}
                     )
+                    await save_session_state(req.session_id, state)
                     history_saved = True
                     # Log session (isolated so failures don't break the stream)
                     try:
                         duration_ms = int((time.time() - start_time) * 1000)
                         log_session(
-                            session_id=request.session_id,
-                            question=request.message,
+                            session_id=req.session_id,
+                            question=req.message,
                             answer=answer_text,
                             input_tokens=usage_info["input_tokens"],
                             output_tokens=usage_info["output_tokens"],
                             sources_count=len(sources_data),
                             temperature=state["temperature"],
                             duration_ms=duration_ms,
+                            timings=timings,
                         )
                         log_retrieval(
-                            session_id=request.session_id,
-                            question=request.message,
+                            session_id=req.session_id,
+                            question=req.message,
                             sources=sources_data,
                             temperature=state["temperature"],
                         )
                     except Exception:
                         pass  # Logging failure must not affect chat or history
-                yield f"data: {json.dumps(event)}\n\n"
+                yield event
         finally:
+            # Closing the chat stream aborts the upstream LLM request
+            await stream.aclose()
             # Fallback: save history even if streaming was interrupted early
             if not history_saved and full_tokens:
                 answer_text = "".join(full_tokens)
                 state["conversation_history"].append(
-                    {"role": "user", "content": request.message}
+                    {"role": "user", "content": req.message}
                 )
                 state["conversation_history"].append(
                     {"role": "assistant", "content": answer_text}
                 )
+                await save_session_state(req.session_id, state)
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "X-Accel-Buffering": "no",
+    }
+    events = event_generator()
+    if profile:
+        path_stem = profile_path(req.session_id)
+        events = _profiled_events(events, path_stem)
+        headers["X-Profile"] = path_stem.name
 
     return StreamingResponse(
-        event_generator(),
+        sse_stream(events, SSE_COALESCE_MS, SSE_COALESCE_BYTES),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
+        headers=headers,
     )
 
 
+async def _profiled_events(events, path_stem):
+    """Run a chat event stream under the sampling profiler."""
+    async with aprofiled(path_stem):
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+
+
+# ── Chunk text ───────────────────────────────────────────────────────────
+
+CHUNK_BATCH_MAX = 50
+
+
+def _cacheable_json(request: Request, payload, max_age: int = 3600) -> Response:
+    """JSON response with a content ETag; answers 304 on If-None-Match."""
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return _etag_response(request, body, etag, f"private, max-age={max_age}")
+
+
+def _etag_response(
+    request: Request, body: bytes, etag: str, cache_control: str, media_type: str = "application/json",
+) -> Response:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _load_chunks(refs: List[str]) -> List[Dict]:
+    """Fetch full chunk text for `library:chunk_id` refs, one query per library."""
+    from src.core.retriever import parse_chunk_ref
+
+    by_library: Dict[str, List[str]] = defaultdict(list)
+    for ref in refs:
+        parsed = parse_chunk_ref(ref)
+        if parsed:
+            by_library[parsed[0]].append(parsed[1])
+
+    found = {}
+    for library, ids in by_library.items():
+        result = get_chunks(library, ids)
+        for chunk_id, doc, meta in zip(result["ids"], result["documents"], result["metadatas"]):
+            ref = f"{library}:{chunk_id}"
+            found[ref] = {
+                "id": ref,
+                "library": library,
+                "source_file": meta.get("source_file", ""),
+                "page_number": meta.get("page_number", 0),
+                "text": doc,
+            }
+    return [found[ref] for ref in refs if ref in found]
+
+
+@app.get("/api/chunks", dependencies=[Depends(verify_api_key), Depends(rate_limit_chunks)])
+async def get_chunks_batch(ids: str, request: Request):
+    """Full text for several sources at once (`ids` is comma-separated)."""
+    refs = [r for r in dict.fromkeys(ids.split(",")) if r][:CHUNK_BATCH_MAX]
+    chunks = await asyncio.to_thread(_load_chunks, refs)
+    return _cacheable_json(request, {"chunks": chunks})
+
+
+@app.get("/api/chunks/{chunk_ref}", dependencies=[Depends(verify_api_key), Depends(rate_limit_chunks)])
+async def get_chunk(chunk_ref: str, request: Request):
+    """Full text of one retrieved source, fetched when the user expands it."""
+    from src.core.retriever import parse_chunk_ref
+
+    if parse_chunk_ref(chunk_ref) is None:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    chunks = await asyncio.to_thread(_load_chunks, [chunk_ref])
+    if not chunks:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    return _cacheable_json(request, chunks[0])
+
+
+async def _search(request: Request, queries: List[SearchQuery]) -> List[Dict]:
+    """Run searches under the retrieval admission gate shared with chat."""
+    from src.core.search import SearchError, search_many
+
+    await asyncio.to_thread(rate_limit_search, request, len(queries))
+    gate = _admission["retrieval"]
+    try:
+        async for _ in gate.wait():
+            pass
+    except AdmissionRejected:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at capacity. Please try again shortly.",
+            headers={"Retry-After": "5"},
+        )
+    try:
+        return await asyncio.to_thread(search_many, [q.model_dump() for q in queries])
+    except SearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        gate.release()
+
+
+def _search_max_age(pages: List[Dict]) -> int:
+    """Cache lifetime of search pages; a partial ranking must be revalidated."""
+    return 0 if any(page["partial"] for page in pages) else int(SEARCH_CACHE_TTL_SECONDS)
+
+
+@app.get("/api/search", dependencies=[Depends(verify_api_key)])
+async def search(
+    request: Request,
+    q: str,
+    library: Optional[List[str]] = Query(None),
+    where: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
+    min_score: float = Query(0.0, ge=0.0, le=1.0),
+):
+    """
+    Ranked passages for one query, without generating an answer. `library`
+    may repeat, `where` is a JSON ChromaDB filter, and `cursor` is the
+    previous page's `next_cursor`. Responses carry an ETag (304 on
+    If-None-Match).
+    """
+    try:
+        filters = json.loads(where) if where else None
+        item = SearchQuery(query=q, libraries=library, where=filters, limit=limit, cursor=cursor, min_score=min_score)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search parameters: {e}")
+    pages = await _search(request, [item])
+    return _cacheable_json(request, pages[0], max_age=_search_max_age(pages))
+
+
+@app.post("/api/search", dependencies=[Depends(verify_api_key)])
+async def search_batch(req: SearchRequest, request: Request):
+    """Several searches in one request (same fields as GET, per query); one page each."""
+    pages = await _search(request, req.queries)
+    return _cacheable_json(request, {"results": pages}, max_age=_search_max_age(pages))
+
+
+@app.get("/api/admission", dependencies=[Depends(verify_api_key)])
+async def admission_metrics():
+    """
+    Queue depth, in-flight and wait-time metrics per chat stage, for the
+    worker that answers. Its max_in_flight and max_queue are its share of
+    the configured caps, which are split across `workers`.
+    """
+    return {stage: {**gate.metrics(), "workers": WORKERS} for stage, gate in _admission.items()}
+
+
+@app.get("/api/retrieval/nodes", dependencies=[Depends(verify_api_key)])
+async def retrieval_nodes():
+    """Health of the retrieval service nodes (empty when ChromaDB is in-process)."""
+    router = get_shard_router()
+    return router.node_report() if router is not None else {}
+
+
+# ── Metrics ──────────────────────────────────────────────────────────────
+
+def _admission_gauge(attr: str):
+    return lambda: {(stage,): getattr(gate, attr) for stage, gate in _admission.items()}
+
+
+metrics.register(metrics.CallbackGauge(
+    "rag_admission_in_flight", "Chat turns holding a stage slot.",
+    ("stage",), _admission_gauge("in_flight"),
+))
+metrics.register(metrics.CallbackGauge(
+    "rag_admission_queue_depth", "Chat turns waiting for a stage slot.",
+    ("stage",), _admission_gauge("queue_depth"),
+))
+metrics.register(metrics.CallbackGauge(
+    "rag_admission_shed_total", "Chat turns rejected per stage.",
+    ("stage",), _admission_gauge("shed_total"), kind="counter",
+))
+metrics.register(metrics.CallbackGauge(
+    "rag_sessions_resident", "Sessions held in memory.",
+    (), lambda: {(): len(sessions)},
+))
+metrics.register(metrics.CallbackGauge(
+    "rag_sessions_evicted_total", "Sessions evicted from memory (LRU or idle).",
+    (), lambda: {(): sessions.evicted_total}, kind="counter",
+))
+
+
+def _retrieval_nodes_up():
+    router = get_shard_router()
+    return {(address,): int(h.up) for address, h in router.health.items()} if router is not None else {}
+
+
+metrics.register(metrics.CallbackGauge(
+    "rag_retrieval_node_up", "Retrieval nodes considered healthy (1) or down (0).",
+    ("node",), _retrieval_nodes_up,
+))
+
+
+@app.get("/metrics", dependencies=[Depends(verify_api_key)])
+async def prometheus_metrics():
+    """Per-stage latency histograms and admission gauges (Prometheus text format)."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/api/settings", dependencies=[Depends(verify_api_key)])
 async def get_settings(session_id: str):
     """Get current system instruction and temperature."""
-    state = get_session_state(session_id)
+    state = await get_session_state(session_id)
     return {
         "system_prompt": state["system_prompt"],
         "temperature": state["temperature"],
@@ -289,10 +771,11 @@ async def get_settings(session_id: str):
 @app.put("/api/settings", dependencies=[Depends(verify_api_key)])
 async def update_settings(request: SettingsRequest):
     """Update the system instruction and/or temperature."""
-    state = get_session_state(request.session_id)
+    state = await get_session_state(request.session_id)
     state["system_prompt"] = request.system_prompt
     if request.temperature is not None:
         state["temperature"] = max(0.0, min(1.0, request.temperature))
+    await save_session_state(request.session_id, state)
     return {
         "status": "ok",
         "system_prompt": state["system_prompt"],
@@ -303,8 +786,10 @@ async def update_settings(request: SettingsRequest):
 @app.delete("/api/chat/history", dependencies=[Depends(verify_api_key)])
 async def clear_history(session_id: str):
     """Clear conversation history for a specific session."""
-    if session_id in sessions:
-        sessions[session_id]["conversation_history"] = []
+    state = await asyncio.to_thread(sessions.peek, session_id)
+    if state is not None:
+        state["conversation_history"] = []
+        await save_session_state(session_id, state)
     return {
         "status": "ok",
         "message": "Conversation cleared",
@@ -315,21 +800,28 @@ async def clear_history(session_id: str):
 @app.post("/api/chat/restore", dependencies=[Depends(verify_api_key)])
 async def restore_history(req: RestoreRequest):
     """Restore a saved conversation into a session so the AI retains context."""
-    state = get_session_state(req.session_id)
+    state = await get_session_state(req.session_id)
     state["conversation_history"] = [
         {"role": m["role"], "content": m["content"]}
         for m in req.conversation
         if m.get("role") in ("user", "assistant") and isinstance(m.get("content"), str)
     ]
+    await save_session_state(req.session_id, state)
     return {"status": "ok", "count": len(state["conversation_history"])}
 
 
+@app.get("/api/sessions/memory", dependencies=[Depends(verify_api_key)])
+async def session_memory(top: int = 20):
+    """Resident session count and estimated memory, largest sessions first."""
+    return await asyncio.to_thread(sessions.memory_report, max(0, min(top, 200)))
+
+
 # ── Share endpoints ───────────────────────────────────────────────────────
 
 @app.post("/api/share", dependencies=[Depends(verify_api_key), Depends(rate_limit_share)])
 async def create_share(req: ShareRequest):
     """Save a conversation to disk and return a shareable link."""
-    session = sessions.get(req.session_id)
+    session = await asyncio.to_thread(sessions.peek, req.session_id)
     if not session or not session.get("conversation_history"):
         raise HTTPException(status_code=404, detail="Session not found or empty")
 
@@ -337,46 +829,25 @@ async def create_share(req: ShareRequest):
     title = next(
         (m["content"][:80] for m in history if m["role"] == "user"), "Untitled"
     )
-    now = datetime.now(timezone.utc)
     share_id = req.share_id if req.share_id else secrets.token_urlsafe(12)
-
-    conn = _get_conn()
-    conn.execute(
-        "INSERT OR REPLACE INTO shared_conversations VALUES (?, ?, ?, ?, ?, ?)",
-        (share_id, now.isoformat(), None,
-         title, json.dumps(history), len(history)),
-    )
-    conn.commit()
-    conn.close()
+    await asyncio.to_thread(shares.save, share_id, title, history)
 
     return {"share_id": share_id, "share_url": f"/share/{share_id}", "title": title}
 
 
 @app.get("/api/share/{share_id}")
-async def get_share(share_id: str):
-    """Retrieve a shared conversation by its ID."""
-    conn = _get_conn()
-    row = conn.execute(
-        "SELECT title, conversation_json, created_at, expires_at "
-        "FROM shared_conversations WHERE share_id = ?",
-        (share_id,),
-    ).fetchone()
-    conn.close()
-
-    if not row:
+async def get_share(share_id: str, request: Request):
+    """
+    Retrieve a shared conversation by its ID. Saved conversations are
+    updated in place by auto-save, so clients must revalidate (ETag).
+    """
+    try:
+        share = await asyncio.to_thread(shares.get, share_id)
+    except ShareExpired:
+        raise HTTPException(status_code=410, detail="This link has expired")
+    if share is None:
         raise HTTPException(status_code=404, detail="Share not found")
-
-    # Check expiry only if expires_at was set (legacy rows)
-    if row[3]:
-        expires_at = datetime.fromisoformat(row[3])
-        if datetime.now(timezone.utc) > expires_at:
-            raise HTTPException(status_code=410, detail="This link has expired")
-
-    return {
-        "title": row[0],
-        "conversation": json.loads(row[1]),
-        "created_at": row[2],
-    }
+    return _etag_response(request, share.body, share.etag, "public, no-cache")
 
 
 @app.get("/share/{share_id}")
@@ -388,24 +859,18 @@ async def share_page(share_id: str):
 # ── Document serving ────────────────────────────────────────────────────
 
 def _resolve_document_path(library_key: str, filename: str):
-    """Locate a PDF on disk, validating against directory traversal."""
-    if library_key not in LIBRARIES:
-        return None
-    if "/" in filename or "\\" in filename or ".." in filename:
-        return None
-    if not filename.lower().endswith(".pdf"):
-        return None
-
-    lib_path = LIBRARIES[library_key]["path"]
-    matches = list(lib_path.rglob(filename))
-    if len(matches) != 1:
-        return None
-
-    resolved = matches[0].resolve()
-    if not str(resolved).startswith(str(ALL_DOCUMENTS_DIR.resolve())):
+    """Locate a PDF on disk via the path index (traversal-checked when built)."""
+    try:
+        path = documents.lookup(library_key, filename)
+    except DocumentIndexNotReady:
+        raise HTTPException(
+            status_code=503,
+            detail="Documents are still being indexed. Please try again shortly.",
+            headers={"Retry-After": "5"},
+        )
+    if path is None or not path.is_file():
         return None
-
-    return resolved
+    return path
 
 
 @app.get("/api/documents/{library_key}/{filename}", dependencies=[Depends(rate_limit_documents)])
@@ -414,8 +879,39 @@ async def serve_document(library_key: str, filename: str):
     path = _resolve_document_path(library_key, filename)
     if path is None:
         raise HTTPException(status_code=404, detail="Document not found")
+    # FileResponse answers Range requests (206) and sends ETag / Last-Modified
     return FileResponse(
         str(path),
         media_type="application/pdf",
-        headers={"Content-Disposition": "inline"},
+        headers={"Content-Disposition": "inline", "Cache-Control": "private, max-age=86400"},
     )
+
+
+@app.get(
+    "/api/documents/{library_key}/{filename}/pages/{pages}",
+    dependencies=[Depends(rate_limit_documents)],
+)
+async def serve_document_pages(
+    request: Request, library_key: str, filename: str, pages: str, format: str = "pdf", dpi: int = 110,
+):
+    """
+    One cited page (`12`) or a short range (`12-14`) as a small standalone
+    PDF, or a single page as PNG (`?format=png&dpi=110`).
+    """
+    path = _resolve_document_path(library_key, filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    first, _, last = pages.partition("-")
+    if not first.isdigit() or (last and not last.isdigit()):
+        raise HTTPException(status_code=400, detail="Pages must look like 12 or 12-14")
+    first_page, last_page = int(first), int(last or first)
+    try:
+        data = await asyncio.to_thread(
+            extract_pages, path, first_page, last_page, format, max(50, min(dpi, 200)),
+        )
+    except PageRangeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    etag = '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+    response = _etag_response(request, data, etag, "private, max-age=86400", PAGE_FORMATS[format])
+    response.headers["Content-Disposition"] = "inline"
+    return response
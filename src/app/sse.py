@@ -0,0 +1,130 @@
+"""
+Server-Sent Events encoding with optional token coalescing.
+
+Model deltas are often only one or two characters, so emitting one frame
+per delta costs a json.dumps, a socket write and a flush per character.
+`sse_stream` merges consecutive token events into a single frame per time
+window or byte budget while passing every other event through unchanged.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import AsyncIterator, Optional
+
+_END = object()
+_MAX_PENDING = 16  # frames queued for the writer before the pump stops pulling
+
+
+def encode_event(event: dict) -> str:
+    """Encode one event as a compact SSE `data:` frame."""
+    return f"data: {json.dumps(event, separators=(',', ':'), ensure_ascii=False)}\n\n"
+
+
+class _Coalescer:
+    """
+    Pulls events from the source generator in a background task, merging
+    token deltas into a buffer that is released by a per-frame timer, the
+    byte budget, or the next non-token event. Per delta this costs a list
+    append; the timer and wake-up are paid once per frame. When the writer
+    falls behind by `_MAX_PENDING` frames the pump stops pulling from the
+    source until it catches up, so a slow client applies backpressure
+    instead of growing the outbox.
+    """
+
+    def __init__(self, events: AsyncIterator[dict], window: float, max_bytes: int):
+        self.events = events
+        self.window = window
+        self.max_bytes = max_bytes
+        self.loop = asyncio.get_running_loop()
+        self.ready = asyncio.Event()
+        self.space = asyncio.Event()
+        self.outbox: deque = deque()
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+    def _release(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.buffer:
+            self.outbox.append({"type": "token", "data": "".join(self.buffer)})
+            self.buffer.clear()
+            self.buffered_bytes = 0
+        self.ready.set()
+
+    async def _wait_for_space(self) -> None:
+        while len(self.outbox) >= _MAX_PENDING:
+            self.space.clear()
+            await self.space.wait()
+
+    async def pump(self) -> None:
+        try:
+            async for event in self.events:
+                if event.get("type") != "token":
+                    self._release()
+                    self.outbox.append(event)
+                else:
+                    data = event["data"]
+                    self.buffer.append(data)
+                    self.buffered_bytes += len(data.encode("utf-8"))
+                    if self.max_bytes and self.buffered_bytes >= self.max_bytes:
+                        self._release()
+                    elif self.timer is None:
+                        self.timer = self.loop.call_later(self.window, self._release)
+                await self._wait_for_space()
+        except Exception as e:
+            self._release()
+            self.outbox.append(e)
+            return
+        self._release()
+        self.outbox.append(_END)
+        self.ready.set()
+
+
+async def sse_stream(
+    events: AsyncIterator[dict],
+    window_ms: float = 0,
+    max_bytes: int = 0,
+) -> AsyncIterator[str]:
+    """
+    Encode chat events as SSE frames.
+
+    With `window_ms` > 0, token deltas are buffered and flushed as one
+    {"type": "token"} frame when the oldest buffered delta is `window_ms`
+    old, when the buffer reaches `max_bytes`, or just before any non-token
+    event. The source generator is always closed when this one is.
+    """
+    if window_ms <= 0:
+        try:
+            async for event in events:
+                yield encode_event(event)
+        finally:
+            await events.aclose()
+        return
+
+    coalescer = _Coalescer(events, window_ms / 1000, max_bytes)
+    pump = asyncio.ensure_future(coalescer.pump())
+    try:
+        while True:
+            await coalescer.ready.wait()
+            coalescer.ready.clear()
+            while coalescer.outbox:
+                item = coalescer.outbox.popleft()
+                coalescer.space.set()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield encode_event(item)
+    finally:
+        if coalescer.timer is not None:
+            coalescer.timer.cancel()
+        if not pump.done():
+            # Cancelling the pump closes the source generator it is iterating.
+            # wait() doesn't raise the pump's CancelledError, so only a
+            # cancellation of this task propagates from here
+            pump.cancel()
+            await asyncio.wait([pump])
+        await events.aclose()
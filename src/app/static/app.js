@@ -343,6 +343,14 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
 
+            if (response.status === 503) {
+                clearInterval(thinkingTimer);
+                bubble.innerHTML = `<span style="color:var(--error)">The server is at capacity — please try again in a few seconds.</span>`;
+                isStreaming = false;
+                sendBtn.disabled = !chatInput.value.trim();
+                return;
+            }
+
             if (!response.ok) {
                 clearInterval(thinkingTimer);
                 bubble.innerHTML = `<span style="color:var(--error)">Server error (${response.status}). Please try again.</span>`;
@@ -354,6 +362,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
             let buffer = '';
+            let queuedLabel = null;
 
             while (true) {
                 const { done, value } = await reader.read();
@@ -367,6 +376,10 @@ document.addEventListener('DOMContentLoaded', () => {
                     if (!line.startsWith('data: ')) continue;
                     try {
                         const event = JSON.parse(line.slice(6));
+                        if (queuedLabel && event.type !== 'queue') {
+                            queuedLabel.textContent = 'Searching corpus';
+                            queuedLabel = null;
+                        }
                         if (event.type === 'token') {
                             fullText += event.data;
                             // Live-update streaming preview if open
@@ -374,6 +387,9 @@ document.addEventListener('DOMContentLoaded', () => {
                                 streamingPreview.textContent = fullText;
                                 streamingPreview.scrollTop = streamingPreview.scrollHeight;
                             }
+                        } else if (event.type === 'queue') {
+                            queuedLabel = bubble.querySelector('.thinking-label');
+                            if (queuedLabel) queuedLabel.textContent = `Queued (position ${event.data.position})`;
                         } else if (event.type === 'sources') {
                             if (event.data && event.data.length > 0) {
                                 renderSources(sourcesContainer, event.data);
@@ -514,10 +530,16 @@ document.addEventListener('DOMContentLoaded', () => {
 
             const textBlock = document.createElement('div');
             textBlock.className = 'source-text';
-            textBlock.textContent = s.text || '(no text available)';
+            textBlock.textContent = s.text || s.preview || '(no text available)';
 
+            // Full chunk text is only fetched the first time a source is expanded
+            let textLoaded = Boolean(s.text) || !s.id;
             header.addEventListener('click', () => {
                 item.classList.toggle('expanded');
+                if (!textLoaded && item.classList.contains('expanded')) {
+                    textLoaded = true;
+                    loadChunkText(s.id, textBlock);
+                }
             });
 
             item.appendChild(header);
@@ -534,21 +556,54 @@ document.addEventListener('DOMContentLoaded', () => {
         container.appendChild(list);
     }
 
+    async function loadChunkText(chunkId, textBlock) {
+        try {
+            const res = await fetch(`/api/chunks/${encodeURIComponent(chunkId)}`, {
+                headers: getHeaders(),
+            });
+            if (!res.ok) return;
+            const chunk = await res.json();
+            if (chunk.text) textBlock.textContent = chunk.text;
+        } catch (_) {
+            // Keep showing the preview
+        }
+    }
+
     // ── Document Viewer ────────────────────────────────────────────
     const docViewer      = document.getElementById('docViewer');
     const docViewerFrame = document.getElementById('docViewerFrame');
     const docViewerTitle = document.getElementById('docViewerTitle');
     const docViewerClose = document.getElementById('docViewerClose');
+    const docViewerFull  = document.getElementById('docViewerFull');
+    let docViewerDoc = null;  // { base, page } of the document on screen
 
-    function openDocumentViewer(library, filename, page) {
-        const url = `/api/documents/${encodeURIComponent(library)}/${encodeURIComponent(filename)}#page=${page}&toolbar=0`;
+    function showInViewer(url) {
         // Force reload even if same URL — clear first, then set on next frame
         docViewerFrame.src = 'about:blank';
         requestAnimationFrame(() => { docViewerFrame.src = url; });
+    }
+
+    function openDocumentViewer(library, filename, page) {
+        const base = `/api/documents/${encodeURIComponent(library)}/${encodeURIComponent(filename)}`;
+        docViewerDoc = { base, page };
+        if (page > 0) {
+            // Just the cited page (a few KB), not the whole PDF
+            showInViewer(`${base}/pages/${page}#toolbar=0`);
+            docViewerFull.style.display = '';
+        } else {
+            showInViewer(`${base}#toolbar=0`);
+            docViewerFull.style.display = 'none';
+        }
         docViewerTitle.textContent = `${filename} — p.${page}`;
         document.body.classList.add('doc-viewer-open');
     }
 
+    docViewerFull.addEventListener('click', () => {
+        if (!docViewerDoc) return;
+        showInViewer(`${docViewerDoc.base}#page=${docViewerDoc.page}&toolbar=0`);
+        docViewerFull.style.display = 'none';
+    });
+
     function closeDocumentViewer() {
         document.body.classList.remove('doc-viewer-open');
         docViewerFrame.src = '';  // release PDF from browser memory
@@ -0,0 +1,185 @@
+"""
+Answer Cache — SQLite-backed store of fully streamed LLM answers.
+
+Entries are keyed by the normalized question, a hash of the system prompt,
+the temperature, the model and the ordered IDs of the retrieved source
+chunks, so a cached answer is only replayed when the LLM would have seen
+exactly the same context. Entries expire after a TTL and the least recently
+used ones are evicted once the cache grows past its byte budget.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.core.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_TTL_SECONDS,
+    ANSWER_CACHE_MAX_BYTES,
+    LLM_MODEL,
+)
+
+logger = logging.getLogger(__name__)
+
+_CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS answer_cache (
+        cache_key   TEXT PRIMARY KEY,
+        created_at  REAL NOT NULL,
+        last_access REAL NOT NULL,
+        size_bytes  INTEGER NOT NULL,
+        payload     TEXT NOT NULL
+    )
+"""
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Case-fold and collapse whitespace so trivial variations share a key."""
+    return _WHITESPACE_RE.sub(" ", question).strip().lower()
+
+
+def make_cache_key(
+    question: str,
+    system_prompt: str,
+    temperature: float,
+    source_ids: List[str],
+    history: Optional[list] = None,
+    model: str = LLM_MODEL,
+) -> str:
+    """Build the cache key for one chat turn."""
+    prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    parts = {
+        "q": normalize_question(question),
+        "prompt": prompt_hash,
+        "temperature": round(float(temperature), 4),
+        "model": model,
+        "sources": list(source_ids),
+    }
+    if history:
+        parts["history"] = hashlib.sha256(
+            json.dumps(history, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """Token-stream cache with TTL expiry and LRU size eviction."""
+
+    def __init__(self, path: str, ttl_seconds: int, max_bytes: int):
+        self.path = Path(path)
+        self.ttl = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_CREATE_TABLE)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_answer_cache_access "
+                "ON answer_cache (last_access)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Return the cached entry for a key, or None on a miss.
+
+        The entry is a dict with keys:
+            tokens (list of streamed deltas), usage (original token usage)
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            row = conn.execute(
+                "SELECT created_at, payload FROM answer_cache WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[0] > self.ttl:
+                conn.execute("DELETE FROM answer_cache WHERE cache_key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute(
+                "UPDATE answer_cache SET last_access = ? WHERE cache_key = ?",
+                (now, key),
+            )
+            conn.commit()
+        return json.loads(row[1])
+
+    def put(self, key: str, tokens: List[str], usage: Optional[Dict] = None) -> None:
+        """Store a completed answer and evict expired / excess entries."""
+        payload = json.dumps({"tokens": tokens, "usage": usage or {}}, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO answer_cache VALUES (?, ?, ?, ?, ?)",
+                (key, now, now, size, payload),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM answer_cache WHERE created_at < ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM answer_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for cache_key, size in conn.execute(
+            "SELECT cache_key, size_bytes FROM answer_cache ORDER BY last_access ASC"
+        ):
+            victims.append((cache_key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM answer_cache WHERE cache_key = ?", victims)
+        logger.info("Answer cache evicted %d entries", len(victims))
+
+    def clear(self) -> None:
+        """Drop every cached answer."""
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM answer_cache")
+            conn.commit()
+
+    def stats(self) -> Dict:
+        """Return entry count and total payload size."""
+        with self._lock:
+            row = self._get_conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM answer_cache"
+            ).fetchone()
+        return {"entries": row[0], "size_bytes": row[1], "max_bytes": self.max_bytes}
+
+
+# ── Lazy singleton ───────────────────────────────────────────────────────
+_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Return the shared answer cache, or None when caching is disabled."""
+    global _cache
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = AnswerCache(ANSWER_CACHE_PATH, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_BYTES)
+    return _cache
@@ -0,0 +1,331 @@
+"""
+Batch ingest — re-embed a library through the OpenAI Batch API.
+
+A full re-ingest through `embeddings.create` pays full price and shares the
+rate limit with the chat's query embeddings. Batch jobs cost half, run
+against their own limit and finish within 24 hours, which suits rebuilds.
+
+Everything lives under BATCH_INGEST_DIR/<library>/:
+
+    manifest.json           state of every job, rewritten atomically after each step
+    job-0000.jsonl          embedding requests, one chunk per line, custom_id = chunk id
+    job-0000.chunks.jsonl   text and metadata of those chunks
+
+A run chunks the PDFs and writes the job files once, uploads and submits
+each job, polls until the jobs finish and streams every output file into
+ChromaDB by custom ID as soon as its job completes. Because each step is
+recorded in the manifest, an interrupted run — or one started with
+`wait=False` — resumes where it stopped: nothing is re-chunked, re-uploaded
+or submitted twice (a job submitted just before a crash is found again by
+its metadata). Requests that failed or expired are resubmitted as a
+follow-up job, up to BATCH_INGEST_MAX_ATTEMPTS times.
+"""
+
+import base64
+import json
+import logging
+import os
+import shutil
+import time
+from array import array
+from pathlib import Path
+from typing import Optional
+
+from src.core.config import (
+    BATCH_INGEST_DIR,
+    BATCH_INGEST_JOB_CHUNKS,
+    BATCH_INGEST_MAX_ATTEMPTS,
+    BATCH_INGEST_POLL_SECONDS,
+    EMBED_BATCH_TIMEOUT,
+    EMBEDDING_MODEL,
+    LIBRARIES,
+)
+from src.core.http_transport import call_with_retries, get_openai_client
+from src.core.vector_store import add_chunks, collection_stats_local as collection_stats
+
+logger = logging.getLogger(__name__)
+
+_FINISHED = ("completed", "expired", "cancelled")  # output (possibly partial) is final
+_UPSERT_BATCH = 1000
+_LIST_PAGE = 100       # batches per batches.list page
+_CLOCK_SLACK = 300     # seconds of clock skew tolerated against the API's created_at
+
+
+class BatchIngestError(RuntimeError):
+    """A batch job was rejected or the job directory is unusable."""
+
+
+# ── Manifest and job files ───────────────────────────────────────────────
+
+
+def job_dir(library_key: str) -> Path:
+    return Path(BATCH_INGEST_DIR) / library_key
+
+
+def load_manifest(library_key: str) -> Optional[dict]:
+    path = job_dir(library_key) / "manifest.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_manifest(manifest: dict) -> None:
+    path = job_dir(manifest["library"]) / "manifest.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _write_job(directory: Path, name: str, ids: list, texts: list, metadatas: list, attempt: int) -> dict:
+    """Write the request file and chunk sidecar of one job; its manifest entry."""
+    with (directory / f"{name}.jsonl").open("w", encoding="utf-8") as requests, \
+            (directory / f"{name}.chunks.jsonl").open("w", encoding="utf-8") as chunks:
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            requests.write(json.dumps({
+                "custom_id": chunk_id,
+                "method": "POST",
+                "url": "/v1/embeddings",
+                "body": {"model": EMBEDDING_MODEL, "input": text, "encoding_format": "base64"},
+            }) + "\n")
+            chunks.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata}) + "\n")
+    return {
+        "name": name,
+        "chunks": len(ids),
+        "attempt": attempt,
+        "state": "prepared",  # → uploaded → submitted → stored
+        "file_id": None,
+        "batch_id": None,
+        "batch_status": None,
+        "stored": 0,
+        "failed": 0,
+    }
+
+
+def _read_chunks(directory: Path, name: str) -> dict:
+    """{chunk id: (text, metadata)} of one job."""
+    chunks = {}
+    with (directory / f"{name}.chunks.jsonl").open(encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            chunks[row["id"]] = (row["text"], row["metadata"])
+    return chunks
+
+
+def _load_chunks(library_key: str) -> dict:
+    # The chunking stack (langchain, PyMuPDF) is only needed to prepare a run
+    from src.core.ingest import load_library_chunks
+
+    return load_library_chunks(library_key)
+
+
+def prepare(library_key: str) -> dict:
+    """Chunk the library and write its job files and a fresh manifest."""
+    directory = job_dir(library_key)
+    if directory.exists():
+        shutil.rmtree(directory)
+    directory.mkdir(parents=True)
+
+    loaded = _load_chunks(library_key)
+    ids, texts, metadatas = loaded["ids"], loaded["texts"], loaded["metadatas"]
+    jobs = []
+    for n, i in enumerate(range(0, len(ids), BATCH_INGEST_JOB_CHUNKS)):
+        window = slice(i, i + BATCH_INGEST_JOB_CHUNKS)
+        jobs.append(_write_job(directory, f"job-{n:04d}", ids[window], texts[window], metadatas[window], 1))
+
+    manifest = {
+        "library": library_key,
+        "run_id": f"{library_key}-{int(time.time())}",
+        "model": EMBEDDING_MODEL,
+        "created_at": time.time(),
+        "total_files": len(loaded["pdf_files"]),
+        "total_chunks": len(ids),
+        "errors": loaded["errors"],
+        "jobs": jobs,
+    }
+    _save_manifest(manifest)
+    logger.info("  Prepared %d chunks in %d batch jobs under %s", len(ids), len(jobs), directory)
+    return manifest
+
+
+# ── Batch API steps ──────────────────────────────────────────────────────
+
+
+def _find_batch(client, metadata: dict, since: float):
+    """The batch created with `metadata` no earlier than `since`, if any."""
+    options = {"limit": _LIST_PAGE}
+    while True:
+        page = call_with_retries(client.batches.list, **options, deadline=EMBED_BATCH_TIMEOUT, bulk=True)
+        for batch in page.data:  # newest first
+            if batch.created_at < since:
+                return None
+            if (batch.metadata or {}) == metadata:
+                return batch
+        if not page.has_more or not page.data:
+            return None
+        options["after"] = page.data[-1].id
+
+
+def _submit(client, manifest: dict, job: dict) -> None:
+    """Upload the job file (once) and create its batch (once)."""
+    directory = job_dir(manifest["library"])
+    if job["state"] == "prepared":
+        uploaded = call_with_retries(
+            client.files.create,
+            file=directory / f"{job['name']}.jsonl",
+            purpose="batch",
+            deadline=EMBED_BATCH_TIMEOUT,
+            bulk=True,
+        )
+        job["file_id"], job["state"] = uploaded.id, "uploaded"
+        _save_manifest(manifest)
+
+    metadata = {"run_id": manifest["run_id"], "job": job["name"]}
+    # A crash between create and the manifest save would otherwise submit the job twice
+    batch = _find_batch(client, metadata, manifest["created_at"] - _CLOCK_SLACK)
+    if batch is None:
+        batch = call_with_retries(
+            client.batches.create,
+            input_file_id=job["file_id"],
+            endpoint="/v1/embeddings",
+            completion_window="24h",
+            metadata=metadata,
+            deadline=EMBED_BATCH_TIMEOUT,
+            bulk=True,
+        )
+    job.update(state="submitted", batch_id=batch.id, batch_status=batch.status)
+    _save_manifest(manifest)
+    logger.info("  Submitted %s (%d chunks) as %s", job["name"], job["chunks"], batch.id)
+
+
+def _embedding(body: dict) -> list:
+    data = body["data"][0]["embedding"]
+    if isinstance(data, str):  # encoding_format="base64": little-endian float32
+        vector = array("f")
+        vector.frombytes(base64.b64decode(data))
+        return vector.tolist()
+    return data
+
+
+def _store(client, manifest: dict, job: dict, batch) -> None:
+    """Stream a finished job's results into ChromaDB; resubmit what is missing."""
+    library_key = manifest["library"]
+    directory = job_dir(library_key)
+    chunks = _read_chunks(directory, job["name"])
+    stored = set()
+    pending = ([], [], [], [])
+
+    def flush():
+        if pending[0]:
+            add_chunks(library_key, *pending)
+            for column in pending:
+                column.clear()
+
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        with client.files.with_streaming_response.content(file_id) as response:
+            for line in response.iter_lines():
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                result = row.get("response") or {}
+                if row.get("error") or result.get("status_code") != 200 or row["custom_id"] not in chunks:
+                    continue
+                text, metadata = chunks[row["custom_id"]]
+                pending[0].append(row["custom_id"])
+                pending[1].append(_embedding(result["body"]))
+                pending[2].append(text)
+                pending[3].append(metadata)
+                stored.add(row["custom_id"])
+                if len(pending[0]) >= _UPSERT_BATCH:
+                    flush()
+    flush()
+
+    missing = [chunk_id for chunk_id in chunks if chunk_id not in stored]
+    job.update(state="stored", stored=len(stored), failed=len(missing))
+    if missing and job["attempt"] < BATCH_INGEST_MAX_ATTEMPTS:
+        name = f"{job['name'].split('-r')[0]}-r{job['attempt'] + 1}"
+        manifest["jobs"].append(_write_job(
+            directory, name, missing,
+            [chunks[i][0] for i in missing], [chunks[i][1] for i in missing],
+            job["attempt"] + 1,
+        ))
+        logger.warning("  %s: %d requests failed, resubmitting as %s", job["name"], len(missing), name)
+    elif missing:
+        logger.error("  %s: %d chunks still failing after %d attempts", job["name"], len(missing), job["attempt"])
+    _save_manifest(manifest)
+    logger.info("  Stored %s: %d embeddings (%s)", job["name"], len(stored), batch.status)
+
+
+def _advance(client, manifest: dict, job: dict) -> None:
+    """Move one job forward as far as it can go without waiting."""
+    if job["state"] in ("prepared", "uploaded"):
+        _submit(client, manifest, job)
+    if job["state"] != "submitted":
+        return
+    batch = call_with_retries(client.batches.retrieve, job["batch_id"], deadline=EMBED_BATCH_TIMEOUT, bulk=True)
+    if batch.status != job["batch_status"]:
+        job["batch_status"] = batch.status
+        _save_manifest(manifest)
+    if batch.status == "failed":
+        errors = [e.message for e in (batch.errors.data if batch.errors else [])]
+        raise BatchIngestError(f"Batch {batch.id} ({job['name']}) failed: {'; '.join(errors) or 'no details'}")
+    if batch.status in _FINISHED:
+        _store(client, manifest, job, batch)
+
+
+# ── Entry point ──────────────────────────────────────────────────────────
+
+
+def ingest_library_batch(
+    library_key: str,
+    wait: bool = True,
+    poll_seconds: float = BATCH_INGEST_POLL_SECONDS,
+    fresh: bool = False,
+) -> dict:
+    """
+    Ingest a library through batch jobs, resuming an unfinished run.
+
+    With wait=False the call returns after submitting and storing whatever
+    has finished; run it again later to continue. Returns the ingest_library
+    summary plus `jobs` and `pending_jobs`.
+    """
+    lib = LIBRARIES[library_key]
+    logger.info("═══ Batch ingest: %s ═══", lib["name"])
+    start_time = time.time()
+
+    manifest = None if fresh else load_manifest(library_key)
+    if manifest is not None and manifest["model"] != EMBEDDING_MODEL:
+        raise BatchIngestError(
+            f"{job_dir(library_key)} was prepared for {manifest['model']}; rerun with fresh=True"
+        )
+    if manifest is None:
+        manifest = prepare(library_key)
+    else:
+        logger.info("  Resuming %s", manifest["run_id"])
+
+    client = get_openai_client()
+    while True:
+        for job in list(manifest["jobs"]):  # _store may append retry jobs
+            _advance(client, manifest, job)
+        pending = [job["name"] for job in manifest["jobs"] if job["state"] != "stored"]
+        if not pending or not wait:
+            break
+        logger.info("  Waiting on %d batch jobs ...", len(pending))
+        time.sleep(poll_seconds)
+
+    finals = [job for job in manifest["jobs"] if job["state"] == "stored"]
+    return {
+        "library": library_key,
+        "library_name": lib["name"],
+        "total_files": manifest["total_files"],
+        "total_chunks": manifest["total_chunks"],
+        "collection_count": collection_stats(library_key)["count"],
+        "errors": manifest["errors"] + [
+            f"{job['name']}: {job['failed']} chunks not embedded"
+            for job in finals if job["failed"] and job["attempt"] >= BATCH_INGEST_MAX_ATTEMPTS
+        ],
+        "elapsed_seconds": round(time.time() - start_time, 1),
+        "jobs": len(manifest["jobs"]),
+        "pending_jobs": pending,
+    }
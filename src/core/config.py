@@ -18,14 +18,46 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
 
 # ── OpenAI ───────────────────────────────────────────────────────────────
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # e.g. a local stand-in server
+
+# ── HTTP Transport ───────────────────────────────────────────────────────
+# One keep-alive connection pool shared by every OpenAI call in the process
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+# Per-call deadlines (seconds), covering all retry attempts of one call
+EMBED_QUERY_TIMEOUT = float(os.getenv("EMBED_QUERY_TIMEOUT", "10"))
+EMBED_BATCH_TIMEOUT = float(os.getenv("EMBED_BATCH_TIMEOUT", "120"))
+CLASSIFIER_TIMEOUT = float(os.getenv("CLASSIFIER_TIMEOUT", "5"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "300"))
+# Retries are capped per call and, process-wide, to a fraction of traffic
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))
+# Bulk calls (ingest) retry longer and outside the budget
+RETRY_BULK_MAX_ATTEMPTS = int(os.getenv("RETRY_BULK_MAX_ATTEMPTS", "8"))
+RETRY_BULK_MAX_BACKOFF = float(os.getenv("RETRY_BULK_MAX_BACKOFF", "30"))   # seconds
+# Hedged query embeddings: fire a second request after the observed p95
+EMBED_HEDGE_ENABLED = os.getenv("EMBED_HEDGE_ENABLED", "false").lower() == "true"
+EMBED_HEDGE_DELAY_MS = float(os.getenv("EMBED_HEDGE_DELAY_MS", "400"))  # until p95 is known
 
 # ── Security ─────────────────────────────────────────────────────────────
 API_ACCESS_KEY = os.getenv("API_ACCESS_KEY", "")
+# Unlocks admin-only switches such as per-request profiling (off when empty)
+ADMIN_ACCESS_KEY = os.getenv("ADMIN_ACCESS_KEY", "")
 
 # ── Embedding ────────────────────────────────────────────────────────────
 EMBEDDING_MODEL = "text-embedding-3-large"
 EMBEDDING_DIMENSIONS = 3072  # text-embedding-3-large native dimension
 EMBEDDING_BATCH_SIZE = 500   # chunks per API call
+# Query embeddings kept in memory (LRU); identical text always embeds the same
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "1024"))
+# Offline re-ingest through the Batch API (scripts/run_ingest.py --batch):
+# half price, and its own rate limit, so query embeddings are not throttled
+BATCH_INGEST_DIR = str(PROJECT_ROOT / os.getenv("BATCH_INGEST_DIR", "./data/batch_jobs"))
+BATCH_INGEST_JOB_CHUNKS = int(os.getenv("BATCH_INGEST_JOB_CHUNKS", "10000"))   # requests per job (API max 50,000)
+BATCH_INGEST_POLL_SECONDS = float(os.getenv("BATCH_INGEST_POLL_SECONDS", "60"))
+BATCH_INGEST_MAX_ATTEMPTS = int(os.getenv("BATCH_INGEST_MAX_ATTEMPTS", "3"))   # resubmissions of failed requests
 
 # ── Chunking ─────────────────────────────────────────────────────────────
 CHUNK_SIZE = 1000       # characters
@@ -33,6 +65,20 @@ CHUNK_OVERLAP = 200     # characters
 
 # ── Vector Store ─────────────────────────────────────────────────────────
 VECTOR_DB_PATH = str(PROJECT_ROOT / os.getenv("VECTOR_DB_PATH", "./data/chromadb"))
+# Retrieval service (scripts/run_retrieval_server.py) owning the index so web
+# workers don't each load it: "unix:/path/to.sock" or "tcp:host:port";
+# empty = open ChromaDB in this process
+RETRIEVAL_SERVICE = os.getenv("RETRIEVAL_SERVICE", "")
+# Libraries on other nodes, hash-partitioned when a library lists several
+# (see src/core/shard_router.py): "wac_chapters=tcp:h1:7070|tcp:h2:7070;*=tcp:h3:7070"
+RETRIEVAL_SHARDS = os.getenv("RETRIEVAL_SHARDS", "")
+RETRIEVAL_TIMEOUT_SECONDS = float(os.getenv("RETRIEVAL_TIMEOUT_SECONDS", "5"))   # per node request
+RETRIEVAL_SHARD_FAILURES = int(os.getenv("RETRIEVAL_SHARD_FAILURES", "2"))       # then skipped for a cooldown
+RETRIEVAL_SERVER_THREADS = int(os.getenv("RETRIEVAL_SERVER_THREADS", "4"))  # concurrent Chroma queries
+# In-process cache of retrieve() results for identical queries (0 = off);
+# useful for batch runs, off by default so a re-ingested index is seen at once
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "0"))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "600"))
 
 # ── LLM ──────────────────────────────────────────────────────────────────
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-5.1")
@@ -40,6 +86,88 @@ LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
 LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "8192"))
 CONVERSATION_MEMORY_SIZE = int(os.getenv("CONVERSATION_MEMORY_SIZE", "20"))
 
+# ── Streaming ────────────────────────────────────────────────────────────
+# Consecutive token deltas are merged into one SSE frame per time window or
+# byte budget, whichever comes first. Set SSE_COALESCE_MS=0 to disable.
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "40"))
+SSE_COALESCE_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "1024"))
+# The `sources` event carries only a preview; full text is served by /api/chunks
+SOURCE_PREVIEW_CHARS = int(os.getenv("SOURCE_PREVIEW_CHARS", "160"))
+# Send a per-stage `timing` event on every turn (clients can also ask per request)
+SSE_TIMING_EVENTS = os.getenv("SSE_TIMING_EVENTS", "false").lower() == "true"
+
+# ── Answer Cache ─────────────────────────────────────────────────────────
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_PATH = str(PROJECT_ROOT / os.getenv("ANSWER_CACHE_PATH", "./data/answer_cache.db"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Only history-free first turns are cached unless this is switched on
+ANSWER_CACHE_WITH_HISTORY = os.getenv("ANSWER_CACHE_WITH_HISTORY", "false").lower() == "true"
+
+# ── Search API ───────────────────────────────────────────────────────────
+# /api/search: ranked results are fetched SEARCH_PAGE_DEPTH at a time and
+# cached in memory, so consecutive pages usually share one search
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+SEARCH_PAGE_DEPTH = int(os.getenv("SEARCH_PAGE_DEPTH", "50"))
+SEARCH_MAX_DEPTH = int(os.getenv("SEARCH_MAX_DEPTH", "200"))   # deepest rank a cursor can reach
+SEARCH_BATCH_MAX = int(os.getenv("SEARCH_BATCH_MAX", "20"))    # queries per request
+
+# ── Shares ───────────────────────────────────────────────────────────────
+SHARES_DB_PATH = str(PROJECT_ROOT / os.getenv("SHARES_DB_PATH", "./data/shares.db"))
+SHARES_POOL_SIZE = int(os.getenv("SHARES_POOL_SIZE", "4"))              # SQLite connections
+# "auto" (zstd if the zstandard package is installed, else gzip), "zstd", "gzip" or "none"
+SHARES_COMPRESSION = os.getenv("SHARES_COMPRESSION", "auto").lower()
+SHARES_CACHE_MAX_BYTES = int(os.getenv("SHARES_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# ── Document Serving ─────────────────────────────────────────────────────
+# The filename → path index re-walks a library only when a directory mtime changed
+DOCUMENT_INDEX_REFRESH_SECONDS = float(os.getenv("DOCUMENT_INDEX_REFRESH_SECONDS", "60"))
+# Cited pages extracted as small PDFs / PNGs, cached on disk (LRU by size)
+PAGE_CACHE_DIR = str(PROJECT_ROOT / os.getenv("PAGE_CACHE_DIR", "./data/page_cache"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+PAGE_EXTRACT_MAX_PAGES = int(os.getenv("PAGE_EXTRACT_MAX_PAGES", "10"))
+
+# ── Logging ──────────────────────────────────────────────────────────────
+# Session / retrieval logs are written by a background thread in batches
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))      # seconds
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "200"))                # records
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))                # records
+LOG_ROTATE_BYTES = int(os.getenv("LOG_ROTATE_BYTES", str(50 * 1024 * 1024)))
+LOG_ROTATE_SECONDS = int(os.getenv("LOG_ROTATE_SECONDS", str(24 * 3600)))
+LOG_ROTATE_KEEP = int(os.getenv("LOG_ROTATE_KEEP", "30"))               # gz files per log
+
+# ── Profiling ────────────────────────────────────────────────────────────
+# Stack sampling period for admin-requested profiles (logs/profiles/)
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+# ── Shared State ─────────────────────────────────────────────────────────
+# Sessions and rate-limit counters: "sqlite" (WAL file shared by every worker
+# on this host) or "memory" (single process, not persisted)
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "sqlite").lower()
+SHARED_STATE_PATH = str(PROJECT_ROOT / os.getenv("SHARED_STATE_PATH", "./data/state.db"))
+# Worker processes serving the app (uvicorn reads the same variable)
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Per-IP rate-limit buckets kept in memory per worker (least recently seen dropped)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# ── Sessions ─────────────────────────────────────────────────────────────
+# Chat session state: a bounded in-memory tier over the shared-state backend,
+# written behind with one worker and written through with several
+SESSION_MAX_RESIDENT = int(os.getenv("SESSION_MAX_RESIDENT", "2000"))           # sessions in memory
+SESSION_IDLE_TTL_SECONDS = int(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600"))   # then evicted to disk
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "2.0"))      # seconds
+SESSION_RETENTION_DAYS = float(os.getenv("SESSION_RETENTION_DAYS", "90"))       # 0 = keep forever
+
+# ── Admission Control ────────────────────────────────────────────────────
+# Global caps on concurrent chat turns per stage; excess turns wait in a
+# bounded FIFO queue and are shed with 503 once the queue is full. The caps
+# are for the whole host: with WORKERS > 1 each worker gets an equal share
+# (at least 1), since every worker process gates on its own.
+ADMISSION_RETRIEVAL_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_RETRIEVAL_MAX_IN_FLIGHT", "8"))
+ADMISSION_LLM_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_LLM_MAX_IN_FLIGHT", "16"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+
 # ── Default System Prompt ────────────────────────────────────────────────
 DEFAULT_SYSTEM_PROMPT = """ROLE
 You are a Self-Correcting Regulatory Auditor. Your primary goal, when asked,
@@ -128,6 +256,14 @@ OUTPUT FORMAT
 # ── Document Libraries ──────────────────────────────────────────────────
 ALL_DOCUMENTS_DIR = PROJECT_ROOT / "All Documents"
 
+# HNSW index parameters per library, sized to collection scale. M and
+# construction_ef only apply when a collection is created (re-ingest to
+# change them); search_ef is also applied to existing collections. Tune
+# with `python -m benchmarks.bench_hnsw` (target recall@k >= 0.99).
+_HNSW_SMALL = {"M": 16, "construction_ef": 100, "search_ef": 64}     # < 10k chunks
+_HNSW_MEDIUM = {"M": 16, "construction_ef": 200, "search_ef": 100}   # 10k–100k
+_HNSW_LARGE = {"M": 32, "construction_ef": 200, "search_ef": 128}    # >= 100k
+
 LIBRARIES = {
     "ibc_wa_docs": {
         "name": "IBC WA Docs",
@@ -139,6 +275,7 @@ LIBRARIES = {
             "fire safety regulations, energy efficiency codes, structural design, "
             "IBC, IRC, IFC, IMC, IECC, or WA amendments to international codes."
         ),
+        "hnsw": _HNSW_SMALL,
     },
     "rcw_chapters": {
         "name": "RCW Chapters",
@@ -149,6 +286,7 @@ LIBRARIES = {
             "applicable to the entire state. Covers criminal law, family law, landlord-tenant, "
             "business regulations, real property, and all other RCW titles."
         ),
+        "hnsw": _HNSW_LARGE,
     },
     "smc_chapters": {
         "name": "SMC Chapters",
@@ -159,6 +297,7 @@ LIBRARIES = {
             "regulations, noise control, building permits, or other municipal codes "
             "specific to Seattle."
         ),
+        "hnsw": _HNSW_MEDIUM,
     },
     "spu_design_standards": {
         "name": "SPU Design Standards",
@@ -170,6 +309,7 @@ LIBRARIES = {
             "water system specifications, pump stations, SCADA, or physical security "
             "for utility facilities."
         ),
+        "hnsw": _HNSW_SMALL,
     },
     "seattle_dir_rules": {
         "name": "Seattle DIR Rules",
@@ -181,6 +321,7 @@ LIBRARIES = {
             "guidelines, Director's Rules, RRIO, green factor, tree protection, or how "
             "city codes are applied or enforced by specific departments."
         ),
+        "hnsw": _HNSW_SMALL,
     },
     "wac_chapters": {
         "name": "WAC Chapters",
@@ -192,6 +333,7 @@ LIBRARIES = {
             "DSHS, DOH, etc). Covers environmental regs, licensing, health and safety, "
             "education, and all other WAC titles."
         ),
+        "hnsw": _HNSW_LARGE,
     },
     "wa_governor_orders": {
         "name": "WA Governor Orders",
@@ -202,6 +344,7 @@ LIBRARIES = {
             "emergency declarations, gubernatorial proclamations, or temporary mandates "
             "issued by the Governor."
         ),
+        "hnsw": _HNSW_SMALL,
     },
     "washington_court_opinions": {
         "name": "Washington Court Opinions",
@@ -212,6 +355,7 @@ LIBRARIES = {
             "or specific case names (e.g., 'State v. Smith'). Provides how laws have been "
             "interpreted in court and legal authority from past cases."
         ),
+        "hnsw": _HNSW_MEDIUM,
     },
 }
 
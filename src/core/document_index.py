@@ -0,0 +1,150 @@
+"""
+Document Index — filename → path lookup for the PDFs served to the viewer.
+
+Built once per library by walking its directory tree, then kept current by
+a background thread that compares directory mtimes (adding, removing or
+renaming a file changes its directory's mtime) and re-walks only libraries
+that changed. Resolving a document is a dictionary lookup instead of an
+`rglob` over thousands of files on every request.
+
+Only `.pdf` files that resolve inside ALL_DOCUMENTS_DIR are indexed, and a
+filename found in more than one place in a library is not served at all.
+The walks run in the warm-up task and the refresh thread only: until a
+library has been indexed, lookups raise DocumentIndexNotReady instead of
+walking the tree on the request path.
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.core.config import ALL_DOCUMENTS_DIR, DOCUMENT_INDEX_REFRESH_SECONDS, LIBRARIES
+
+logger = logging.getLogger(__name__)
+
+_AMBIGUOUS = None  # filename present more than once in a library
+
+
+class DocumentIndexNotReady(RuntimeError):
+    """The library has not been indexed yet (warm-up still running)."""
+
+
+class DocumentIndex:
+    """Per-library filename → resolved path map with mtime-driven refresh."""
+
+    def __init__(self, libraries: Dict[str, Path], root: Path, refresh_interval: float):
+        self.libraries = libraries
+        self.root = root.resolve()
+        self.refresh_interval = refresh_interval
+        self._files: Dict[str, Dict[str, Optional[Path]]] = {}
+        self._dir_mtimes: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _walk(self, library_key: str):
+        files: Dict[str, Optional[Path]] = {}
+        mtimes: Dict[str, float] = {}
+        lib_path = self.libraries[library_key]
+        root = str(self.root) + os.sep
+        for dirpath, _, filenames in os.walk(lib_path):
+            try:
+                mtimes[dirpath] = os.stat(dirpath).st_mtime
+            except OSError:
+                continue
+            for name in filenames:
+                if not name.lower().endswith(".pdf"):
+                    continue
+                if name in files:
+                    files[name] = _AMBIGUOUS
+                    continue
+                resolved = Path(dirpath, name).resolve()
+                # Whitelist: symlinks pointing outside the document root are skipped
+                files[name] = resolved if str(resolved).startswith(root) else _AMBIGUOUS
+        return files, mtimes
+
+    def build(self, library_key: str) -> None:
+        files, mtimes = self._walk(library_key)
+        with self._lock:
+            self._files[library_key] = files
+            self._dir_mtimes[library_key] = mtimes
+        logger.info("Indexed %d documents in %s", len(files), library_key)
+
+    def build_all(self) -> None:
+        for library_key in self.libraries:
+            self.build(library_key)
+
+    def _changed(self, library_key: str) -> bool:
+        known = self._dir_mtimes.get(library_key)
+        if known is None:
+            return True
+        for dirpath, mtime in known.items():
+            try:
+                if os.stat(dirpath).st_mtime != mtime:
+                    return True
+            except OSError:
+                return True  # directory removed
+        return False
+
+    def refresh(self) -> None:
+        """Re-walk every library whose directories changed since the last walk."""
+        for library_key in self.libraries:
+            if self._changed(library_key):
+                self.build(library_key)
+
+    def lookup(self, library_key: str, filename: str) -> Optional[Path]:
+        """
+        Resolved path of a PDF, or None if unknown, ambiguous or not allowed.
+        Raises DocumentIndexNotReady before the library's first walk.
+        """
+        if library_key not in self.libraries:
+            return None
+        if "/" in filename or "\\" in filename or ".." in filename:
+            return None
+        if not filename.lower().endswith(".pdf"):
+            return None
+        files = self._files.get(library_key)
+        if files is None:
+            raise DocumentIndexNotReady(library_key)
+        return files.get(filename)
+
+    # ── Background refresh ───────────────────────────────────────────
+
+    def start(self) -> None:
+        """Build the index (if needed) and start the refresh thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="document-index", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        self.refresh()
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Document index refresh failed: %s", e)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# ── Lazy singleton ───────────────────────────────────────────────────────
+_index: Optional[DocumentIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_document_index() -> DocumentIndex:
+    """Return the process-wide document index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DocumentIndex(
+                {key: lib["path"] for key, lib in LIBRARIES.items()},
+                ALL_DOCUMENTS_DIR,
+                DOCUMENT_INDEX_REFRESH_SECONDS,
+            )
+    return _index
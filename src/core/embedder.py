@@ -4,40 +4,108 @@ Uses text-embedding-3-large via the OpenAI API.
 """
 
 import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict
 from typing import Optional
+
 from openai import OpenAI
 
-from src.core.config import OPENAI_API_KEY, EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE
+from src.core.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    QUERY_EMBED_CACHE_SIZE,
+    EMBED_QUERY_TIMEOUT,
+    EMBED_BATCH_TIMEOUT,
+    EMBED_HEDGE_ENABLED,
+    EMBED_HEDGE_DELAY_MS,
+)
+from src.core.http_transport import (
+    LatencyTracker,
+    call_with_retries,
+    get_openai_client,
+    hedged_call,
+)
 
 logger = logging.getLogger(__name__)
 
-_client: Optional[OpenAI] = None
+# Recent embed_query latencies; the p95 becomes the hedge delay
+_query_latency = LatencyTracker()
+
+
+class QueryEmbeddingCache:
+    """LRU of query text → embedding, held as float32 (12 KB per 3072-dim vector)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> Optional[list]:
+        with self._lock:
+            vector = self._entries.get(text)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+        return vector.tolist()
+
+    def put(self, text: str, vector: list) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[text] = array("f", vector)
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_query_cache = QueryEmbeddingCache(QUERY_EMBED_CACHE_SIZE)
 
 
 def _get_client() -> OpenAI:
-    global _client
-    if _client is None:
-        _client = OpenAI(api_key=OPENAI_API_KEY)
-    return _client
+    return get_openai_client()
 
 
-def embed_texts(texts: list[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> list[list[float]]:
+def embed_texts(
+    texts: list[str],
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    bulk: bool = True,
+    deadline: float = EMBED_BATCH_TIMEOUT,
+    hedge: bool = False,
+) -> list[list[float]]:
     """
     Embed a list of texts using OpenAI's embedding API.
 
     Processes in batches to stay within API limits.
-    Returns a list of embedding vectors (list of floats).
+    Returns a list of embedding vectors (list of floats). Calls retry as
+    bulk work (ingest) unless bulk=False. Each batch gets `deadline`
+    seconds; with hedge=True it is hedged like embed_query.
     """
     client = _get_client()
     all_embeddings: list[list[float]] = []
 
     for i in range(0, len(texts), batch_size):
         batch = texts[i : i + batch_size]
-        try:
-            response = client.embeddings.create(
+
+        def _call():
+            return call_with_retries(
+                client.embeddings.create,
                 model=EMBEDDING_MODEL,
                 input=batch,
+                deadline=deadline,
+                bulk=bulk,
             )
+
+        try:
+            if hedge:
+                response = hedged_call(_call, _query_latency, EMBED_HEDGE_DELAY_MS / 1000)
+            else:
+                response = _call()
             batch_embeddings = [item.embedding for item in response.data]
             all_embeddings.extend(batch_embeddings)
             logger.info(
@@ -54,10 +122,59 @@ def embed_texts(texts: list[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> lis
 
 
 def embed_query(text: str) -> list[float]:
-    """Embed a single query string."""
+    """
+    Embed a single query string.
+
+    This sits on the critical path of every chat turn, so it runs under a
+    short deadline and, when EMBED_HEDGE_ENABLED is set, is hedged with a
+    duplicate request after the observed p95 latency. Repeated queries are
+    answered from an in-memory LRU.
+    """
+    cached = _query_cache.get(text)
+    if cached is not None:
+        return cached
     client = _get_client()
-    response = client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=[text],
-    )
-    return response.data[0].embedding
+
+    def _call():
+        return call_with_retries(
+            client.embeddings.create,
+            model=EMBEDDING_MODEL,
+            input=[text],
+            deadline=EMBED_QUERY_TIMEOUT,
+        )
+
+    if EMBED_HEDGE_ENABLED:
+        response = hedged_call(_call, _query_latency, EMBED_HEDGE_DELAY_MS / 1000)
+    else:
+        start = time.monotonic()
+        response = _call()
+        _query_latency.record(time.monotonic() - start)
+    vector = response.data[0].embedding
+    _query_cache.put(text, vector)
+    return vector
+
+
+def embed_queries(texts: list[str]) -> list[list[float]]:
+    """
+    Embed several queries with one API call per EMBEDDING_BATCH_SIZE
+    distinct uncached texts. The results also land in the query cache, so
+    later `embed_query` calls for the same texts are free. Like
+    embed_query this is on the request path, so it runs under
+    EMBED_QUERY_TIMEOUT and is hedged when EMBED_HEDGE_ENABLED is set.
+    """
+    vectors = {}
+    missing = []
+    for text in dict.fromkeys(texts):
+        cached = _query_cache.get(text)
+        if cached is None:
+            missing.append(text)
+        else:
+            vectors[text] = cached
+    if missing:
+        embedded = embed_texts(
+            missing, bulk=False, deadline=EMBED_QUERY_TIMEOUT, hedge=EMBED_HEDGE_ENABLED,
+        )
+        for text, vector in zip(missing, embedded):
+            _query_cache.put(text, vector)
+            vectors[text] = vector
+    return [vectors[text] for text in texts]
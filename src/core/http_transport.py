@@ -0,0 +1,291 @@
+"""
+Shared HTTP transport for OpenAI calls.
+
+Every OpenAI client in the process rides on one tuned keep-alive connection
+pool, over HTTP/2 (`h2`, see requirements.txt). Calls get explicit
+deadlines, retries honor the server's Retry-After and are limited both per
+call and by a process-wide retry budget, and latency-critical calls can be
+hedged. Bulk calls (ingest) retry longer and outside the budget, so a
+re-ingest rides out sustained rate limiting instead of aborting.
+"""
+
+import asyncio
+import email.utils
+import importlib.util
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, TypeVar
+
+import httpx
+import openai
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from src.core.config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BUDGET_RATIO,
+    RETRY_BULK_MAX_ATTEMPTS,
+    RETRY_BULK_MAX_BACKOFF,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Transient failures worth retrying; anything else (4xx, bad input) is not
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    # Read/write deadlines are set per call; this is only the fallback
+    return httpx.Timeout(60.0, connect=HTTP_CONNECT_TIMEOUT)
+
+
+# ── Retry budget ─────────────────────────────────────────────────────────
+
+
+class RetryBudget:
+    """
+    Process-wide cap on retries as a fraction of recent calls.
+
+    Each call deposits `ratio` tokens and each retry (or hedge) withdraws
+    one, so during an outage retries cannot multiply upstream load by more
+    than (1 + ratio). A small floor keeps retries possible at low traffic.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, max_tokens: float = 10.0, floor: float = 2.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = floor
+        self._lock = threading.Lock()
+
+    def record_call(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+retry_budget = RetryBudget()
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After / retry-after-ms)."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        return float(headers["retry-after-ms"]) / 1000
+    except (KeyError, ValueError):
+        pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:  # HTTP date
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_pause(error: Exception, attempt: int, remaining: float, bulk: bool) -> Optional[float]:
+    """
+    Seconds to wait before retry number `attempt`, or None to give up.
+
+    The pause is the exponential backoff or the server's Retry-After,
+    whichever is longer. Interactive calls draw each retry from the
+    process-wide budget; bulk calls get more attempts and longer backoff
+    and are exempt from it, so ingest neither starves chat of retries nor
+    gives up when chat traffic has used the budget.
+    """
+    if bulk:
+        max_attempts, pause = RETRY_BULK_MAX_ATTEMPTS, min(RETRY_BULK_MAX_BACKOFF, 0.5 * (2 ** attempt))
+    else:
+        max_attempts, pause = RETRY_MAX_ATTEMPTS, min(2.0, 0.2 * (2 ** attempt))
+    pause = max(pause, _retry_after(error) or 0.0)
+    if attempt >= max_attempts or remaining <= pause:
+        return None
+    if not bulk and not retry_budget.try_spend():
+        return None
+    return pause
+
+
+def call_with_retries(fn: Callable[..., T], *args, deadline: float, bulk: bool = False, **kwargs) -> T:
+    """
+    Call an OpenAI SDK method with a total deadline and budgeted retries.
+
+    `fn` must accept a `timeout` keyword; each attempt gets whatever is left
+    of the deadline, so retries never extend the call past it. Pass
+    bulk=True for background work such as ingest (see _retry_pause).
+    """
+    start = time.monotonic()
+    if not bulk:
+        retry_budget.record_call()
+    attempt = 0
+    while True:
+        remaining = deadline - (time.monotonic() - start)
+        try:
+            return fn(*args, timeout=max(remaining, 0.05), **kwargs)
+        except RETRYABLE_ERRORS as e:
+            attempt += 1
+            pause = _retry_pause(e, attempt, deadline - (time.monotonic() - start), bulk)
+            if pause is None:
+                raise
+            logger.warning("Retrying OpenAI call after %s in %.1fs (attempt %d)", type(e).__name__, pause, attempt + 1)
+            time.sleep(pause)
+
+
+async def acall_with_retries(fn: Callable[..., T], *args, deadline: float, bulk: bool = False, **kwargs) -> T:
+    """Async variant of call_with_retries."""
+    start = time.monotonic()
+    if not bulk:
+        retry_budget.record_call()
+    attempt = 0
+    while True:
+        remaining = deadline - (time.monotonic() - start)
+        try:
+            return await fn(*args, timeout=max(remaining, 0.05), **kwargs)
+        except RETRYABLE_ERRORS as e:
+            attempt += 1
+            pause = _retry_pause(e, attempt, deadline - (time.monotonic() - start), bulk)
+            if pause is None:
+                raise
+            logger.warning("Retrying OpenAI call after %s in %.1fs (attempt %d)", type(e).__name__, pause, attempt + 1)
+            await asyncio.sleep(pause)
+
+
+# ── Hedging ──────────────────────────────────────────────────────────────
+
+
+class LatencyTracker:
+    """Rolling window of call latencies used to pick the hedge delay."""
+
+    def __init__(self, window: int = 500, min_samples: int = 20):
+        self._samples: deque = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+    return _hedge_pool
+
+
+def hedged_call(fn: Callable[[], T], tracker: LatencyTracker, default_delay: float) -> T:
+    """
+    Run `fn`, firing a duplicate if it has not returned after the p95
+    latency seen so far, and return whichever finishes successfully first.
+
+    Hedges draw from the retry budget, so a slow upstream never sees more
+    than a small fraction of extra traffic. The losing request is left to
+    finish in the background.
+    """
+    pool = _get_hedge_pool()
+    start = time.monotonic()
+    delay = tracker.percentile(0.95) or default_delay
+
+    pending = {pool.submit(fn)}
+    done, pending = wait(pending, timeout=delay)
+    if not done and retry_budget.try_spend():
+        logger.debug("Hedging request after %.0f ms", delay * 1000)
+        pending.add(pool.submit(fn))
+
+    error: Optional[BaseException] = None
+    while True:
+        for future in done:
+            if future.exception() is None:
+                tracker.record(time.monotonic() - start)
+                return future.result()
+            error = future.exception()
+        if not pending:
+            raise error
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+
+# ── Shared clients ───────────────────────────────────────────────────────
+
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client() -> OpenAI:
+    """Process-wide sync OpenAI client on the shared connection pool."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OpenAI(
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_BASE_URL,
+                max_retries=0,  # retries go through call_with_retries
+                http_client=DefaultHttpxClient(
+                    limits=_limits(), timeout=_timeout(), http2=HTTP2_AVAILABLE,
+                ),
+            )
+            logger.info("OpenAI HTTP pool ready (http2=%s)", HTTP2_AVAILABLE)
+    return _client
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Process-wide async OpenAI client on its own shared connection pool."""
+    global _async_client
+    with _client_lock:
+        if _async_client is None:
+            _async_client = AsyncOpenAI(
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_BASE_URL,
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(
+                    limits=_limits(), timeout=_timeout(), http2=HTTP2_AVAILABLE,
+                ),
+            )
+    return _async_client
@@ -13,7 +13,7 @@ from src.core.config import LIBRARIES, EMBEDDING_BATCH_SIZE
 from src.core.pdf_loader import extract_pdf, find_pdfs
 from src.core.chunker import chunk_pages, build_splitter
 from src.core.embedder import embed_texts
-from src.core.vector_store import add_chunks, collection_stats
+from src.core.vector_store import add_chunks, collection_stats_local as collection_stats
 
 logger = logging.getLogger(__name__)
 
@@ -24,26 +24,17 @@ def _make_chunk_id(library_key: str, source_file: str, chunk_index: int) -> str:
     return hashlib.md5(raw.encode()).hexdigest()
 
 
-def ingest_library(library_key: str) -> dict:
+def load_library_chunks(library_key: str) -> dict:
     """
-    Ingest all PDFs for a single library.
+    Extract and chunk every PDF of a library.
 
-    Returns a summary dict:
-        library, total_files, total_chunks, errors, elapsed_seconds
+    Returns a dict: pdf_files, ids, texts, metadatas, errors
     """
     lib = LIBRARIES[library_key]
-    lib_path: Path = lib["path"]
-    logger.info("═══ Ingesting library: %s (%s) ═══", lib["name"], lib_path)
-
-    pdf_files = find_pdfs(lib_path)
-    if not pdf_files:
-        logger.warning("No PDFs found in %s", lib_path)
-        return {"library": library_key, "total_files": 0, "total_chunks": 0, "errors": [], "elapsed_seconds": 0}
-
+    pdf_files = find_pdfs(lib["path"])
     splitter = build_splitter()
     all_chunks: list[dict] = []
     errors: list[str] = []
-    start_time = time.time()
 
     for pdf_path in tqdm(pdf_files, desc=f"  Loading {lib['name']}", unit="file"):
         try:
@@ -57,14 +48,38 @@ def ingest_library(library_key: str) -> dict:
             errors.append(f"Error {pdf_path.name}: {e}")
             logger.error("Failed to process %s: %s", pdf_path.name, e)
 
-    if not all_chunks:
+    return {
+        "pdf_files": pdf_files,
+        "ids": [_make_chunk_id(library_key, c["metadata"]["source_file"], c["metadata"]["chunk_index"]) for c in all_chunks],
+        "texts": [c["text"] for c in all_chunks],
+        "metadatas": [c["metadata"] for c in all_chunks],
+        "errors": errors,
+    }
+
+
+def ingest_library(library_key: str) -> dict:
+    """
+    Ingest all PDFs for a single library.
+
+    Returns a summary dict:
+        library, total_files, total_chunks, errors, elapsed_seconds
+    """
+    lib = LIBRARIES[library_key]
+    lib_path: Path = lib["path"]
+    logger.info("═══ Ingesting library: %s (%s) ═══", lib["name"], lib_path)
+
+    start_time = time.time()
+    loaded = load_library_chunks(library_key)
+    pdf_files, errors = loaded["pdf_files"], loaded["errors"]
+    if not pdf_files:
+        logger.warning("No PDFs found in %s", lib_path)
+        return {"library": library_key, "total_files": 0, "total_chunks": 0, "errors": [], "elapsed_seconds": 0}
+
+    if not loaded["ids"]:
         logger.warning("No chunks produced for %s", library_key)
         return {"library": library_key, "total_files": len(pdf_files), "total_chunks": 0, "errors": errors, "elapsed_seconds": time.time() - start_time}
 
-    # Build IDs, texts, metadatas
-    ids = [_make_chunk_id(library_key, c["metadata"]["source_file"], c["metadata"]["chunk_index"]) for c in all_chunks]
-    texts = [c["text"] for c in all_chunks]
-    metadatas = [c["metadata"] for c in all_chunks]
+    ids, texts, metadatas = loaded["ids"], loaded["texts"], loaded["metadatas"]
 
     # Embed in batches
     logger.info("  Embedding %d chunks via OpenAI ...", len(texts))
@@ -81,7 +96,7 @@ def ingest_library(library_key: str) -> dict:
         "library": library_key,
         "library_name": lib["name"],
         "total_files": len(pdf_files),
-        "total_chunks": len(all_chunks),
+        "total_chunks": len(ids),
         "collection_count": stats["count"],
         "errors": errors,
         "elapsed_seconds": round(elapsed, 1),
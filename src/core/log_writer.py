@@ -0,0 +1,228 @@
+"""
+Background log writer — batched JSONL appends off the request path.
+
+`write()` only enqueues a record; a daemon thread serializes queued records,
+appends them in batches (one open per file per batch) and rotates files by
+size or age into gzip-compressed archives. A full queue drops records
+rather than ever blocking a chat turn.
+
+Several workers append to the same files, so rotation is coordinated
+through a `<name>.lock` file next to each log: only the worker holding its
+flock rotates, and the lock file's mtime marks when the current log was
+started, so the age survives restarts and is the same for every worker.
+
+A worker that opened the log just before another renamed it away still
+appends to the renamed file. Rotated files are therefore only compressed
+(and the uncompressed copy deleted) once nothing has written to them for
+a flush interval; a worker stalled between open() and write() for longer
+than that could still lose its batch.
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-worker development only
+    fcntl = None
+
+from src.core.config import (
+    LOG_FLUSH_INTERVAL,
+    LOG_BATCH_SIZE,
+    LOG_QUEUE_MAX,
+    LOG_ROTATE_BYTES,
+    LOG_ROTATE_SECONDS,
+    LOG_ROTATE_KEEP,
+)
+
+logger = logging.getLogger(__name__)
+
+_FLUSH = object()
+
+
+class LogWriter:
+    """Queue-backed JSONL writer with size/time rotation and compression."""
+
+    def __init__(
+        self,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        batch_size: int = LOG_BATCH_SIZE,
+        max_queue: int = LOG_QUEUE_MAX,
+        rotate_bytes: int = LOG_ROTATE_BYTES,
+        rotate_seconds: int = LOG_ROTATE_SECONDS,
+        keep: int = LOG_ROTATE_KEEP,
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.keep = keep
+        self.dropped = 0
+        self._unsettled: list = []  # (log, rotated file) pairs awaiting compression
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._closed = False
+        self._thread.start()
+
+    # ── Producer side (request path) ─────────────────────────────────────
+
+    def write(self, path: Path, record: dict) -> None:
+        """Enqueue a record for `path`. Never blocks; drops if the queue is full."""
+        try:
+            self._queue.put_nowait((Path(path), record))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Block until everything enqueued so far has been written."""
+        done = threading.Event()
+        try:
+            self._queue.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+
+    # ── Writer thread ────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        while True:
+            batch = []
+            waiters = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    path, item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if path is _FLUSH:
+                    waiters.append(item)
+                    break
+                batch.append((path, item))
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    logger.error("Log write failed (%d records lost): %s", len(batch), e)
+            if self._unsettled:
+                self._compress_settled()
+            for waiter in waiters:
+                waiter.set()
+
+    def _write_batch(self, batch: list) -> None:
+        by_path = defaultdict(list)
+        for path, record in batch:
+            by_path[path].append(json.dumps(record, ensure_ascii=False) + "\n")
+        for path, lines in by_path.items():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # One O_APPEND write per batch, so lines from other workers never interleave
+            with open(path, "ab", buffering=0) as f:
+                f.write("".join(lines).encode("utf-8"))
+            try:
+                self._maybe_rotate(path)
+            except OSError as e:
+                logger.warning("Log rotation of %s failed: %s", path.name, e)
+
+    def _due(self, path: Path, marker: Path) -> bool:
+        """Whether `path` has outgrown the size or age limit."""
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return False  # another worker has just rotated it
+        try:
+            started = marker.stat().st_mtime
+        except FileNotFoundError:
+            marker.touch()
+            return size >= self.rotate_bytes
+        return size >= self.rotate_bytes or time.time() - started >= self.rotate_seconds
+
+    def _maybe_rotate(self, path: Path) -> None:
+        marker = path.with_name(f"{path.name}.lock")
+        if not self._due(path, marker):
+            return
+        with open(marker, "a") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return  # another worker is rotating this file
+            # Re-check under the lock: the file may have been rotated meanwhile
+            if self._due(path, marker):
+                self._rotate(path, marker)
+
+    def _rotate(self, path: Path, marker: Path) -> None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        rotated = path.with_name(f"{path.stem}.{stamp}{path.suffix}")
+        n = 1
+        while rotated.exists() or Path(f"{rotated}.gz").exists():
+            rotated = path.with_name(f"{path.stem}.{stamp}-{n}{path.suffix}")
+            n += 1
+        os.replace(path, rotated)
+        os.utime(marker)
+        logger.info("Rotated %s → %s", path.name, rotated.name)
+
+        # Includes files left uncompressed by a worker that exited meanwhile
+        pending = {r for _, r in self._unsettled}
+        for leftover in path.parent.glob(f"{path.stem}.*{path.suffix}"):
+            if leftover not in pending:
+                self._unsettled.append((path, leftover))
+
+    def _compress_settled(self) -> None:
+        """Gzip rotated files that nothing has appended to for a flush interval."""
+        waiting = []
+        for path, rotated in self._unsettled:
+            try:
+                if time.time() - rotated.stat().st_mtime < self.flush_interval:
+                    waiting.append((path, rotated))
+                    continue
+                with open(rotated, "rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                rotated.unlink()
+            except FileNotFoundError:
+                continue  # compressed by another worker
+            except OSError as e:
+                logger.warning("Compressing %s failed: %s", rotated.name, e)
+                continue
+            self._prune(path)
+        self._unsettled = waiting
+
+    def _prune(self, path: Path) -> None:
+        archives = sorted(
+            path.parent.glob(f"{path.stem}.*{path.suffix}.gz"), key=lambda p: p.stat().st_mtime,
+        )
+        for old in archives[:-self.keep] if self.keep else []:
+            old.unlink(missing_ok=True)
+
+
+# ── Lazy singleton ───────────────────────────────────────────────────────
+_writer: Optional[LogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> LogWriter:
+    """Return the process-wide log writer, starting it on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter()
+            atexit.register(_writer.close)
+    return _writer
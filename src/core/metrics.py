@@ -0,0 +1,197 @@
+"""
+Per-stage latency metrics with Prometheus text exposition.
+
+Code paths wrap each stage in `span("stage")`; the duration lands in a
+process-wide histogram and, when a chat turn is being timed (see
+`start_turn`), in that turn's `timings` dict, which is reported in the
+`timing` SSE event and the session log. No client library is needed —
+`render()` emits the Prometheus text format directly.
+
+Metrics are per process; with several workers, scrape each one.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+        for label_values, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for label_values, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class CallbackGauge:
+    """
+    Values read from a callback at scrape time, for state that already
+    lives elsewhere. Pass kind="counter" for monotonic totals.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Tuple[str, ...],
+        callback: Callable[[], Dict[Tuple[str, ...], float]],
+        kind: str = "gauge",
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.callback = callback
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for label_values, value in sorted(self.callback().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+# ── Registry ─────────────────────────────────────────────────────────────
+_registry: List = []
+
+
+def register(metric):
+    """Add a metric to the /metrics output (returns it for chaining)."""
+    _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = register(Histogram(
+    "rag_stage_duration_seconds",
+    "Duration of each chat pipeline stage.",
+    labels=("stage",),
+))
+SEARCH_SECONDS = register(Histogram(
+    "rag_vector_search_duration_seconds",
+    "Duration of one HNSW query against a ChromaDB collection.",
+    labels=("collection",),
+))
+TURNS_TOTAL = register(Counter(
+    "rag_chat_turns_total",
+    "Chat turns by outcome (answered, cached, error).",
+    labels=("outcome",),
+))
+
+
+# ── Per-turn timings ─────────────────────────────────────────────────────
+_turn_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("turn_timings", default=None)
+
+
+def start_turn() -> Dict[str, float]:
+    """
+    Begin collecting stage timings (in ms) for the current chat turn.
+
+    The returned dict is shared with worker threads started via
+    asyncio.to_thread, which copy the current context.
+    """
+    timings: Dict[str, float] = {}
+    _turn_timings.set(timings)
+    return timings
+
+
+def record(stage: str, seconds: float, collection: Optional[str] = None) -> None:
+    """Record a stage duration in the histograms and the current turn."""
+    if collection is None:
+        STAGE_SECONDS.observe(seconds, stage)
+        key = stage
+    else:
+        SEARCH_SECONDS.observe(seconds, collection)
+        key = f"{stage}:{collection}"
+    timings = _turn_timings.get()
+    if timings is not None:
+        timings[key] = round(timings.get(key, 0.0) + seconds * 1000, 1)
+
+
+@contextmanager
+def span(stage: str, collection: Optional[str] = None) -> Iterator[None]:
+    """Time the enclosed block as one pipeline stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, collection)
@@ -0,0 +1,141 @@
+"""
+Page Extract — single cited pages (or short ranges) cut out of large PDFs.
+
+The document viewer usually needs one page of a PDF that may be tens of
+megabytes. `extract_pages` renders that page, or a few consecutive pages,
+as a small standalone PDF or a PNG with PyMuPDF and keeps the result in an
+on-disk LRU cache bounded by PAGE_CACHE_MAX_BYTES. Cache keys include the
+source file's size and mtime, so a replaced PDF is never served stale.
+Files are written to a temporary name and renamed into place, so workers
+sharing the cache directory never see a partial file, and callers get the
+bytes rather than a path, so an eviction by another worker can't pull a
+file out from under a response.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.core.config import PAGE_CACHE_DIR, PAGE_CACHE_MAX_BYTES, PAGE_EXTRACT_MAX_PAGES
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"pdf": "application/pdf", "png": "image/png"}
+
+
+class PageRangeError(ValueError):
+    """Requested pages are outside the document or the range is too long."""
+
+
+class PageCache:
+    """Directory of extracted pages, evicted least recently used first by size."""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._sizes: Optional[Dict[Path, int]] = None  # scanned lazily
+        self._lock = threading.Lock()
+
+    def _scan(self) -> Dict[Path, int]:
+        if self._sizes is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._sizes = {p: p.stat().st_size for p in self.directory.glob("*.*") if not p.name.startswith(".")}
+        return self._sizes
+
+    def get(self, name: str) -> Optional[bytes]:
+        path = self.directory / name
+        try:
+            os.utime(path)  # mtime doubles as last access for eviction
+            return path.read_bytes()
+        except FileNotFoundError:  # never cached, or just evicted
+            return None
+
+    def put(self, name: str, data: bytes) -> None:
+        path = self.directory / name
+        with self._lock:
+            sizes = self._scan()
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            sizes[path] = len(data)
+            self._evict(sizes)
+
+    def _evict(self, sizes: Dict[Path, int]) -> None:
+        if sum(sizes.values()) <= self.max_bytes:
+            return
+        # Other workers write here too: rescan before deciding what to drop
+        self._sizes = None
+        sizes = self._scan()
+        total = sum(sizes.values())
+
+        def last_used(p: Path) -> float:
+            try:
+                return p.stat().st_mtime
+            except FileNotFoundError:
+                return 0.0
+        for path in sorted(sizes, key=last_used):
+            if total <= self.max_bytes * 0.9:
+                break
+            total -= sizes.pop(path)
+            path.unlink(missing_ok=True)
+
+
+def _cache_name(path: Path, first: int, last: int, fmt: str, dpi: int) -> str:
+    stat = path.stat()
+    raw = f"{path}|{stat.st_size}|{stat.st_mtime_ns}|{first}|{last}|{fmt}|{dpi}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:40] + "." + fmt
+
+
+def _render(path: Path, first: int, last: int, fmt: str, dpi: int) -> bytes:
+    import fitz  # PyMuPDF; imported on first use to keep it out of startup
+
+    with fitz.open(path) as src:
+        if first < 1 or last > src.page_count:
+            raise PageRangeError(f"Document has {src.page_count} pages")
+        if fmt == "png":
+            return src[first - 1].get_pixmap(dpi=dpi).tobytes("png")
+        with fitz.open() as out:
+            out.insert_pdf(src, from_page=first - 1, to_page=last - 1)
+            return out.tobytes(garbage=3, deflate=True)
+
+
+def extract_pages(path: Path, first: int, last: int, fmt: str = "pdf", dpi: int = 110) -> bytes:
+    """
+    Pages `first`–`last` (1-based, inclusive) of `path` as a PDF, or page
+    `first` as a PNG, from the cache or freshly rendered. Raises
+    PageRangeError.
+    """
+    if fmt not in FORMATS:
+        raise PageRangeError(f"Unknown format {fmt!r}")
+    if last < first or last - first + 1 > PAGE_EXTRACT_MAX_PAGES:
+        raise PageRangeError(f"Ask for 1–{PAGE_EXTRACT_MAX_PAGES} consecutive pages")
+    if fmt == "png" and last != first:
+        raise PageRangeError("PNG renders a single page")
+
+    cache = get_page_cache()
+    name = _cache_name(path, first, last, fmt, dpi)
+    cached = cache.get(name)
+    if cached is not None:
+        return cached
+    data = _render(path, first, last, fmt, dpi)
+    cache.put(name, data)
+    return data
+
+
+# ── Lazy singleton ───────────────────────────────────────────────────────
+_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    """Return the process-wide page cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache(Path(PAGE_CACHE_DIR), PAGE_CACHE_MAX_BYTES)
+    return _cache
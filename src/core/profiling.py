@@ -0,0 +1,170 @@
+"""
+On-demand sampling profiler for single slow requests.
+
+A daemon thread snapshots every thread's Python stack with
+`sys._current_frames()` at a fixed interval while one request runs, so the
+profiled code is never traced and pays only for the GIL hand-offs. Output
+goes to logs/profiles/:
+
+    <session>-<stamp>.folded   collapsed stacks (flamegraph.pl, speedscope)
+    <session>-<stamp>.txt      top functions by self and total samples
+
+Samples cover the whole process, so profile on a quiet worker when other
+requests would blur the picture. Nothing runs unless a profile is asked for.
+"""
+
+import asyncio
+import logging
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+
+from src.core.config import PROJECT_ROOT, PROFILE_INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+PROFILES_DIR = PROJECT_ROOT / "logs" / "profiles"
+
+# Leaf (file, function) of threads that are parked rather than working; a
+# bare thread-pool `_worker` leaf is blocked in its work queue
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+_UNSAFE_CHARS_RE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (Path(code.co_filename).name, code.co_name) in _IDLE_FRAMES
+
+
+class SamplingProfiler:
+    """Collects folded stacks of all busy threads until stopped."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if frames.keys() - names.keys():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own or _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Collapsed-stack text, one `frame;frame;... count` line per stack."""
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def summary(self, limit: int = 40) -> str:
+        """Top functions by self samples (leaf) and total samples (on stack)."""
+        own, total = Counter(), Counter()
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")[1:]  # drop the thread name
+            if not frames:
+                continue
+            own[frames[-1]] += n
+            for frame in set(frames):
+                total[frame] += n
+
+        interval_ms = self.interval * 1000
+        lines = [
+            f"{self.samples} samples at {interval_ms:g} ms over {self.duration:.3f} s",
+            "",
+            f"{'self':>8} {'total':>8}  function",
+        ]
+        for frame, n in own.most_common(limit):
+            lines.append(f"{n * interval_ms:>6.0f}ms {total[frame] * interval_ms:>6.0f}ms  {frame}")
+        lines += ["", f"{'total':>8}  function (cumulative)"]
+        for frame, n in total.most_common(limit):
+            lines.append(f"{n * interval_ms:>6.0f}ms  {frame}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, path_stem: Path) -> Path:
+        """Write the .folded and .txt reports next to each other."""
+        path_stem.parent.mkdir(parents=True, exist_ok=True)
+        path_stem.with_suffix(".folded").write_text(self.folded(), encoding="utf-8")
+        path_stem.with_suffix(".txt").write_text(self.summary(), encoding="utf-8")
+        return path_stem
+
+
+def profile_path(session_id) -> Path:
+    """Report path (without suffix) for a profile of one session's request."""
+    safe_id = _UNSAFE_CHARS_RE.sub("_", str(session_id))[:64] or "session"
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    return PROFILES_DIR / f"{safe_id}-{stamp}"
+
+
+def _finish(profiler: SamplingProfiler, path_stem: Path) -> None:
+    profiler.stop()
+    try:
+        profiler.save(path_stem)
+        logger.info("Profile saved to %s (%d samples)", path_stem, profiler.samples)
+    except OSError as e:
+        logger.error("Could not save profile %s: %s", path_stem, e)
+
+
+@contextmanager
+def profiled(path_stem: Path) -> Iterator[SamplingProfiler]:
+    """Sample the enclosed block and save its report under `path_stem`."""
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        _finish(profiler, path_stem)
+
+
+@asynccontextmanager
+async def aprofiled(path_stem: Path) -> AsyncIterator[SamplingProfiler]:
+    """
+    Async variant of `profiled`: joining the sampler thread and writing the
+    report happen in a worker thread, off the event loop.
+    """
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        await asyncio.to_thread(_finish, profiler, path_stem)
@@ -2,29 +2,44 @@
 RAG Chain — GPT 5.1 integration with retriever context injection and streaming.
 """
 
-from typing import Optional, Generator
-from openai import OpenAI
+import asyncio
+import re
+import time
+from typing import Optional, Generator, AsyncGenerator, Dict, Any
+from openai import OpenAI, AsyncOpenAI
 
 from src.core.config import (
-    OPENAI_API_KEY,
     LLM_MODEL,
     LLM_TEMPERATURE,
     LLM_MAX_TOKENS,
     CONVERSATION_MEMORY_SIZE,
     DEFAULT_SYSTEM_PROMPT,
+    ANSWER_CACHE_WITH_HISTORY,
+    CLASSIFIER_TIMEOUT,
+    LLM_TIMEOUT,
+    SOURCE_PREVIEW_CHARS,
 )
-from src.core.retriever import retrieve, RetrievalResult
+from src.core.http_transport import (
+    acall_with_retries,
+    call_with_retries,
+    get_async_openai_client,
+    get_openai_client,
+)
+from src.core.answer_cache import get_answer_cache, make_cache_key
+from src.core.metrics import TURNS_TOTAL, record, span, start_turn
+from src.core.retriever import retrieve, retrieve_many, RetrievalResult
 
 
-# ── Lazy client ──────────────────────────────────────────────────────────
-_client: Optional[OpenAI] = None
+# ── Clients ──────────────────────────────────────────────────────────────
+# Both share the process-wide pooled transport from http_transport
 
 
 def _get_client() -> OpenAI:
-    global _client
-    if _client is None:
-        _client = OpenAI(api_key=OPENAI_API_KEY)
-    return _client
+    return get_openai_client()
+
+
+def _get_async_client() -> AsyncOpenAI:
+    return get_async_openai_client()
 
 
 # ── Context builder ──────────────────────────────────────────────────────
@@ -50,25 +65,189 @@ def _build_context_block(result: RetrievalResult) -> str:
     return "\n\n---\n\n".join(blocks)
 
 
+# ── Turn preparation (shared by sync and async paths) ────────────────────
+
+_CLASSIFIER_MODEL = "gpt-4o-mini"
+_CLASSIFIER_PROMPT = (
+    "You are a query classifier. Return 'COMPLEX' if the user is asking for a "
+    "comparison, conflict, difference, preemption, or inconsistency between rules, "
+    "agencies, or locations. Otherwise, return 'SIMPLE'. After 'COMPLEX', list up "
+    "to 3 short standalone search queries, one per line, each covering one side "
+    "of the comparison (e.g. what the city code says, what state law says)."
+)
+_COMPLEX_KEYWORDS = ["conflict", "inconsistenc", "difference", "preemption", "friction", "contradict", "at odds"]
+_MAX_SUB_QUERIES = 3
+_LIST_MARKER = re.compile(r"^(?:[-*•]|\d+[.)])\s*")
+
+
+def _classifier_messages(query: str) -> list:
+    return [
+        {"role": "system", "content": _CLASSIFIER_PROMPT},
+        {"role": "user", "content": query},
+    ]
+
+
+def _keyword_is_complex(query: str) -> bool:
+    """Fallback to simple keyword logic if the classifier API fails."""
+    return any(kw in query.lower() for kw in _COMPLEX_KEYWORDS)
+
+
+def _parse_classification(text: str) -> tuple:
+    """Classifier reply → (is_complex, sub_queries)."""
+    lines = [line.strip() for line in (text or "").splitlines() if line.strip()]
+    if not lines or "COMPLEX" not in lines[0].upper():
+        return False, []
+    sub_queries = [_LIST_MARKER.sub("", line).strip() for line in lines[1:]]
+    return True, [q for q in sub_queries if q][:_MAX_SUB_QUERIES]
+
+
+def _retrieve_for_turn(user_message: str, top_k: int, sub_queries: list) -> RetrievalResult:
+    """Retrieve context; a decomposed question searches all its sub-queries at once."""
+    if sub_queries:
+        return retrieve_many(
+            [user_message, *sub_queries], top_k=top_k, auto_route=True, min_score=0.25,
+        )
+    return retrieve(query=user_message, top_k=top_k, auto_route=True, min_score=0.25)
+
+
+def _preview(text: str) -> str:
+    flat = " ".join(text.split())
+    if len(flat) <= SOURCE_PREVIEW_CHARS:
+        return flat
+    return flat[:SOURCE_PREVIEW_CHARS].rstrip() + "…"
+
+
+def _sources_payload(result: RetrievalResult) -> list:
+    """
+    Source metadata sent to the UI before the first token. Only a short
+    preview is included; the full chunk text is fetched from /api/chunks
+    when the user expands a source.
+    """
+    return [
+        {
+            "id": chunk.ref,
+            "source_file": chunk.source_file,
+            "library": chunk.library,
+            "page_number": chunk.page_number,
+            "score": round(chunk.score, 3),
+            "citation": chunk.citation,
+            "preview": _preview(chunk.text),
+        }
+        for chunk in result.chunks
+    ]
+
+
+def _build_messages(
+    system: str,
+    result: RetrievalResult,
+    recent_history: list,
+    user_message: str,
+) -> list:
+    """Build the augmented prompt and messages list with conversation memory."""
+    context_block = _build_context_block(result)
+
+    augmented_system = (
+        f"{system}\n\n"
+        f"─── RETRIEVED CONTEXT ───\n\n"
+        f"{context_block}\n\n"
+        f"─── END CONTEXT ───\n\n"
+        f"Use the above context to answer the user's question. "
+        f"Cite sources by their [Source N] reference."
+    )
+
+    messages = [{"role": "system", "content": augmented_system}]
+    messages.extend(recent_history)
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+def _answer_cache_key(
+    use_cache: bool,
+    user_message: str,
+    system: str,
+    temperature: float,
+    result: RetrievalResult,
+    recent_history: list,
+) -> Optional[str]:
+    """Return the answer-cache key for this turn, or None if it is not cacheable."""
+    if not use_cache or get_answer_cache() is None:
+        return None
+    if result.partial:
+        return None  # Answered without a library that could not be searched
+    if recent_history and not ANSWER_CACHE_WITH_HISTORY:
+        return None
+    return make_cache_key(
+        question=user_message,
+        system_prompt=system,
+        temperature=temperature,
+        source_ids=[chunk.chunk_id for chunk in result.chunks],
+        history=recent_history,
+    )
+
+
+def _cache_get(cache_key: Optional[str]) -> Optional[dict]:
+    if cache_key is None:
+        return None
+    try:
+        return get_answer_cache().get(cache_key)
+    except Exception:
+        return None  # A broken cache must never block a chat turn
+
+
+def _cache_put(cache_key: Optional[str], tokens: list, usage_data: Optional[dict]) -> None:
+    if cache_key is None or not tokens:
+        return
+    try:
+        get_answer_cache().put(cache_key, tokens, usage_data)
+    except Exception:
+        pass  # Cache write failure must not affect the answer
+
+
+def _replay_events(cached: dict) -> list:
+    """Events that replay a cached answer through the normal SSE protocol."""
+    events = [{"type": "token", "data": token} for token in cached["tokens"]]
+    events.append({"type": "usage", "data": {"input_tokens": 0, "output_tokens": 0, "cached": True}})
+    events.append({"type": "done"})
+    return events
+
+
+def _finish_turn(timings: dict, turn_start: float, outcome: str) -> dict:
+    """Record the whole-turn latency and return the per-stage timing event."""
+    record("total", time.perf_counter() - turn_start)
+    TURNS_TOTAL.inc(outcome)
+    return {"type": "timing", "data": dict(timings)}
+
+
+def _usage_from_chunk(chunk) -> Optional[dict]:
+    """Capture usage from the final streamed chunk."""
+    if getattr(chunk, "usage", None) is None:
+        return None
+    return {
+        "input_tokens": chunk.usage.prompt_tokens or 0,
+        "output_tokens": chunk.usage.completion_tokens or 0,
+    }
+
+
 # ── Main chat function ───────────────────────────────────────────────────
 
-def _is_complex_query(query: str, client: OpenAI) -> bool:
-    """Determine if a query is asking for conflicts/comparisons using a fast LLM."""
+def _classify_query(query: str, client: OpenAI) -> tuple:
+    """
+    Determine if a query is asking for conflicts/comparisons using a fast
+    LLM, which also splits such a query into sub-queries.
+    Returns (is_complex, sub_queries).
+    """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a query classifier. Return 'COMPLEX' if the user is asking for a comparison, conflict, difference, preemption, or inconsistency between rules, agencies, or locations. Otherwise, return 'SIMPLE'."},
-                {"role": "user", "content": query}
-            ],
+        response = call_with_retries(
+            client.chat.completions.create,
+            model=_CLASSIFIER_MODEL,
+            messages=_classifier_messages(query),
             temperature=0.0,
-            max_tokens=10,
+            max_tokens=120,
+            deadline=CLASSIFIER_TIMEOUT,
         )
-        return "COMPLEX" in (response.choices[0].message.content or "").upper()
+        return _parse_classification(response.choices[0].message.content)
     except Exception:
-        # Fallback to simple keyword logic if API fails
-        complex_keywords = ["conflict", "inconsistenc", "difference", "preemption", "friction", "contradict", "at odds"]
-        return any(kw in query.lower() for kw in complex_keywords)
+        return _keyword_is_complex(query), []
 
 def chat_stream(
     user_message: str,
@@ -77,99 +256,273 @@ def chat_stream(
     top_k: Optional[int] = None,
     temperature: Optional[float] = None,
     max_context_chars: int = 10000,
+    use_cache: bool = True,
 ) -> Generator[dict, None, None]:
     """
     Stream a RAG-augmented chat response.
 
+    When the answer cache is enabled, a turn whose question, prompt,
+    temperature and retrieved sources match a previous answer replays the
+    cached tokens through the same event sequence instead of calling the LLM.
+    Only history-free first turns are cached unless ANSWER_CACHE_WITH_HISTORY
+    is set.
+
     Yields dicts with keys:
         - {"type": "sources", "data": [...]}     — retrieved source metadata
         - {"type": "token", "data": "..."}       — streamed token
+        - {"type": "timing", "data": {...}}      — per-stage latency in ms
         - {"type": "done"}                       — stream finished
         - {"type": "error", "data": "..."}       — error message
     """
     system = system_prompt or DEFAULT_SYSTEM_PROMPT
+    turn_start = time.perf_counter()
+    timings = start_turn()
 
-    # Determine dynamic top_k based on prompt complexity
+    # Determine dynamic top_k based on prompt complexity; comparison
+    # questions are also split into sub-queries
+    sub_queries = []
     if top_k is None:
         client = _get_client()
-        is_complex = _is_complex_query(user_message, client)
+        with span("classify"):
+            is_complex, sub_queries = _classify_query(user_message, client)
         top_k = 24 if is_complex else 12
 
     # 1) Retrieve relevant context
     try:
-        retrieval_result = retrieve(
-            query=user_message,
-            top_k=top_k,
-            auto_route=True,
-            min_score=0.25,
-        )
+        with span("retrieve"):
+            retrieval_result = _retrieve_for_turn(user_message, top_k, sub_queries)
     except Exception as e:
+        TURNS_TOTAL.inc("error")
         yield {"type": "error", "data": f"Retrieval error: {e}"}
         return
 
-    # 2) Yield source metadata to the UI (include text for expansion)
-    sources = []
-    for chunk in retrieval_result.chunks:
-        sources.append({
-            "source_file": chunk.source_file,
-            "library": chunk.library,
-            "page_number": chunk.page_number,
-            "score": round(chunk.score, 3),
-            "text": chunk.text,
-        })
-    yield {"type": "sources", "data": sources}
-
-    # 3) Build the augmented prompt
-    context_block = _build_context_block(retrieval_result)
-
-    augmented_system = (
-        f"{system}\n\n"
-        f"─── RETRIEVED CONTEXT ───\n\n"
-        f"{context_block}\n\n"
-        f"─── END CONTEXT ───\n\n"
-        f"Use the above context to answer the user's question. "
-        f"Cite sources by their [Source N] reference."
-    )
+    # 2) Yield source metadata to the UI
+    yield {"type": "sources", "data": _sources_payload(retrieval_result)}
 
-    # 4) Build messages list with conversation memory
-    messages = [{"role": "system", "content": augmented_system}]
-
-    # Trim conversation history to memory size
+    # 3) Build the augmented prompt, trimming history to memory size
     recent_history = conversation_history[-(CONVERSATION_MEMORY_SIZE * 2):]
-    messages.extend(recent_history)
-
-    messages.append({"role": "user", "content": user_message})
+    with span("build_prompt"):
+        messages = _build_messages(system, retrieval_result, recent_history, user_message)
+    temp = temperature if temperature is not None else LLM_TEMPERATURE
+
+    # 4) Replay a cached answer for an identical turn
+    cache_key = _answer_cache_key(use_cache, user_message, system, temp, retrieval_result, recent_history)
+    with span("cache_lookup"):
+        cached = _cache_get(cache_key)
+    if cached is not None:
+        *events, done = _replay_events(cached)
+        yield from events
+        yield _finish_turn(timings, turn_start, "cached")
+        yield done
+        return
 
     # 5) Stream from GPT 5.1
     try:
         client = _get_client()
-        temp = temperature if temperature is not None else LLM_TEMPERATURE
-        stream = client.chat.completions.create(
+        llm_start = time.perf_counter()
+        first_token_at = None
+        stream = call_with_retries(
+            client.chat.completions.create,
             model=LLM_MODEL,
             messages=messages,
             temperature=temp,
             max_completion_tokens=LLM_MAX_TOKENS,
             stream=True,
             stream_options={"include_usage": True},
+            deadline=LLM_TIMEOUT,
         )
 
         usage_data = None
+        tokens = []
         for chunk in stream:
             if chunk.choices and chunk.choices[0].delta.content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    record("llm_ttft", first_token_at - llm_start)
+                tokens.append(chunk.choices[0].delta.content)
+                yield {"type": "token", "data": chunk.choices[0].delta.content}
+            usage_data = _usage_from_chunk(chunk) or usage_data
+        record("llm_generate", time.perf_counter() - (first_token_at or llm_start))
+
+        _cache_put(cache_key, tokens, usage_data)
+
+        if usage_data:
+            yield {"type": "usage", "data": usage_data}
+        yield _finish_turn(timings, turn_start, "answered")
+        yield {"type": "done"}
+
+    except Exception as e:
+        TURNS_TOTAL.inc("error")
+        yield {"type": "error", "data": f"LLM error: {e}"}
+
+
+# ── Async chat function ──────────────────────────────────────────────────
+
+async def _aclassify_query(query: str, client: AsyncOpenAI) -> tuple:
+    """Async variant of _classify_query."""
+    try:
+        response = await acall_with_retries(
+            client.chat.completions.create,
+            model=_CLASSIFIER_MODEL,
+            messages=_classifier_messages(query),
+            temperature=0.0,
+            max_tokens=120,
+            deadline=CLASSIFIER_TIMEOUT,
+        )
+        return _parse_classification(response.choices[0].message.content)
+    except Exception:
+        return _keyword_is_complex(query), []
+
+
+async def _wait_for_gate(gate, stage: str) -> AsyncGenerator[dict, None]:
+    """Wait for an admission slot, yielding queue-position events meanwhile."""
+    waiter = gate.wait()
+    try:
+        with span(f"queue_{stage}"):
+            async for position in waiter:
+                yield {"type": "queue", "data": {"stage": stage, "position": position}}
+    finally:
+        # Leaves the queue if we are closed while still waiting
+        await waiter.aclose()
+
+
+async def achat_stream(
+    user_message: str,
+    conversation_history: list,
+    system_prompt: Optional[str] = None,
+    top_k: Optional[int] = None,
+    temperature: Optional[float] = None,
+    use_cache: bool = True,
+    gates: Optional[Dict[str, Any]] = None,
+) -> AsyncGenerator[dict, None]:
+    """
+    Async version of chat_stream for the web server.
+
+    LLM calls go through AsyncOpenAI and the blocking retrieval / cache
+    work runs in worker threads, so an in-flight answer holds a socket
+    rather than a threadpool worker. Closing the generator (e.g. when the
+    client disconnects) closes the upstream LLM stream immediately.
+
+    `gates` optionally maps a stage name ("retrieval", "llm") to an
+    admission gate exposing `wait()` — an async generator yielding queue
+    positions until a slot is granted — and `release()`. While a turn waits
+    for a slot, {"type": "queue", "data": {"stage": ..., "position": n}}
+    events are yielded.
+
+    Yields the same events as chat_stream, plus "queue" events.
+    """
+    system = system_prompt or DEFAULT_SYSTEM_PROMPT
+    gates = gates or {}
+    turn_start = time.perf_counter()
+    timings = start_turn()
+
+    # Classification and retrieval share the retrieval-stage slot
+    retrieval_gate = gates.get("retrieval")
+    if retrieval_gate is not None:
+        queue_events = _wait_for_gate(retrieval_gate, "retrieval")
+        try:
+            async for event in queue_events:
+                yield event
+        except Exception as e:
+            TURNS_TOTAL.inc("error")
+            yield {"type": "error", "data": f"Server busy: {e}"}
+            return
+        finally:
+            await queue_events.aclose()
+    try:
+        sub_queries = []
+        if top_k is None:
+            with span("classify"):
+                is_complex, sub_queries = await _aclassify_query(user_message, _get_async_client())
+            top_k = 24 if is_complex else 12
+
+        with span("retrieve"):
+            retrieval_result = await asyncio.to_thread(_retrieve_for_turn, user_message, top_k, sub_queries)
+    except Exception as e:
+        TURNS_TOTAL.inc("error")
+        yield {"type": "error", "data": f"Retrieval error: {e}"}
+        return
+    finally:
+        if retrieval_gate is not None:
+            retrieval_gate.release()
+
+    yield {"type": "sources", "data": _sources_payload(retrieval_result)}
+
+    recent_history = conversation_history[-(CONVERSATION_MEMORY_SIZE * 2):]
+    with span("build_prompt"):
+        messages = _build_messages(system, retrieval_result, recent_history, user_message)
+    temp = temperature if temperature is not None else LLM_TEMPERATURE
+
+    cache_key = _answer_cache_key(use_cache, user_message, system, temp, retrieval_result, recent_history)
+    cached = None
+    if cache_key:
+        with span("cache_lookup"):
+            cached = await asyncio.to_thread(_cache_get, cache_key)
+    if cached is not None:
+        *events, done = _replay_events(cached)
+        for event in events:
+            yield event
+        yield _finish_turn(timings, turn_start, "cached")
+        yield done
+        return
+
+    llm_gate = gates.get("llm")
+    if llm_gate is not None:
+        queue_events = _wait_for_gate(llm_gate, "llm")
+        try:
+            async for event in queue_events:
+                yield event
+        except Exception as e:
+            TURNS_TOTAL.inc("error")
+            yield {"type": "error", "data": f"Server busy: {e}"}
+            return
+        finally:
+            await queue_events.aclose()
+
+    stream = None
+    try:
+        llm_start = time.perf_counter()
+        first_token_at = None
+        stream = await acall_with_retries(
+            _get_async_client().chat.completions.create,
+            model=LLM_MODEL,
+            messages=messages,
+            temperature=temp,
+            max_completion_tokens=LLM_MAX_TOKENS,
+            stream=True,
+            stream_options={"include_usage": True},
+            deadline=LLM_TIMEOUT,
+        )
+
+        usage_data = None
+        tokens = []
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    record("llm_ttft", first_token_at - llm_start)
+                tokens.append(chunk.choices[0].delta.content)
                 yield {"type": "token", "data": chunk.choices[0].delta.content}
-            # Capture usage from the final chunk
-            if hasattr(chunk, "usage") and chunk.usage is not None:
-                usage_data = {
-                    "input_tokens": chunk.usage.prompt_tokens or 0,
-                    "output_tokens": chunk.usage.completion_tokens or 0,
-                }
+            usage_data = _usage_from_chunk(chunk) or usage_data
+        record("llm_generate", time.perf_counter() - (first_token_at or llm_start))
+
+        if cache_key is not None:
+            await asyncio.to_thread(_cache_put, cache_key, tokens, usage_data)
 
         if usage_data:
             yield {"type": "usage", "data": usage_data}
+        yield _finish_turn(timings, turn_start, "answered")
         yield {"type": "done"}
 
     except Exception as e:
+        TURNS_TOTAL.inc("error")
         yield {"type": "error", "data": f"LLM error: {e}"}
+    finally:
+        # Abort the upstream generation if the consumer went away mid-stream
+        if stream is not None:
+            await stream.close()
+        if llm_gate is not None:
+            llm_gate.release()
 
 
 def chat_sync(
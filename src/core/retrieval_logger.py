@@ -1,9 +1,10 @@
 
-import json
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Dict, Any, Union
 
+from src.core.log_writer import get_log_writer
+
 # Log file path
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 LOG_DIR = PROJECT_ROOT / "logs"
@@ -16,7 +17,7 @@ def log_retrieval(
     temperature: float = 0.1,
 ) -> None:
     """
-    Log retrieval details to a JSONL file.
+    Log retrieval details to a JSONL file (queued; written in the background).
     
     Args:
         session_id: The sequential session number.
@@ -24,9 +25,6 @@ def log_retrieval(
         sources: List of source dictionaries (file, library, text, score, etc).
         temperature: LLM temperature used.
     """
-    # Ensure log directory exists
-    LOG_DIR.mkdir(parents=True, exist_ok=True)
-    
     record = {
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "session_id": session_id,
@@ -41,8 +39,8 @@ def log_retrieval(
             "page": s.get("page_number"),
             "library": s.get("library"),
             "score": s.get("score"),
-            "text_preview": (s.get("text") or "")[:100] + "..."  # Preview only to save space
+            "chunk_id": s.get("id"),
+            "text_preview": (s.get("preview") or s.get("text") or "")[:100] + "..."  # Preview only to save space
         })
         
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    get_log_writer().write(LOG_FILE, record)
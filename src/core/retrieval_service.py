@@ -0,0 +1,275 @@
+"""
+Retrieval Service — one process owns ChromaDB; web workers query it over a socket.
+
+Every process that opens `chromadb.PersistentClient` loads its own copy of
+the HNSW indexes (several GB for the full corpus), so N uvicorn workers
+would need N copies. Run `scripts/run_retrieval_server.py` once and set
+RETRIEVAL_SERVICE; `vector_store.search` / `get_chunks` / `collection_stats`
+then go through `RetrievalClient` (via `shard_router`) instead of touching
+Chroma directly.
+
+Wire format (all integers big-endian), one request per frame:
+
+    frame     u32 length | payload
+    request   u8 op | u16 header length | JSON header | [vector block]
+    vectors   u32 count | u32 dims | count × dims float32 (little-endian)
+    response  u8 status (0 ok, 1 error) | JSON body
+
+Query vectors, the bulk of a request (12 KB each at 3072 dims versus ~60 KB
+as JSON), travel as raw float32; several can be sent in one request. The
+response is ChromaDB's own result dict.
+
+Addresses are `unix:/path/to/socket` or `tcp:host:port`.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import socket
+import struct
+import sys
+from array import array
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OP_PING = 0
+OP_QUERY = 1
+OP_GET = 2
+OP_STATS = 3
+
+_FRAME = struct.Struct(">I")
+_HEAD = struct.Struct(">BH")
+_VECTORS = struct.Struct(">II")
+MAX_FRAME = 256 * 1024 * 1024
+
+
+class RetrievalServiceError(RuntimeError):
+    """The retrieval service could not be reached or reported an error."""
+
+
+class RetrievalUnavailable(RetrievalServiceError):
+    """The node did not answer (refused, reset or timed out)."""
+
+
+# ── Protocol ─────────────────────────────────────────────────────────────
+
+def _float32_block(vectors) -> bytes:
+    rows = vectors if len(vectors) and hasattr(vectors[0], "__len__") else [vectors]
+    data = array("f")
+    for row in rows:
+        data.extend(row)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return _VECTORS.pack(len(rows), len(data) // max(1, len(rows))) + data.tobytes()
+
+
+def encode_request(op: int, header: dict, vectors: Optional[list] = None) -> bytes:
+    # array rather than numpy keeps numpy out of web workers' import time
+    head = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    parts = [_HEAD.pack(op, len(head)), head]
+    if vectors is not None:
+        parts.append(_float32_block(vectors))
+    payload = b"".join(parts)
+    return _FRAME.pack(len(payload)) + payload
+
+
+def decode_request(payload: bytes) -> Tuple[int, dict, Optional["np.ndarray"]]:
+    op, head_len = _HEAD.unpack_from(payload)
+    offset = _HEAD.size
+    header = json.loads(payload[offset : offset + head_len])
+    offset += head_len
+    vectors = None
+    if offset < len(payload):
+        import numpy as np  # server side only
+
+        count, dims = _VECTORS.unpack_from(payload, offset)
+        offset += _VECTORS.size
+        vectors = np.frombuffer(payload, dtype="<f4", count=count * dims, offset=offset).reshape(count, dims)
+    return op, header, vectors
+
+
+def encode_response(body, ok: bool = True) -> bytes:
+    data = json.dumps(body, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    payload = bytes([0 if ok else 1]) + data
+    return _FRAME.pack(len(payload)) + payload
+
+
+def parse_address(address: str) -> Tuple[str, object]:
+    """'unix:/path' → ('unix', '/path'); 'tcp:host:port' → ('tcp', (host, port))."""
+    kind, _, rest = address.partition(":")
+    if kind == "unix" and rest:
+        return "unix", rest
+    if kind == "tcp":
+        host, _, port = rest.rpartition(":")
+        if host and port.isdigit():
+            return "tcp", (host, int(port))
+    raise ValueError(f"Bad retrieval service address {address!r} (unix:/path or tcp:host:port)")
+
+
+# ── Client ───────────────────────────────────────────────────────────────
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        read = sock.recv_into(view[got:])
+        if not read:
+            raise ConnectionError("Retrieval service closed the connection")
+        got += read
+    return bytes(buf)
+
+
+class RetrievalClient:
+    """Blocking client with a small pool of persistent connections (thread-safe)."""
+
+    def __init__(self, address: str, pool_size: int = 8, timeout: float = 10.0):
+        self.address = address
+        self.kind, self.target = parse_address(address)
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self, timeout: float) -> socket.socket:
+        family = socket.AF_UNIX if self.kind == "unix" else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        if self.kind == "tcp":
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.connect(self.target)
+        return sock
+
+    def _roundtrip(self, sock: socket.socket, frame: bytes):
+        sock.sendall(frame)
+        (length,) = _FRAME.unpack(_recv_exactly(sock, _FRAME.size))
+        payload = _recv_exactly(sock, length)
+        body = json.loads(payload[1:])
+        if payload[0] != 0:
+            raise RetrievalServiceError(body.get("error", "retrieval service error"))
+        return body
+
+    def call(self, op: int, header: dict, vectors: Optional[list] = None, timeout: Optional[float] = None):
+        frame = encode_request(op, header, vectors)
+        timeout = timeout or self.timeout
+        for attempt in (1, 2):
+            try:
+                sock = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                reused = False
+                try:
+                    sock = self._connect(timeout)
+                except OSError as e:
+                    raise RetrievalUnavailable(f"Cannot reach retrieval service at {self.address}: {e}") from e
+            try:
+                sock.settimeout(timeout)
+                result = self._roundtrip(sock, frame)
+            except RetrievalServiceError:
+                self._release(sock)
+                raise
+            except (OSError, ValueError) as e:
+                sock.close()
+                # A pooled connection may have gone stale (server restarted): retry once
+                if reused and attempt == 1 and not isinstance(e, socket.timeout):
+                    continue
+                raise RetrievalUnavailable(f"Retrieval service request failed: {e}") from e
+            self._release(sock)
+            return result
+
+    def _release(self, sock: socket.socket) -> None:
+        try:
+            self._idle.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    # ── Operations (same shapes as vector_store) ─────────────────────
+
+    def ping(self) -> dict:
+        return self.call(OP_PING, {})
+
+    def query(self, collection_name: str, query_embeddings: list, n_results: int,
+              where: Optional[dict] = None, timeout: Optional[float] = None) -> dict:
+        header = {"collection": collection_name, "n_results": n_results, "where": where}
+        return self.call(OP_QUERY, header, query_embeddings, timeout=timeout)
+
+    def get(self, collection_name: str, ids: list) -> dict:
+        return self.call(OP_GET, {"collection": collection_name, "ids": ids})
+
+    def stats(self, collection_name: str) -> dict:
+        return self.call(OP_STATS, {"collection": collection_name})
+
+
+# ── Server ───────────────────────────────────────────────────────────────
+
+class RetrievalServer:
+    """
+    asyncio socket server answering queries against the local ChromaDB.
+    Chroma calls run in a bounded thread pool (HNSW search releases the GIL).
+    """
+
+    def __init__(self, address: str, threads: int = 4):
+        self.address = address
+        self.kind, self.target = parse_address(address)
+        self._slots = asyncio.Semaphore(threads)
+        self.requests = 0
+
+    def _handle(self, op: int, header: dict, vectors):
+        from src.core import vector_store
+
+        if op == OP_PING:
+            return {"ok": True, "requests": self.requests}
+        name = header["collection"]
+        if op == OP_QUERY:
+            return vector_store.query_local(name, vectors, header["n_results"], header.get("where"))
+        if op == OP_GET:
+            return vector_store.get_chunks_local(name, header["ids"])
+        if op == OP_STATS:
+            return vector_store.collection_stats_local(name)
+        raise ValueError(f"Unknown op {op}")
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    (length,) = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+                except asyncio.IncompleteReadError:
+                    return  # client closed
+                if length > MAX_FRAME:
+                    return
+                payload = await reader.readexactly(length)
+                self.requests += 1
+                try:
+                    op, header, vectors = decode_request(payload)
+                    async with self._slots:
+                        body = await asyncio.to_thread(self._handle, op, header, vectors)
+                    writer.write(encode_response(body))
+                except Exception as e:
+                    logger.warning("Retrieval request failed: %s", e)
+                    writer.write(encode_response({"error": str(e)}, ok=False))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self) -> None:
+        if self.kind == "unix":
+            import os
+
+            if os.path.exists(self.target):
+                os.unlink(self.target)  # stale socket from a previous run
+            server = await asyncio.start_unix_server(self._serve_connection, path=self.target)
+        else:
+            host, port = self.target
+            server = await asyncio.start_server(self._serve_connection, host=host, port=port)
+        logger.info("Retrieval service listening on %s", self.address)
+        async with server:
+            await server.serve_forever()
@@ -3,14 +3,24 @@ Retrieval engine — multi-collection semantic search with metadata
 filtering and cross-collection re-ranking.
 """
 
+import json
 import logging
 import re
-from dataclasses import dataclass, field
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from typing import Optional
 
-from src.core.config import LIBRARIES, LIBRARY_ORDER
-from src.core.embedder import embed_query
-from src.core.vector_store import search as vector_search
+from src.core.config import (
+    LIBRARIES,
+    LIBRARY_ORDER,
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CACHE_TTL_SECONDS,
+)
+from src.core.embedder import embed_queries, embed_query
+from src.core.metrics import record, span
+from src.core.vector_store import search as vector_search, search_batch as vector_search_batch
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +38,7 @@ class RetrievedChunk:
     page_number: int
     title: str = ""
     chunk_index: int = 0
+    chunk_id: str = ""  # ChromaDB document ID
 
     @property
     def citation(self) -> str:
@@ -35,6 +46,19 @@ class RetrievedChunk:
         lib_name = LIBRARIES.get(self.library, {}).get("name", self.library)
         return f"[{lib_name}] {self.source_file}, p.{self.page_number}"
 
+    @property
+    def ref(self) -> str:
+        """Public chunk reference (`library:chunk_id`) used by /api/chunks."""
+        return f"{self.library}:{self.chunk_id}"
+
+
+def parse_chunk_ref(ref: str) -> Optional[tuple]:
+    """Split a `library:chunk_id` reference; None if malformed or unknown library."""
+    library, sep, chunk_id = ref.partition(":")
+    if not sep or not chunk_id or library not in LIBRARIES:
+        return None
+    return library, chunk_id
+
 
 @dataclass
 class RetrievalResult:
@@ -43,6 +67,12 @@ class RetrievalResult:
     chunks: list  # list of RetrievedChunk
     libraries_searched: list  # list of str
     total_candidates: int = 0
+    errors: dict = field(default_factory=dict)  # library key → exception of a failed search
+
+    @property
+    def partial(self) -> bool:
+        """True if some library could not be searched, so the ranking may be incomplete."""
+        return bool(self.errors)
 
 
 # ── Library routing ──────────────────────────────────────────────────────
@@ -313,6 +343,11 @@ def detect_relevant_libraries(query: str) -> list:
     Detect which libraries are most relevant to a query based on keywords.
     Returns a list of library keys, or all libraries if no match.
     """
+    return _matched_libraries(query) or list(LIBRARY_ORDER)
+
+
+def _matched_libraries(query: str) -> list:
+    """Library keys whose keyword routes match the query (possibly none)."""
     query_lower = query.lower()
     matched = []
 
@@ -323,12 +358,115 @@ def detect_relevant_libraries(query: str) -> list:
                     matched.append(lib_key)
                 break
 
-    return matched if matched else list(LIBRARY_ORDER)
+    return matched
+
+
+# ── Result cache ─────────────────────────────────────────────────────────
+
+
+class RetrievalCache:
+    """LRU of retrieve() results with a time-to-live (RETRIEVAL_CACHE_SIZE)."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[RetrievalResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers may reorder or trim the chunk list; keep the cached one intact
+        return replace(entry[1], chunks=list(entry[1].chunks))
+
+    def put(self, key: tuple, result: RetrievalResult) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_result_cache = RetrievalCache(RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL_SECONDS)
 
 
 # ── Core retrieval ───────────────────────────────────────────────────────
 
 
+def _cache_key(queries: tuple, libraries, top_k, per_library_k, where, auto_route, min_score) -> Optional[tuple]:
+    if _result_cache.max_entries <= 0:
+        return None
+    return (
+        queries, tuple(libraries or ()), top_k, per_library_k,
+        json.dumps(where, sort_keys=True) if where else "", auto_route, min_score,
+    )
+
+
+def _search_libraries(queries: list, libraries: Optional[list], auto_route: bool) -> list:
+    """Library keys to search for these queries (explicit, keyword-routed, or all)."""
+    if libraries:
+        search_libs = libraries
+    elif auto_route:
+        search_libs = []
+        for query in queries:
+            search_libs.extend(k for k in _matched_libraries(query) if k not in search_libs)
+        search_libs = search_libs or list(LIBRARY_ORDER)
+    else:
+        search_libs = list(LIBRARY_ORDER)
+    return [k for k in search_libs if k in LIBRARIES]
+
+
+def _chunks_from_results(lib_key: str, results: dict, row: int, min_score: float) -> list:
+    """RetrievedChunks of one query row of a Chroma result, below min_score dropped."""
+    chunks = []
+    ids = results.get("ids", [[]])[row]
+    docs = results.get("documents", [[]])[row]
+    metas = results.get("metadatas", [[]])[row]
+    dists = results.get("distances", [[]])[row]
+
+    for chunk_id, doc, meta, dist in zip(ids, docs, metas, dists):
+        score = 1.0 - dist  # cosine distance → similarity
+        if score < min_score:
+            continue
+
+        chunks.append(RetrievedChunk(
+            text=doc,
+            score=score,
+            library=meta.get("library", lib_key),
+            source_file=meta.get("source_file", ""),
+            page_number=meta.get("page_number", 0),
+            title=meta.get("title", ""),
+            chunk_index=meta.get("chunk_index", 0),
+            chunk_id=chunk_id,
+        ))
+    return chunks
+
+
+def _dedupe(ranked: list) -> list:
+    """If same source_file + page appear multiple times, keep the best-ranked."""
+    seen = set()
+    deduped = []
+    for chunk in ranked:
+        key = (chunk.source_file, chunk.page_number, chunk.text[:100])
+        if key not in seen:
+            seen.add(key)
+            deduped.append(chunk)
+    return deduped
+
+
 def retrieve(
     query: str,
     libraries: Optional[list] = None,
@@ -356,26 +494,24 @@ def retrieve(
     Returns:
         RetrievalResult with ranked chunks and metadata.
     """
-    # Determine which libraries to search
-    if libraries:
-        search_libs = libraries
-    elif auto_route:
-        search_libs = detect_relevant_libraries(query)
-    else:
-        search_libs = list(LIBRARY_ORDER)
+    cache_key = _cache_key((query,), libraries, top_k, per_library_k, where, auto_route, min_score)
+    if cache_key is not None:
+        cached = _result_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-    # Validate library keys
-    search_libs = [k for k in search_libs if k in LIBRARIES]
+    search_libs = _search_libraries([query], libraries, auto_route)
     if not search_libs:
         logger.warning("No valid libraries to search")
         return RetrievalResult(query=query, chunks=[], libraries_searched=[])
 
     # Embed the query once
-    query_vec = embed_query(query)
+    with span("embed_query"):
+        query_vec = embed_query(query)
 
     # Search each collection and collect candidates
     all_chunks = []
-    total_candidates = 0
+    errors = {}
 
     for lib_key in search_libs:
         try:
@@ -385,56 +521,114 @@ def retrieve(
                 n_results=per_library_k,
                 where=where,
             )
-
-            docs = results.get("documents", [[]])[0]
-            metas = results.get("metadatas", [[]])[0]
-            dists = results.get("distances", [[]])[0]
-
-            for doc, meta, dist in zip(docs, metas, dists):
-                score = 1.0 - dist  # cosine distance → similarity
-                if score < min_score:
-                    continue
-
-                chunk = RetrievedChunk(
-                    text=doc,
-                    score=score,
-                    library=meta.get("library", lib_key),
-                    source_file=meta.get("source_file", ""),
-                    page_number=meta.get("page_number", 0),
-                    title=meta.get("title", ""),
-                    chunk_index=meta.get("chunk_index", 0),
-                )
-                all_chunks.append(chunk)
-                total_candidates += 1
+            all_chunks.extend(_chunks_from_results(lib_key, results, 0, min_score))
 
         except Exception as e:
             logger.error("Search failed for collection '%s': %s", lib_key, e)
+            errors[lib_key] = e
 
     # Re-rank: sort by score descending, take top_k
+    rerank_start = time.perf_counter()
     all_chunks.sort(key=lambda c: c.score, reverse=True)
-    ranked = all_chunks[:top_k]
-
-    # Deduplicate: if same source_file + page appear multiple times, keep best
-    seen = set()
-    deduped = []
-    for chunk in ranked:
-        key = (chunk.source_file, chunk.page_number, chunk.text[:100])
-        if key not in seen:
-            seen.add(key)
-            deduped.append(chunk)
+    deduped = _dedupe(all_chunks[:top_k])
+    record("rerank", time.perf_counter() - rerank_start)
 
     logger.info(
         "Retrieved %d chunks from %d libraries (query: '%s')",
         len(deduped), len(search_libs), query[:60],
     )
 
-    return RetrievalResult(
+    return _finish(cache_key, RetrievalResult(
         query=query,
         chunks=deduped,
         libraries_searched=search_libs,
-        total_candidates=total_candidates,
+        total_candidates=len(all_chunks),
+        errors=errors,
+    ))
+
+
+def retrieve_many(
+    queries: list,
+    libraries: Optional[list] = None,
+    top_k: int = 10,
+    per_library_k: int = 25,
+    where: Optional[dict] = None,
+    auto_route: bool = True,
+    min_score: float = 0.0,
+    rrf_k: int = 60,
+) -> RetrievalResult:
+    """
+    Search for several phrasings of one question (e.g. the sub-questions of
+    a comparison) and fuse the rankings.
+
+    All queries are embedded in one API call and each collection is
+    searched once with every query vector. Each query's candidates are
+    ranked by score across libraries and the lists are combined with
+    reciprocal rank fusion (sum of 1 / (rrf_k + rank)), so a chunk found by
+    several sub-queries, or ranked high by one, comes first. Chunks keep
+    their best cosine score. Keyword routing searches the libraries matched
+    by any query. Other arguments are as for `retrieve`; the result's
+    `query` is the first query.
+    """
+    queries = list(dict.fromkeys(queries))
+    cache_key = _cache_key(tuple(queries), libraries, top_k, per_library_k, where, auto_route, min_score)
+    if cache_key is not None:
+        cached = _result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    search_libs = _search_libraries(queries, libraries, auto_route)
+    if not search_libs:
+        logger.warning("No valid libraries to search")
+        return RetrievalResult(query=queries[0], chunks=[], libraries_searched=[])
+
+    with span("embed_query"):
+        query_vecs = embed_queries(queries)
+
+    per_query = [[] for _ in queries]
+    errors = {}
+    for lib_key in search_libs:
+        try:
+            results = vector_search_batch(lib_key, query_vecs, n_results=per_library_k, where=where)
+            for row, candidates in enumerate(per_query):
+                candidates.extend(_chunks_from_results(lib_key, results, row, min_score))
+        except Exception as e:
+            logger.error("Search failed for collection '%s': %s", lib_key, e)
+            errors[lib_key] = e
+
+    rerank_start = time.perf_counter()
+    fused, best = {}, {}
+    for candidates in per_query:
+        candidates.sort(key=lambda c: c.score, reverse=True)
+        for rank, chunk in enumerate(candidates, 1):
+            fused[chunk.chunk_id] = fused.get(chunk.chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+            if chunk.chunk_id not in best or chunk.score > best[chunk.chunk_id].score:
+                best[chunk.chunk_id] = chunk
+    ranked = sorted(best.values(), key=lambda c: fused[c.chunk_id], reverse=True)
+    deduped = _dedupe(ranked[:top_k])
+    record("rerank", time.perf_counter() - rerank_start)
+
+    logger.info(
+        "Retrieved %d chunks from %d libraries for %d queries (query: '%s')",
+        len(deduped), len(search_libs), len(queries), queries[0][:60],
     )
 
+    return _finish(cache_key, RetrievalResult(
+        query=queries[0],
+        chunks=deduped,
+        libraries_searched=search_libs,
+        total_candidates=sum(len(c) for c in per_query),
+        errors=errors,
+    ))
+
+
+def _finish(cache_key: Optional[tuple], result: RetrievalResult) -> RetrievalResult:
+    """Cache a complete result; a result missing a collection is not worth repeating."""
+    if cache_key is not None and not result.partial:
+        _result_cache.put(cache_key, result)
+        result = replace(result, chunks=list(result.chunks))
+    return result
+
 
 def retrieve_with_context(
     query: str,
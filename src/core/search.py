@@ -0,0 +1,183 @@
+"""
+Search — retrieval-only queries for /api/search.
+
+Results are ranked exactly as for chat (`retriever.retrieve`) and paged with
+opaque cursors. A page is cut from a ranked list fetched SEARCH_PAGE_DEPTH
+results at a time and cached for SEARCH_CACHE_TTL_SECONDS, so the first
+pages of a query share one search and paging stays consistent. A cursor
+holds the offset and a fingerprint of the search it came from and is
+rejected for any other search.
+
+A ranking missing a library is never cached. If the search itself was at
+fault (a filter Chroma rejects) it is reported as a SearchError; if a
+library's store could not be reached the page is served with
+`partial: true`.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import math
+from typing import List, Optional
+
+from chromadb.api.types import validate_where
+
+from src.core.config import (
+    LIBRARIES,
+    LIBRARY_ORDER,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL_SECONDS,
+    SEARCH_MAX_DEPTH,
+    SEARCH_PAGE_DEPTH,
+)
+from src.core.embedder import embed_queries
+from src.core.retrieval_service import RetrievalServiceError, RetrievalUnavailable
+from src.core.retriever import RetrievalCache, RetrievalResult, retrieve
+
+_cache = RetrievalCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL_SECONDS)
+
+
+class SearchError(ValueError):
+    """A search request that cannot be answered (bad library, filter or cursor)."""
+
+
+def fingerprint(query: str, libraries: List[str], where: Optional[dict], min_score: float) -> str:
+    """Stable id of everything that determines a ranking."""
+    raw = json.dumps([query, sorted(libraries), where or {}, min_score], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(search_id: str, offset: int) -> str:
+    raw = json.dumps({"s": search_id, "o": offset}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, search_id: str) -> int:
+    """Offset stored in a cursor of this search."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(data["o"])
+        owner = data["s"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise SearchError("Malformed cursor")
+    if owner != search_id or offset < 0:
+        raise SearchError("Cursor does not belong to this search")
+    return offset
+
+
+def _passage(chunk) -> dict:
+    return {
+        "id": chunk.ref,
+        "library": chunk.library,
+        "source_file": chunk.source_file,
+        "page_number": chunk.page_number,
+        "title": chunk.title,
+        "score": round(chunk.score, 4),
+        "citation": chunk.citation,
+        "text": chunk.text,
+    }
+
+
+def _libraries(libraries: Optional[List[str]]) -> List[str]:
+    if not libraries:
+        return list(LIBRARY_ORDER)
+    unknown = [k for k in libraries if k not in LIBRARIES]
+    if unknown:
+        raise SearchError(f"Unknown libraries: {', '.join(unknown)}")
+    return list(dict.fromkeys(libraries))
+
+
+def _plan(
+    query: str,
+    libraries: Optional[List[str]] = None,
+    where: Optional[dict] = None,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    min_score: float = 0.0,
+) -> dict:
+    """Validate a request and look up its ranking in the cache."""
+    libraries = _libraries(libraries)
+    if where:
+        try:
+            validate_where(where)
+        except ValueError as e:
+            raise SearchError(f"Invalid where filter: {e}")
+    search_id = fingerprint(query, libraries, where, min_score)
+    offset = decode_cursor(cursor, search_id) if cursor else 0
+    # One extra result tells whether another page exists
+    depth = min(SEARCH_MAX_DEPTH, SEARCH_PAGE_DEPTH * math.ceil((offset + limit + 1) / SEARCH_PAGE_DEPTH))
+    plan = {
+        "query": query, "libraries": libraries, "where": where, "min_score": min_score,
+        "search_id": search_id, "offset": offset, "limit": limit, "depth": depth, "ranked": None,
+    }
+    if offset < SEARCH_MAX_DEPTH:
+        plan["ranked"] = _cache.get((search_id, depth))
+    return plan
+
+
+def _rejected(ranked: RetrievalResult) -> Optional[str]:
+    """Why the search itself failed in some library; None if stores were only unreachable."""
+    for library, error in ranked.errors.items():
+        if isinstance(error, RetrievalUnavailable):
+            continue
+        # Chroma rejects filters with ValueError; a retrieval node that answers
+        # with an error (rather than not answering) is reporting the same
+        if isinstance(error, (ValueError, TypeError, RetrievalServiceError)):
+            return f"Search failed in {library}: {error}"
+    return None
+
+
+def _page(plan: dict) -> dict:
+    offset, limit = plan["offset"], plan["limit"]
+    results, has_more, partial = [], False, False
+    if offset < SEARCH_MAX_DEPTH:
+        ranked = plan["ranked"]
+        if ranked is None:
+            ranked = retrieve(
+                plan["query"], libraries=plan["libraries"], top_k=plan["depth"], per_library_k=plan["depth"],
+                where=plan["where"], auto_route=False, min_score=plan["min_score"],
+            )
+            reason = _rejected(ranked)
+            if reason:
+                raise SearchError(reason)
+            if not ranked.partial:
+                _cache.put((plan["search_id"], plan["depth"]), ranked)
+        results = [_passage(c) for c in ranked.chunks[offset:offset + limit]]
+        has_more = offset + limit < min(len(ranked.chunks), SEARCH_MAX_DEPTH)
+        partial = ranked.partial
+
+    return {
+        "query": plan["query"],
+        "libraries": plan["libraries"],
+        "results": results,
+        "next_cursor": encode_cursor(plan["search_id"], offset + limit) if has_more else None,
+        "partial": partial,
+    }
+
+
+def search_page(query: str, **options) -> dict:
+    """
+    One page of ranked passages for a query.
+
+    Searches the given `libraries` (all when empty; no keyword routing)
+    with an optional ChromaDB `where` filter, `limit` results from `cursor`
+    on, dropping scores below `min_score`. Returns query, libraries,
+    results, next_cursor (None on the last page) and partial (some library
+    could not be searched). Raises SearchError for unknown libraries, an
+    invalid filter, a filter rejected at query time or a foreign cursor.
+    """
+    return _page(_plan(query, **options))
+
+
+def search_many(requests: List[dict]) -> List[dict]:
+    """
+    Pages for several search_page requests. Every request is validated
+    before any search runs, and the query embeddings the cached pages don't
+    cover are fetched in one batched API call.
+    """
+    plans = [_plan(**r) for r in requests]
+    misses = [p["query"] for p in plans if p["ranked"] is None and p["offset"] < SEARCH_MAX_DEPTH]
+    if misses:
+        embed_queries(misses)
+    return [_page(p) for p in plans]
@@ -2,42 +2,80 @@
 Session Logger — writes chat session records to JSONL for audit trail.
 """
 
+import gzip
 import json
 import os
+import threading
 from datetime import datetime, timezone
-from pathlib import Path
 from typing import List, Dict, Optional, Union
 
+try:
+    import fcntl
+except ImportError:  # Windows: single-worker development only
+    fcntl = None
+
 from src.core.config import PROJECT_ROOT
+from src.core.log_writer import get_log_writer
 
 LOGS_DIR = PROJECT_ROOT / "logs"
 LOG_FILE = LOGS_DIR / "sessions.jsonl"
+COUNTER_FILE = LOGS_DIR / "session_counter"
+COUNTER_LOCK = LOGS_DIR / "session_counter.lock"
 
+_counter_lock = threading.Lock()
 
 
-def get_next_session_id() -> int:
+def _scan_max_session_id() -> int:
     """
-    Scan the log file to find the highest session_id and return the next one.
-    Defaults to 1 if no logs exist.
+    One-time seed for the counter: highest integer session_id in the log
+    and its rotated archives.
     """
-    if not LOG_FILE.exists():
-        return 1
+    files = sorted(LOGS_DIR.glob(f"{LOG_FILE.stem}.*{LOG_FILE.suffix}.gz"))
+    if LOG_FILE.exists():
+        files.append(LOG_FILE)
 
     max_id = 0
-    try:
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    record = json.loads(line)
-                    sid = record.get("session_id", 0)
-                    if isinstance(sid, int) and sid > max_id:
-                        max_id = sid
-                except json.JSONDecodeError:
-                    continue
-    except Exception:
-        return 1
-    
-    return max_id + 1
+    for path in files:
+        try:
+            opener = gzip.open if path.suffix == ".gz" else open
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        sid = record.get("session_id", 0)
+                        if isinstance(sid, int) and sid > max_id:
+                            max_id = sid
+                    except json.JSONDecodeError:
+                        continue
+        except Exception:
+            continue
+    return max_id
+
+
+def get_next_session_id() -> int:
+    """
+    Reserve and return the next sequential session ID.
+
+    The last issued ID is persisted in logs/session_counter, so this is O(1)
+    instead of a scan of sessions.jsonl; the logs are only scanned once to
+    seed the counter if it does not exist yet. Workers serialize on an
+    flock of logs/session_counter.lock, and each writes the new value
+    through its own temp file before renaming it over the counter.
+    """
+    LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    with _counter_lock, open(COUNTER_LOCK, "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            current = int(COUNTER_FILE.read_text(encoding="utf-8").strip())
+        except (FileNotFoundError, ValueError):
+            current = _scan_max_session_id()
+
+        next_id = current + 1
+        tmp = COUNTER_FILE.with_name(f"{COUNTER_FILE.name}.{os.getpid()}.tmp")
+        tmp.write_text(str(next_id), encoding="utf-8")
+        os.replace(tmp, COUNTER_FILE)
+    return next_id
 
 
 def log_session(
@@ -50,11 +88,15 @@ def log_session(
     sources_count: int = 0,
     temperature: float = 0.1,
     duration_ms: int = 0,
+    timings: Optional[Dict[str, float]] = None,
 ) -> None:
-    """Append a session record to the JSONL log file."""
+    """
+    Queue a session record for the JSONL log file (written in the background).
+
+    `timings` is the per-stage latency breakdown (ms) from the chat turn.
+    """
     if sources is None:
         sources = []
-    LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
     record = {
         "timestamp": datetime.now(timezone.utc).isoformat(),
@@ -68,7 +110,8 @@ def log_session(
         "temperature": temperature,
         "duration_ms": duration_ms,
     }
+    if timings:
+        record["timings"] = timings
 
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    get_log_writer().write(LOG_FILE, record)
 
@@ -0,0 +1,321 @@
+"""
+Session Store — bounded in-memory session state over the shared-state backend.
+
+Active sessions (system prompt, temperature, conversation history) live in
+an LRU-ordered memory tier capped by count and idle TTL. A session evicted
+from memory, or from a previous server run, is reloaded lazily on its next
+request.
+
+With a single worker, changes marked with `save()` are written behind by a
+background thread, so a chat turn never waits on disk. With several
+workers sharing the backend, `save()` writes through and `get()` checks the
+stored version, so a turn served by another worker is never answered from
+a stale copy.
+"""
+
+import atexit
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from src.core.config import (
+    DEFAULT_SYSTEM_PROMPT,
+    LLM_TEMPERATURE,
+    SESSION_MAX_RESIDENT,
+    SESSION_IDLE_TTL_SECONDS,
+    SESSION_FLUSH_INTERVAL,
+    SESSION_RETENTION_DAYS,
+    WORKERS,
+)
+from src.core.shared_state import SharedState, get_shared_state
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "session:"
+
+
+def new_session_state() -> Dict:
+    """State of a session that has never been seen."""
+    return {
+        "system_prompt": DEFAULT_SYSTEM_PROMPT,
+        "conversation_history": [],
+        "temperature": LLM_TEMPERATURE,
+    }
+
+
+def _encode(state: Dict) -> str:
+    payload = dict(state)
+    if payload.get("system_prompt") == DEFAULT_SYSTEM_PROMPT:
+        payload["system_prompt"] = None  # don't store the default prompt per session
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def _decode(payload: str) -> Dict:
+    state = new_session_state()
+    state.update(json.loads(payload))
+    if state["system_prompt"] is None:
+        state["system_prompt"] = DEFAULT_SYSTEM_PROMPT
+    return state
+
+
+def deep_sizeof(obj, _seen: Optional[set] = None) -> int:
+    """Approximate resident bytes of a JSON-like object graph."""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    return size
+
+
+class SessionStore:
+    """LRU/TTL-bounded session cache, persisted through a SharedState backend."""
+
+    def __init__(
+        self,
+        backend: SharedState,
+        max_resident: int,
+        idle_ttl: float,
+        flush_interval: float,
+        retention_days: float,
+        write_through: bool = False,
+    ):
+        self.backend = backend
+        self.write_through = write_through
+        self.max_resident = max_resident
+        self.idle_ttl = idle_ttl
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_days * 86400
+        self._resident: "OrderedDict[str, Dict]" = OrderedDict()  # LRU order
+        self._last_access: Dict[str, float] = {}
+        self._versions: Dict[str, int] = {}  # backend version of each resident copy
+        self._dirty: Dict[str, str] = {}  # session_id -> encoded payload awaiting write
+        self._writing: Dict[str, str] = {}  # batch currently being written
+        self._dirty_live: set = set()     # resident sessions changed since last flush
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.evicted_total = 0
+        self._last_purge = 0.0
+        self._thread = threading.Thread(target=self._run, name="session-store", daemon=True)
+        self._thread.start()
+
+    # ── Backend tier ─────────────────────────────────────────────────
+
+    def _write(self, batch: Dict[str, str]) -> Dict[str, int]:
+        versions = self.backend.put_many({_KEY_PREFIX + sid: payload for sid, payload in batch.items()})
+        now = time.time()
+        if self.retention_seconds and now - self._last_purge > 3600:
+            self.backend.purge(_KEY_PREFIX, now - self.retention_seconds)
+            self._last_purge = now
+        return {key[len(_KEY_PREFIX):]: version for key, version in versions.items()}
+
+    # ── Memory tier ──────────────────────────────────────────────────
+
+    def get(self, session_id: str) -> Dict:
+        """Return the session's state, reloading or creating it as needed."""
+        return self._get(session_id, create=True)
+
+    def peek(self, session_id: str) -> Optional[Dict]:
+        """Like get(), but None instead of creating an unknown session."""
+        return self._get(session_id, create=False)
+
+    def _get(self, session_id: str, create: bool) -> Optional[Dict]:
+        with self._lock:
+            state = self._touch(session_id)
+            if state is not None and not self.write_through:
+                return state
+            version = self._versions.get(session_id, 0)
+            pending = self._dirty.get(session_id) or self._writing.get(session_id)
+        if state is not None:
+            # Another worker may have saved a newer copy
+            fresh = self.backend.get_if_newer(_KEY_PREFIX + session_id, version)
+            if fresh is None:
+                return state
+            with self._lock:
+                return self._replace(session_id, fresh)
+
+        if pending:
+            loaded = (version, pending)
+        else:
+            loaded = self.backend.get(_KEY_PREFIX + session_id)
+        if loaded is None and not create:
+            return None
+        with self._lock:
+            # Another request may have loaded it meanwhile
+            existing = self._touch(session_id)
+            if existing is not None:
+                return existing
+            if loaded is None:
+                state = new_session_state()
+            else:
+                state = _decode(loaded[1])
+                self._versions[session_id] = loaded[0]
+            self._admit(session_id, state)
+            return state
+
+    def _replace(self, session_id: str, fresh) -> Dict:
+        """Swap a stale resident copy for the backend's newer one."""
+        state = self._resident.get(session_id)
+        if state is None or self._versions.get(session_id, 0) < fresh[0]:
+            state = _decode(fresh[1])
+            self._versions[session_id] = fresh[0]
+            self._admit(session_id, state)
+        return state
+
+    def save(self, session_id: str, state: Dict) -> None:
+        """
+        Record a change to a session's state; it is persisted in the
+        background (or at once, when written through). Re-admits the state
+        if it was evicted while in use.
+        """
+        with self._lock:
+            if self._resident.get(session_id) is not state:
+                self._dirty.pop(session_id, None)
+                self._admit(session_id, state)
+            else:
+                self._resident.move_to_end(session_id)
+            if not self.write_through:
+                self._dirty_live.add(session_id)
+                return
+            payload = _encode(state)
+        # Concurrent turns of one session on two workers: the last save wins
+        version = self._write({session_id: payload})[session_id]
+        with self._lock:
+            self._versions[session_id] = max(version, self._versions.get(session_id, 0))
+
+    def _touch(self, session_id: str) -> Optional[Dict]:
+        state = self._resident.get(session_id)
+        if state is not None:
+            self._resident.move_to_end(session_id)
+            self._last_access[session_id] = time.monotonic()
+        return state
+
+    def _admit(self, session_id: str, state: Dict) -> None:
+        self._resident[session_id] = state
+        self._resident.move_to_end(session_id)
+        self._last_access[session_id] = time.monotonic()
+        while len(self._resident) > self.max_resident:
+            self._evict(next(iter(self._resident)))
+
+    def _evict(self, session_id: str) -> None:
+        state = self._resident.pop(session_id)
+        self._last_access.pop(session_id, None)
+        self._versions.pop(session_id, None)
+        if session_id in self._dirty_live:
+            self._dirty_live.discard(session_id)
+            self._dirty[session_id] = _encode(state)  # still written behind
+        self.evicted_total += 1
+
+    def _evict_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            # LRU order: idle sessions are at the front
+            while self._resident:
+                oldest = next(iter(self._resident))
+                if self._last_access.get(oldest, 0) > cutoff:
+                    break
+                self._evict(oldest)
+
+    # ── Write-behind ─────────────────────────────────────────────────
+
+    def flush(self) -> None:
+        """Write every pending change to SQLite now."""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._dirty
+                self._dirty = {}
+                for session_id in self._dirty_live:
+                    batch[session_id] = _encode(self._resident[session_id])
+                self._dirty_live = set()
+                self._writing = batch
+            if not batch:
+                return
+            try:
+                versions = self._write(batch)
+            except Exception as e:
+                logger.error("Session store write failed (%d sessions): %s", len(batch), e)
+                with self._lock:
+                    for session_id, payload in batch.items():
+                        self._dirty.setdefault(session_id, payload)  # retry next cycle
+            else:
+                with self._lock:
+                    for session_id, version in versions.items():
+                        if session_id in self._resident:
+                            self._versions[session_id] = version
+            finally:
+                with self._lock:
+                    self._writing = {}
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self._evict_idle()
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the background thread and persist everything still pending."""
+        self._stop.set()
+        self._thread.join(timeout=10)
+        self.flush()
+
+    # ── Reporting ────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+    def memory_report(self, top: int = 20) -> Dict:
+        """Resident session count, estimated bytes in total and for the largest sessions."""
+        with self._lock:
+            items = list(self._resident.items())
+            pending = len(self._dirty) + len(self._dirty_live)
+        now = time.monotonic()
+        per_session = []
+        for session_id, state in items:
+            # The default prompt is shared, not held per session
+            own = {k: v for k, v in state.items() if v is not DEFAULT_SYSTEM_PROMPT}
+            per_session.append({
+                "session_id": session_id,
+                "bytes": deep_sizeof(own),
+                "messages": len(state.get("conversation_history", [])),
+                "idle_seconds": round(now - self._last_access.get(session_id, now), 1),
+            })
+        per_session.sort(key=lambda s: s["bytes"], reverse=True)
+        return {
+            "resident": len(items),
+            "max_resident": self.max_resident,
+            "resident_bytes": sum(s["bytes"] for s in per_session),
+            "pending_writes": pending,
+            "evicted_total": self.evicted_total,
+            "largest": per_session[:top],
+        }
+
+
+# ── Lazy singleton ───────────────────────────────────────────────────────
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Return the process-wide session store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = get_shared_state()
+            _store = SessionStore(
+                backend,
+                max_resident=SESSION_MAX_RESIDENT,
+                idle_ttl=SESSION_IDLE_TTL_SECONDS,
+                flush_interval=SESSION_FLUSH_INTERVAL,
+                retention_days=SESSION_RETENTION_DAYS,
+                write_through=backend.shared and WORKERS > 1,
+            )
+            atexit.register(_store.close)
+    return _store
@@ -0,0 +1,263 @@
+"""
+Shard Router — scatter-gather over retrieval service nodes.
+
+RETRIEVAL_SHARDS assigns libraries to retrieval nodes
+(`scripts/run_retrieval_server.py`), `;`-separated, with `*` as the default:
+
+    wac_chapters=tcp:10.0.0.2:7070|tcp:10.0.0.3:7070;*=tcp:10.0.0.4:7070
+
+A library listed with several nodes is hash-partitioned across them: node i
+holds the chunks whose id hashes to i (`partition_of`; built with
+`scripts/split_shards.py`, so the node order matters). A search goes to
+every partition in parallel, each with its own timeout, and the per-node
+top-k lists are merged into the global top-k by distance. `get_chunks`
+goes straight to the partitions that own the ids.
+
+A node that fails RETRIEVAL_SHARD_FAILURES times in a row is skipped for a
+cooldown that doubles on each further failure (up to a minute); after it,
+one request is let through as a probe. Searches return whatever the healthy
+partitions found and log the gap; they fail only when no partition answers.
+"""
+
+import heapq
+import logging
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from src.core import metrics
+from src.core.config import (
+    RETRIEVAL_SERVICE,
+    RETRIEVAL_SHARDS,
+    RETRIEVAL_SHARD_FAILURES,
+    RETRIEVAL_TIMEOUT_SECONDS,
+)
+from src.core.retrieval_service import RetrievalClient, RetrievalUnavailable
+
+logger = logging.getLogger(__name__)
+
+_RESULT_KEYS = ("ids", "documents", "metadatas", "distances")
+
+SHARD_REQUESTS = metrics.register(metrics.Counter(
+    "rag_retrieval_node_requests_total",
+    "Requests to retrieval nodes by outcome (ok, unavailable, skipped).",
+    labels=("node", "outcome"),
+))
+
+
+def partition_of(chunk_id: str, partitions: int) -> int:
+    """Partition index of a chunk id (stable across processes and releases)."""
+    return zlib.crc32(chunk_id.encode("utf-8")) % partitions
+
+
+def parse_shard_map(spec: str) -> Dict[str, List[str]]:
+    """'lib=addr|addr;*=addr' → {'lib': [addr, addr], '*': [addr]}."""
+    shard_map: Dict[str, List[str]] = {}
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        library, sep, nodes = entry.partition("=")
+        addresses = [a.strip() for a in nodes.split("|") if a.strip()]
+        if not sep or not library.strip() or not addresses:
+            raise ValueError(f"Bad RETRIEVAL_SHARDS entry {entry!r} (library=addr|addr)")
+        shard_map[library.strip()] = addresses
+    return shard_map
+
+
+def merge_results(results: List[dict], n_results: int) -> dict:
+    """Global top-n per query row from several nodes' Chroma result dicts."""
+    merged = {key: [] for key in _RESULT_KEYS}
+    for row in range(len(results[0]["ids"])):
+        candidates = []
+        for result in results:
+            candidates.extend(zip(
+                result["distances"][row], result["ids"][row],
+                result["documents"][row], result["metadatas"][row],
+            ))
+        best = heapq.nsmallest(n_results, candidates, key=lambda c: c[0])
+        merged["distances"].append([c[0] for c in best])
+        merged["ids"].append([c[1] for c in best])
+        merged["documents"].append([c[2] for c in best])
+        merged["metadatas"].append([c[3] for c in best])
+    return merged
+
+
+class NodeHealth:
+    """Consecutive-failure tracking with exponential cooldown for one node."""
+
+    def __init__(self, address: str, threshold: int, base_cooldown: float = 1.0, max_cooldown: float = 60.0):
+        self.address = address
+        self.threshold = threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.last_error = ""
+        self.latency_ms = 0.0  # moving average of successful calls
+        self._lock = threading.Lock()
+
+    @property
+    def up(self) -> bool:
+        return self.consecutive_failures < self.threshold
+
+    def acquire(self) -> bool:
+        """True if a request may go to this node now (healthy, or due a probe)."""
+        with self._lock:
+            if self.up:
+                return True
+            now = time.monotonic()
+            if now < self.down_until:
+                return False
+            self.down_until = now + self.base_cooldown  # one probe at a time
+            return True
+
+    def success(self, seconds: float) -> None:
+        with self._lock:
+            if not self.up:
+                logger.info("Retrieval node %s is back", self.address)
+            self.requests += 1
+            self.consecutive_failures = 0
+            ms = seconds * 1000
+            self.latency_ms = ms if not self.latency_ms else 0.9 * self.latency_ms + 0.1 * ms
+
+    def failure(self, error: Exception) -> None:
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error)
+            if not self.up:
+                excess = self.consecutive_failures - self.threshold
+                cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** excess)
+                self.down_until = time.monotonic() + cooldown
+                logger.warning("Retrieval node %s down for %.0fs: %s", self.address, cooldown, error)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "up": self.up,
+                "requests": self.requests,
+                "failures": self.failures,
+                "consecutive_failures": self.consecutive_failures,
+                "retry_in_s": round(max(0.0, self.down_until - time.monotonic()), 1) if not self.up else 0.0,
+                "latency_ms": round(self.latency_ms, 2),
+                "last_error": self.last_error,
+            }
+
+
+class ShardRouter:
+    """Routes vector_store reads to retrieval nodes and merges partitioned results."""
+
+    def __init__(self, shard_map: Dict[str, List[str]], timeout: float, failure_threshold: int):
+        self.shard_map = shard_map
+        self.timeout = timeout
+        addresses = sorted({a for nodes in shard_map.values() for a in nodes})
+        self.clients = {a: RetrievalClient(a, timeout=timeout) for a in addresses}
+        self.health = {a: NodeHealth(a, failure_threshold) for a in addresses}
+        widest = max(len(nodes) for nodes in shard_map.values())
+        self._pool = ThreadPoolExecutor(max_workers=max(4, 4 * widest), thread_name_prefix="shard")
+
+    def nodes_for(self, collection_name: str) -> Optional[List[str]]:
+        return self.shard_map.get(collection_name) or self.shard_map.get("*")
+
+    def serves(self, collection_name: str) -> bool:
+        return self.nodes_for(collection_name) is not None
+
+    def _call(self, address: str, method: str, *args):
+        health = self.health[address]
+        if not health.acquire():
+            SHARD_REQUESTS.inc(address, "skipped")
+            raise RetrievalUnavailable(f"Retrieval node {address} is down ({health.last_error})")
+        start = time.perf_counter()
+        try:
+            result = getattr(self.clients[address], method)(*args)
+        except RetrievalUnavailable as e:
+            health.failure(e)
+            SHARD_REQUESTS.inc(address, "unavailable")
+            raise
+        health.success(time.perf_counter() - start)
+        SHARD_REQUESTS.inc(address, "ok")
+        return result
+
+    def _scatter(self, calls: Dict[str, tuple], what: str) -> Dict[str, dict]:
+        """Run one call per node in parallel; results of the nodes that answered."""
+        futures = {self._pool.submit(self._call, address, *args): address for address, args in calls.items()}
+        # Each call carries its own socket timeout; the slack covers connect + scheduling
+        done, pending = wait(futures, timeout=self.timeout + 0.5)
+        results, failed = {}, [futures[f] for f in pending]
+        for future in done:
+            error = future.exception()
+            if error is None:
+                results[futures[future]] = future.result()
+            elif isinstance(error, RetrievalUnavailable):
+                failed.append(futures[future])
+            else:
+                raise error  # the node answered with an error: the request itself is bad
+        if not results:
+            raise RetrievalUnavailable(f"No retrieval node answered for {what}: {', '.join(failed)}")
+        if failed:
+            # Nodes already marked down were reported when they went down
+            log = logger.warning if any(self.health[a].up for a in failed) else logger.debug
+            log("Partial results for %s: %s did not answer", what, ", ".join(failed))
+        return results
+
+    # ── Operations (same shapes as RetrievalClient) ──────────────────
+
+    def query(self, collection_name: str, query_embeddings: list, n_results: int, where: Optional[dict] = None) -> dict:
+        nodes = self.nodes_for(collection_name)
+        if len(nodes) == 1:
+            return self._call(nodes[0], "query", collection_name, query_embeddings, n_results, where)
+        args = ("query", collection_name, query_embeddings, n_results, where)
+        results = self._scatter({address: args for address in nodes}, collection_name)
+        return merge_results(list(results.values()), n_results)
+
+    def get(self, collection_name: str, ids: list) -> dict:
+        nodes = self.nodes_for(collection_name)
+        if len(nodes) == 1:
+            return self._call(nodes[0], "get", collection_name, ids)
+        owned: Dict[str, list] = {}
+        for chunk_id in ids:
+            owned.setdefault(nodes[partition_of(chunk_id, len(nodes))], []).append(chunk_id)
+        calls = {address: ("get", collection_name, part) for address, part in owned.items()}
+        found = {}
+        for result in self._scatter(calls, collection_name).values():
+            for row in zip(result["ids"], result["documents"], result["metadatas"]):
+                found[row[0]] = row
+        rows = [found[i] for i in ids if i in found]
+        return {"ids": [r[0] for r in rows], "documents": [r[1] for r in rows], "metadatas": [r[2] for r in rows]}
+
+    def stats(self, collection_name: str) -> dict:
+        nodes = self.nodes_for(collection_name)
+        counts = [self._call(address, "stats", collection_name)["count"] for address in nodes]
+        return {"name": collection_name, "count": sum(counts)}
+
+    def node_report(self) -> dict:
+        """Health of every node and the libraries it serves."""
+        report = {address: health.snapshot() for address, health in self.health.items()}
+        for library, nodes in self.shard_map.items():
+            for i, address in enumerate(nodes):
+                label = library if len(nodes) == 1 else f"{library}[{i}/{len(nodes)}]"
+                report[address].setdefault("serves", []).append(label)
+        return report
+
+
+# ── Lazy singleton ───────────────────────────────────────────────────────
+_router: Optional[ShardRouter] = None
+_router_built = False
+_router_lock = threading.Lock()
+
+
+def get_shard_router() -> Optional[ShardRouter]:
+    """Router for RETRIEVAL_SHARDS / RETRIEVAL_SERVICE, or None when ChromaDB is used in-process."""
+    global _router, _router_built
+    with _router_lock:
+        if not _router_built:
+            shard_map = parse_shard_map(RETRIEVAL_SHARDS)
+            if RETRIEVAL_SERVICE:
+                shard_map.setdefault("*", [RETRIEVAL_SERVICE])
+            if shard_map:
+                _router = ShardRouter(shard_map, RETRIEVAL_TIMEOUT_SECONDS, RETRIEVAL_SHARD_FAILURES)
+            _router_built = True
+    return _router
@@ -0,0 +1,320 @@
+"""
+Shared State — key/value and rate-limit storage visible to every worker.
+
+Uvicorn workers are separate processes, so anything kept in a module-level
+dict is private to one of them. Session state and rate-limit counters go
+through a `SharedState` backend instead:
+
+    memory   in-process dicts; one worker only, nothing survives a restart
+    sqlite   a WAL-mode SQLite file shared by every worker on this host
+
+Values are versioned: every `put` bumps the key's version, so a worker
+holding a cached copy can ask `get_if_newer` whether another worker has
+changed it. Rate limits are token buckets kept as a single timestamp per
+key (GCRA: the time at which the bucket would be full again), so a check
+costs the same however busy the key is. A networked store (e.g. Redis: a
+hash with a version field updated in a MULTI or Lua script, and the bucket
+update as another Lua script) only needs to implement the same few methods.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from src.core.config import RATE_LIMIT_MAX_KEYS, SHARED_STATE_BACKEND, SHARED_STATE_PATH
+
+logger = logging.getLogger(__name__)
+
+Versioned = Tuple[int, str]  # (version, value)
+
+
+def take_token(full_at: float, now: float, limit: int, window: float, cost: int = 1) -> Tuple[bool, float]:
+    """
+    Token bucket of `limit` tokens refilled over `window` seconds, stored as
+    the time it will be full again (GCRA). Takes `cost` tokens if that many
+    are available, otherwise none; returns (allowed, new full_at). A bucket
+    with full_at <= now is full.
+    """
+    interval = window / limit
+    full_at = max(full_at, now)
+    if full_at - now > window - cost * interval:
+        return False, full_at
+    return True, full_at + cost * interval
+
+
+class SharedState:
+    """Interface for state shared across worker processes."""
+
+    #: True if other processes see writes (so cached copies can go stale)
+    shared = False
+
+    def get(self, key: str) -> Optional[Versioned]:
+        """Current (version, value) of a key, or None."""
+        raise NotImplementedError
+
+    def get_if_newer(self, key: str, version: int) -> Optional[Versioned]:
+        """(version, value) if the key changed since `version`, else None."""
+        current = self.get(key)
+        return current if current and current[0] != version else None
+
+    def put(self, key: str, value: str) -> int:
+        """Store a value and return its new version."""
+        raise NotImplementedError
+
+    def put_many(self, items: Dict[str, str]) -> Dict[str, int]:
+        """Store several values; returns their new versions."""
+        return {key: self.put(key, value) for key, value in items.items()}
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def purge(self, prefix: str, older_than: float) -> int:
+        """Delete keys under `prefix` not written since `older_than` (epoch s)."""
+        raise NotImplementedError
+
+    def hit(self, key: str, limit: int, window: float, cost: int = 1) -> bool:
+        """
+        Take `cost` tokens from `key`'s bucket (`limit` tokens, refilled over
+        `window` seconds). Returns False, taking nothing, when fewer are
+        left. Must be atomic across workers.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryState(SharedState):
+    """
+    Process-local backend: correct for a single worker only.
+
+    Rate-limit buckets are kept in least-recently-hit order. Each hit drops a
+    couple of buckets from the cold end once they have refilled (a full
+    bucket is the same as no bucket), and at most `max_rate_keys` are kept,
+    so rotating client addresses cannot grow memory without bound.
+    """
+
+    def __init__(self, max_rate_keys: int = RATE_LIMIT_MAX_KEYS):
+        self._values: Dict[str, Tuple[int, float, str]] = {}  # key -> (version, updated_at, value)
+        # key -> time the bucket is full again, least recently hit first
+        self._buckets: "OrderedDict[str, float]" = OrderedDict()
+        self.max_rate_keys = max_rate_keys
+        self.rate_keys_evicted = 0  # dropped by the cap before they refilled
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Versioned]:
+        entry = self._values.get(key)
+        return (entry[0], entry[2]) if entry else None
+
+    def put(self, key: str, value: str) -> int:
+        with self._lock:
+            version = self._values.get(key, (0,))[0] + 1
+            self._values[key] = (version, time.time(), value)
+        return version
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+    def purge(self, prefix: str, older_than: float) -> int:
+        with self._lock:
+            stale = [k for k, (_, updated, _) in self._values.items()
+                     if k.startswith(prefix) and updated < older_than]
+            for key in stale:
+                del self._values[key]
+        return len(stale)
+
+    def hit(self, key: str, limit: int, window: float, cost: int = 1) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            buckets = self._buckets
+            full_at = buckets.pop(key, None)
+            allowed, buckets[key] = take_token(full_at or now, now, limit, window, cost)
+            if full_at is None and len(buckets) > self.max_rate_keys:
+                buckets.popitem(last=False)
+                self.rate_keys_evicted += 1
+            self._evict_full(now)
+        return allowed
+
+    def _evict_full(self, now: float, budget: int = 2) -> None:
+        # Amortized O(1): the coldest buckets are the first to refill
+        for _ in range(budget):
+            if not self._buckets:
+                return
+            key = next(iter(self._buckets))
+            if self._buckets[key] > now:
+                return
+            del self._buckets[key]
+
+    @property
+    def rate_keys(self) -> int:
+        """Rate-limit buckets currently tracked."""
+        return len(self._buckets)
+
+
+class SQLiteState(SharedState):
+    """
+    WAL-mode SQLite file shared by all workers on one host. Each process
+    keeps one connection; writes that must be atomic across processes run
+    in `BEGIN IMMEDIATE` transactions.
+
+    Rate-limit rows are swept every _BUCKET_PURGE_INTERVAL seconds, or
+    sooner once this process has added a tenth of `max_rate_keys` new keys:
+    refilled buckets are deleted, then the nearest-to-full ones until at
+    most `max_rate_keys` remain.
+    """
+
+    shared = True
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS kv (
+            key        TEXT PRIMARY KEY,
+            version    INTEGER NOT NULL,
+            updated_at REAL NOT NULL,
+            value      TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS rate_buckets (
+            key     TEXT PRIMARY KEY,
+            full_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS rate_buckets_full_at ON rate_buckets (full_at);
+        DROP TABLE IF EXISTS rate_hits;
+    """
+    _UPSERT = """
+        INSERT INTO kv (key, version, updated_at, value) VALUES (?, 1, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET
+            version = version + 1, updated_at = excluded.updated_at, value = excluded.value
+        RETURNING version
+    """
+    _BUCKET_PURGE_INTERVAL = 300  # seconds between sweeps of idle rate-limit rows
+
+    def __init__(self, path: str, max_rate_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly below
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=30, check_same_thread=False, isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+        self._lock = threading.Lock()
+        self.max_rate_keys = max_rate_keys
+        self.rate_keys_evicted = 0  # dropped by the cap before they refilled
+        self._last_bucket_purge = time.time()
+        self._new_rate_keys = 0  # inserted by this process since the last sweep
+
+    def _transaction(self):
+        return _Immediate(self._conn)
+
+    def get(self, key: str) -> Optional[Versioned]:
+        with self._lock:
+            row = self._conn.execute("SELECT version, value FROM kv WHERE key = ?", (key,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def get_if_newer(self, key: str, version: int) -> Optional[Versioned]:
+        # Only the version is compared, so an unchanged value is never copied out
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, value FROM kv WHERE key = ? AND version != ?", (key, version)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put(self, key: str, value: str) -> int:
+        return self.put_many({key: value})[key]
+
+    def put_many(self, items: Dict[str, str]) -> Dict[str, int]:
+        now = time.time()
+        versions = {}
+        with self._lock, self._transaction():
+            for key, value in items.items():
+                versions[key] = self._conn.execute(self._UPSERT, (key, now, value)).fetchone()[0]
+        return versions
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def purge(self, prefix: str, older_than: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM kv WHERE key >= ? AND key < ? AND updated_at < ?",
+                (prefix, prefix + "\uffff", older_than),
+            )
+        return cursor.rowcount
+
+    def hit(self, key: str, limit: int, window: float, cost: int = 1) -> bool:
+        now = time.time()
+        with self._lock, self._transaction():
+            row = self._conn.execute(
+                "SELECT full_at FROM rate_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            allowed, full_at = take_token(row[0] if row else now, now, limit, window, cost)
+            if allowed:
+                self._conn.execute("INSERT OR REPLACE INTO rate_buckets VALUES (?, ?)", (key, full_at))
+                self._new_rate_keys += row is None
+            if (now - self._last_bucket_purge > self._BUCKET_PURGE_INTERVAL
+                    or self._new_rate_keys >= max(1, self.max_rate_keys // 10)):
+                self._sweep_buckets(now)
+        return allowed
+
+    def _sweep_buckets(self, now: float) -> None:
+        # Full buckets are the same as no bucket
+        self._conn.execute("DELETE FROM rate_buckets WHERE full_at <= ?", (now,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0] - self.max_rate_keys
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM rate_buckets WHERE key IN "
+                "(SELECT key FROM rate_buckets ORDER BY full_at LIMIT ?)",
+                (excess,),
+            )
+            self.rate_keys_evicted += excess
+        self._last_bucket_purge = now
+        self._new_rate_keys = 0
+
+    @property
+    def rate_keys(self) -> int:
+        """Rate-limit buckets currently stored, across all workers."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class _Immediate:
+    """BEGIN IMMEDIATE … COMMIT/ROLLBACK: takes the write lock up front."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+# ── Lazy singleton ───────────────────────────────────────────────────────
+_state: Optional[SharedState] = None
+_state_lock = threading.Lock()
+
+
+def get_shared_state() -> SharedState:
+    """Return the process-wide backend selected by SHARED_STATE_BACKEND."""
+    global _state
+    with _state_lock:
+        if _state is None:
+            if SHARED_STATE_BACKEND == "memory":
+                _state = MemoryState()
+            elif SHARED_STATE_BACKEND == "sqlite":
+                _state = SQLiteState(SHARED_STATE_PATH)
+            else:
+                raise ValueError(f"Unknown SHARED_STATE_BACKEND: {SHARED_STATE_BACKEND!r}")
+            logger.info("Shared state backend: %s", SHARED_STATE_BACKEND)
+    return _state
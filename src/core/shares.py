@@ -0,0 +1,308 @@
+"""
+Shares Repository — shared conversations in SQLite, served from memory.
+
+Conversations are stored compressed (zstd when the `zstandard` package is
+installed, gzip otherwise) through a small pool of long-lived connections.
+Reads go through an LRU of ready-to-send response bodies with their ETags,
+so a popular link is answered without touching the database, decompressing
+or re-serializing JSON. With several workers a cached body is revalidated
+against the row's timestamp (a primary-key lookup) because another worker
+may have updated the share; with one worker writes invalidate it directly.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from src.core.config import (
+    SHARES_DB_PATH,
+    SHARES_POOL_SIZE,
+    SHARES_COMPRESSION,
+    SHARES_CACHE_MAX_BYTES,
+    WORKERS,
+)
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is used instead
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+_CREATE_SHARES_TABLE = """
+    CREATE TABLE IF NOT EXISTS shared_conversations (
+        share_id      TEXT PRIMARY KEY,
+        created_at    TEXT NOT NULL,
+        expires_at    TEXT,
+        title         TEXT NOT NULL,
+        encoding      TEXT NOT NULL,
+        conversation  BLOB NOT NULL,
+        message_count INTEGER NOT NULL
+    )
+"""
+
+
+class ShareExpired(Exception):
+    """The share exists but its (legacy) expiry date has passed."""
+
+
+class CachedShare(NamedTuple):
+    body: bytes        # JSON response body
+    etag: str
+    created_at: str
+    expires_at: Optional[str]
+
+
+# ── Payload encoding ─────────────────────────────────────────────────────
+
+def default_encoding() -> str:
+    if SHARES_COMPRESSION == "auto":
+        return "zstd" if zstandard is not None else "gzip"
+    return SHARES_COMPRESSION
+
+
+def encode_conversation(history: List, encoding: str) -> bytes:
+    raw = json.dumps(history, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=9).compress(raw)
+    if encoding == "gzip":
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    return raw
+
+
+def decode_conversation(data, encoding: str) -> bytes:
+    """Stored payload → raw conversation JSON (bytes)."""
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Share is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    return data.encode("utf-8") if isinstance(data, str) else bytes(data)
+
+
+def _response_body(title: str, conversation_json: bytes, created_at: str) -> bytes:
+    # Splice the stored JSON in as-is rather than parsing and re-dumping it
+    return b"".join([
+        b'{"title":', json.dumps(title, ensure_ascii=False).encode("utf-8"),
+        b',"conversation":', conversation_json,
+        b',"created_at":', json.dumps(created_at).encode("utf-8"), b"}",
+    ])
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> dict:
+    """{column name: table_info row} of a table; empty if it does not exist."""
+    return {col[1]: col for col in conn.execute(f"PRAGMA table_info({table})")}
+
+
+class SharesRepository:
+    """Pooled SQLite storage for shares with an in-memory LRU of response bodies."""
+
+    def __init__(self, path: str, pool_size: int, cache_max_bytes: int, revalidate: bool):
+        self.path = Path(path)
+        self.cache_max_bytes = cache_max_bytes
+        self.revalidate = revalidate
+        self.encoding = default_encoding()
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        self._pool_size = pool_size
+        self._opened = 0
+        self._pool_lock = threading.Lock()
+        self._cache: "OrderedDict[str, CachedShare]" = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ── Connection pool ──────────────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection; opened lazily up to the pool size."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_open = self._opened < self._pool_size
+                if can_open:
+                    self._opened += 1
+            conn = self._connect() if can_open else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def init_db(self) -> None:
+        """Create the table and migrate older layouts."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.connection() as conn:
+            # Every worker runs this at startup: the schema is checked and
+            # migrated inside one write transaction, so the first worker
+            # migrates and the others find the new layout once they get the lock
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(_CREATE_SHARES_TABLE)
+                if "conversation_json" in _columns(conn, "shared_conversations"):
+                    conn.execute("ALTER TABLE shared_conversations RENAME TO _shares_old")
+                    conn.execute(_CREATE_SHARES_TABLE)
+                # Also left behind by an interrupted migration of earlier versions
+                legacy = _columns(conn, "_shares_old")
+                if legacy:
+                    # col = (cid, name, type, notnull, dflt_value, pk)
+                    self._migrate_plain_json(conn, legacy_expiry=legacy["expires_at"][3] == 1)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def _migrate_plain_json(self, conn: sqlite3.Connection, legacy_expiry: bool) -> None:
+        # Uncompressed JSON layout (and, before that, a NOT NULL expires_at)
+        expires = "NULL" if legacy_expiry else "expires_at"
+        rows = conn.execute(
+            f"SELECT share_id, created_at, {expires}, title, conversation_json, message_count FROM _shares_old"
+        ).fetchall()
+        conn.executemany(
+            "INSERT OR IGNORE INTO shared_conversations VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(sid, created, exp, title, self.encoding,
+              encode_conversation(json.loads(conv), self.encoding), count)
+             for sid, created, exp, title, conv, count in rows],
+        )
+        conn.execute("DROP TABLE _shares_old")
+        logger.info("Migrated %d shares to %s-compressed storage", len(rows), self.encoding)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    # ── Reads and writes ─────────────────────────────────────────────
+
+    def save(self, share_id: str, title: str, history: List) -> None:
+        """Create or replace a share."""
+        created_at = datetime.now(timezone.utc).isoformat()
+        payload = encode_conversation(history, self.encoding)
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_conversations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (share_id, created_at, None, title, self.encoding, payload, len(history)),
+            )
+            conn.commit()
+        self._evict(share_id)
+
+    def get(self, share_id: str) -> Optional[CachedShare]:
+        """
+        Response body and ETag for a share, or None if it doesn't exist.
+        Raises ShareExpired for legacy rows past their expiry.
+        """
+        cached = self._cached(share_id)
+        if cached is not None and self.revalidate and cached.created_at != self._created_at(share_id):
+            self._evict(share_id)
+            cached = None
+        if cached is None:
+            self.misses += 1
+            cached = self._load(share_id)
+            if cached is None:
+                return None
+            self._remember(share_id, cached)
+        else:
+            self.hits += 1
+
+        # Check expiry only if expires_at was set (legacy rows)
+        if cached.expires_at and datetime.now(timezone.utc) > datetime.fromisoformat(cached.expires_at):
+            raise ShareExpired(share_id)
+        return cached
+
+    def _created_at(self, share_id: str) -> Optional[str]:
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT created_at FROM shared_conversations WHERE share_id = ?", (share_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _load(self, share_id: str) -> Optional[CachedShare]:
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT title, encoding, conversation, created_at, expires_at "
+                "FROM shared_conversations WHERE share_id = ?",
+                (share_id,),
+            ).fetchone()
+        if not row:
+            return None
+        title, encoding, conversation, created_at, expires_at = row
+        body = _response_body(title, decode_conversation(conversation, encoding), created_at)
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        return CachedShare(body, etag, created_at, expires_at)
+
+    # ── Response cache ───────────────────────────────────────────────
+
+    def _cached(self, share_id: str) -> Optional[CachedShare]:
+        with self._cache_lock:
+            cached = self._cache.get(share_id)
+            if cached is not None:
+                self._cache.move_to_end(share_id)
+            return cached
+
+    def _remember(self, share_id: str, cached: CachedShare) -> None:
+        size = len(cached.body)
+        if size > self.cache_max_bytes // 4:
+            return  # one huge conversation shouldn't flush everything else
+        with self._cache_lock:
+            old = self._cache.pop(share_id, None)
+            if old is not None:
+                self._cache_bytes -= len(old.body)
+            self._cache[share_id] = cached
+            self._cache_bytes += size
+            while self._cache_bytes > self.cache_max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted.body)
+
+    def _evict(self, share_id: str) -> None:
+        with self._cache_lock:
+            old = self._cache.pop(share_id, None)
+            if old is not None:
+                self._cache_bytes -= len(old.body)
+
+    def stats(self) -> dict:
+        with self._cache_lock:
+            return {
+                "cached": len(self._cache),
+                "cached_bytes": self._cache_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "encoding": self.encoding,
+            }
+
+
+# ── Lazy singleton ───────────────────────────────────────────────────────
+_repo: Optional[SharesRepository] = None
+_repo_lock = threading.Lock()
+
+
+def get_shares_repository() -> SharesRepository:
+    """Return the process-wide shares repository."""
+    global _repo
+    with _repo_lock:
+        if _repo is None:
+            _repo = SharesRepository(
+                SHARES_DB_PATH,
+                pool_size=SHARES_POOL_SIZE,
+                cache_max_bytes=SHARES_CACHE_MAX_BYTES,
+                revalidate=WORKERS > 1,
+            )
+    return _repo
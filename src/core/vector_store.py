@@ -1,37 +1,88 @@
 """
 ChromaDB vector store — persistent, one collection per library.
+
+With RETRIEVAL_SERVICE or RETRIEVAL_SHARDS set, reads (search, get_chunks,
+collection_stats) go to retrieval service processes instead, which run the
+`*_local` functions below against the index (or partition) they hold.
 """
 
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-import chromadb
+from src.core.config import LIBRARIES, VECTOR_DB_PATH
+from src.core.metrics import span
+from src.core.shard_router import get_shard_router
 
-from src.core.config import VECTOR_DB_PATH
+if TYPE_CHECKING:
+    import chromadb
 
 logger = logging.getLogger(__name__)
 
-_client: Optional[chromadb.PersistentClient] = None
+_client: Optional["chromadb.PersistentClient"] = None
+_search_ef_synced: set = set()
 
 
-def _get_client() -> chromadb.PersistentClient:
+def _get_client() -> "chromadb.PersistentClient":
     """Lazily create a persistent ChromaDB client."""
     global _client
     if _client is None:
+        import chromadb  # ~1 s to import; web workers using a retrieval service never need it
+
         Path(VECTOR_DB_PATH).mkdir(parents=True, exist_ok=True)
         _client = chromadb.PersistentClient(path=VECTOR_DB_PATH)
         logger.info("ChromaDB client initialized at %s", VECTOR_DB_PATH)
     return _client
 
 
-def get_or_create_collection(name: str) -> chromadb.Collection:
-    """Get or create a collection by name."""
+def _router_for(collection_name: str):
+    """Shard router if a retrieval node serves this collection, else None (local)."""
+    router = get_shard_router()
+    return router if router is not None and router.serves(collection_name) else None
+
+
+def hnsw_metadata(name: str, overrides: Optional[dict] = None) -> dict:
+    """Collection metadata with the library's HNSW parameters from LIBRARIES."""
+    params = dict(LIBRARIES.get(name, {}).get("hnsw", {}))
+    params.update(overrides or {})
+    metadata = {"hnsw:space": "cosine"}
+    metadata.update({f"hnsw:{key}": value for key, value in params.items()})
+    return metadata
+
+
+def set_search_ef(collection: "chromadb.Collection", search_ef: int) -> None:
+    """
+    Change a collection's query-time HNSW beam width. The value is
+    persisted, but an index already loaded by this client keeps the old one.
+    """
+    current = (collection.configuration or {}).get("hnsw") or {}
+    if current.get("ef_search") != search_ef:
+        collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+        logger.info(
+            "Collection '%s' search_ef %s -> %s",
+            collection.name, current.get("ef_search"), search_ef,
+        )
+
+
+def get_or_create_collection(name: str) -> "chromadb.Collection":
+    """
+    Get or create a collection by name.
+
+    New collections get the library's full HNSW parameters; existing ones
+    only pick up a changed search_ef (M / construction_ef are fixed once
+    the index is built), checked once per process.
+    """
     client = _get_client()
-    return client.get_or_create_collection(
-        name=name,
-        metadata={"hnsw:space": "cosine"},
-    )
+    metadata = hnsw_metadata(name)
+    collection = client.get_or_create_collection(name=name, metadata=metadata)
+    if name not in _search_ef_synced:
+        _search_ef_synced.add(name)
+        if "hnsw:search_ef" in metadata:
+            try:
+                set_search_ef(collection, metadata["hnsw:search_ef"])
+            except Exception as e:
+                logger.warning("Could not update search_ef for '%s': %s", name, e)
+    return collection
 
 
 def add_chunks(
@@ -70,9 +121,31 @@ def search(
     Search a collection by query embedding.
     Returns dict with keys: ids, documents, metadatas, distances.
     """
+    return search_batch(collection_name, [query_embedding], n_results, where)
+
+
+def search_batch(
+    collection_name: str,
+    query_embeddings: list,
+    n_results: int = 10,
+    where: Optional[dict] = None,
+) -> dict:
+    """
+    Search a collection with several query embeddings in one call.
+    Same dict as `search`, with one inner list per query.
+    """
+    with span("vector_search", collection=collection_name):
+        router = _router_for(collection_name)
+        if router is not None:
+            return router.query(collection_name, query_embeddings, n_results, where)
+        return query_local(collection_name, query_embeddings, n_results, where)
+
+
+def query_local(collection_name: str, query_embeddings, n_results: int, where: Optional[dict] = None) -> dict:
+    """Query this process's ChromaDB directly."""
     collection = get_or_create_collection(collection_name)
     kwargs = {
-        "query_embeddings": [query_embedding],
+        "query_embeddings": query_embeddings,
         "n_results": n_results,
         "include": ["documents", "metadatas", "distances"],
     }
@@ -81,8 +154,32 @@ def search(
     return collection.query(**kwargs)
 
 
+def get_chunks(collection_name: str, ids: list) -> dict:
+    """
+    Fetch stored chunks by ID.
+    Returns dict with keys: ids, documents, metadatas.
+    """
+    router = _router_for(collection_name)
+    if router is not None:
+        return router.get(collection_name, ids)
+    return get_chunks_local(collection_name, ids)
+
+
+def get_chunks_local(collection_name: str, ids: list) -> dict:
+    collection = get_or_create_collection(collection_name)
+    result = collection.get(ids=ids, include=["documents", "metadatas"])
+    return {"ids": result["ids"], "documents": result["documents"], "metadatas": result["metadatas"]}
+
+
 def collection_stats(collection_name: str) -> dict:
     """Return count and name for a collection."""
+    router = _router_for(collection_name)
+    if router is not None:
+        return router.stats(collection_name)
+    return collection_stats_local(collection_name)
+
+
+def collection_stats_local(collection_name: str) -> dict:
     collection = get_or_create_collection(collection_name)
     return {
         "name": collection_name,
@@ -90,6 +187,25 @@ def collection_stats(collection_name: str) -> dict:
     }
 
 
+def warm_up() -> dict:
+    """
+    Make the first real query fast: load every library's HNSW index (one
+    query with a stored vector), or reach the retrieval nodes serving it.
+    Returns chunk counts; failures are logged and skipped.
+    """
+    counts = {}
+    for key in LIBRARIES:
+        try:
+            if _router_for(key) is None:
+                sample = get_or_create_collection(key).peek(1)
+                if len(sample["ids"]):
+                    query_local(key, [sample["embeddings"][0]], 1)
+            counts[key] = collection_stats(key)["count"]
+        except Exception as e:
+            logger.warning("Warm-up failed for '%s': %s", key, e)
+    return counts
+
+
 def list_all_collections() -> list[dict]:
     """Return stats for every collection in the DB."""
     client = _get_client()
@@ -0,0 +1,121 @@
+"""AdmissionController: immediate admits, FIFO hand-off on release, shedding and cancellation."""
+
+import asyncio
+
+import pytest
+
+from src.app import main
+from src.app.main import AdmissionController, AdmissionRejected
+
+
+async def _acquire(gate, positions=None):
+    async for position in gate.wait():
+        if positions is not None:
+            positions.append(position)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_admits_up_to_capacity_without_queueing():
+    async def run():
+        gate = AdmissionController("llm", max_in_flight=2, max_queue=1)
+        await _acquire(gate)
+        await _acquire(gate)
+        return gate
+
+    gate = asyncio.run(run())
+    assert gate.in_flight == 2
+    assert gate.queue_depth == 0
+    assert gate.admitted_total == 2
+
+
+def test_release_hands_slot_to_waiters_in_order():
+    async def run():
+        gate = AdmissionController("llm", max_in_flight=1, max_queue=2)
+        await _acquire(gate)
+        first, second = [], []
+        t1 = asyncio.create_task(_acquire(gate, first))
+        await _settle()
+        t2 = asyncio.create_task(_acquire(gate, second))
+        await _settle()
+        assert (first, second) == ([1], [2])
+        assert gate.queue_depth == 2
+
+        gate.release()
+        await asyncio.wait_for(t1, 1)
+        assert not t2.done()
+        assert gate.in_flight == 1  # Handed over, never freed
+
+        gate.release()
+        await asyncio.wait_for(t2, 1)
+        gate.release()
+        return gate
+
+    gate = asyncio.run(run())
+    assert gate.in_flight == 0
+    assert gate.queue_depth == 0
+    assert gate.admitted_total == 3
+
+
+def test_full_queue_is_shed():
+    async def run():
+        gate = AdmissionController("retrieval", max_in_flight=1, max_queue=1)
+        await _acquire(gate)
+        waiter = asyncio.create_task(_acquire(gate))
+        await _settle()
+        assert not gate.has_capacity()
+        with pytest.raises(AdmissionRejected):
+            await _acquire(gate)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return gate
+
+    gate = asyncio.run(run())
+    assert gate.shed_total == 1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        gate = AdmissionController("llm", max_in_flight=1, max_queue=2)
+        await _acquire(gate)
+        waiter = asyncio.create_task(_acquire(gate))
+        await _settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert gate.queue_depth == 0
+        gate.release()
+        return gate
+
+    gate = asyncio.run(run())
+    assert gate.in_flight == 0
+
+
+def test_closing_waiter_after_hand_off_passes_the_slot_on():
+    async def run():
+        gate = AdmissionController("llm", max_in_flight=1, max_queue=2)
+        await _acquire(gate)
+        doomed = gate.wait()
+        assert await doomed.__anext__() == 1
+        survivor = asyncio.create_task(_acquire(gate))
+        await _settle()
+
+        gate.release()  # Slot goes to `doomed`, whose consumer goes away before resuming it
+        await doomed.aclose()
+        await asyncio.wait_for(survivor, 1)
+        assert gate.in_flight == 1
+        gate.release()
+        return gate
+
+    gate = asyncio.run(run())
+    assert gate.in_flight == 0
+    assert gate.queue_depth == 0
+
+
+def test_worker_share_splits_host_caps(monkeypatch):
+    monkeypatch.setattr(main, "WORKERS", 4)
+    assert main._worker_share(10) == 2
+    assert main._worker_share(3) == 1  # Every worker can still admit one turn
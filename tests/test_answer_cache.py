@@ -0,0 +1,96 @@
+"""Answer cache: key composition, TTL expiry and LRU eviction by size."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import answer_cache
+from src.core.answer_cache import AnswerCache, make_cache_key
+
+PROMPT = "You are a code assistant."
+SOURCES = ["ibc_wa_docs_a_0", "rcw_chapters_b_3"]
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+def _key(**overrides):
+    args = {"question": "What is the egress width?", "system_prompt": PROMPT, "temperature": 0.3,
+            "source_ids": SOURCES, "history": None, "model": "gpt-test"}
+    args.update(overrides)
+    return make_cache_key(**args)
+
+
+def test_key_ignores_case_and_whitespace():
+    assert _key(question="  what IS the\tegress   width? ") == _key()
+
+
+@pytest.mark.parametrize("change", [
+    {"question": "What is the egress height?"},
+    {"system_prompt": PROMPT + " Be brief."},
+    {"temperature": 0.7},
+    {"model": "gpt-other"},
+    {"source_ids": SOURCES[::-1]},
+    {"source_ids": SOURCES[:1]},
+    {"history": [{"role": "user", "content": "earlier question"}]},
+])
+def test_key_changes_with_anything_the_llm_sees(change):
+    assert _key(**change) != _key()
+
+
+def test_key_without_history_matches_empty_history():
+    assert _key(history=[]) == _key()
+
+
+def test_get_returns_stored_answer(tmp_path, clock):
+    cache = AnswerCache(str(tmp_path / "answers.db"), ttl_seconds=60, max_bytes=10_000)
+    cache.put("k", ["Egress ", "is 44 in."], {"input_tokens": 10, "output_tokens": 4})
+
+    assert cache.get("k") == {"tokens": ["Egress ", "is 44 in."], "usage": {"input_tokens": 10, "output_tokens": 4}}
+    assert cache.get("missing") is None
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = AnswerCache(str(tmp_path / "answers.db"), ttl_seconds=60, max_bytes=10_000)
+    cache.put("k", ["answer"])
+
+    clock.now += 59
+    assert cache.get("k") is not None
+    clock.now += 2  # TTL counts from creation, not last access
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, clock):
+    entry = len('{"tokens": ["xxxxxxxxxx"], "usage": {}}')
+    cache = AnswerCache(str(tmp_path / "answers.db"), ttl_seconds=3600, max_bytes=2 * entry)
+    cache.put("a", ["x" * 10])
+    clock.now += 1
+    cache.put("b", ["x" * 10])
+    clock.now += 1
+    assert cache.get("a") is not None  # a is now more recent than b
+    clock.now += 1
+    cache.put("c", ["x" * 10])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["size_bytes"] <= 2 * entry
+
+
+def test_answer_larger_than_the_cache_is_not_stored(tmp_path, clock):
+    cache = AnswerCache(str(tmp_path / "answers.db"), ttl_seconds=3600, max_bytes=50)
+    cache.put("big", ["x" * 100])
+
+    assert cache.get("big") is None
@@ -0,0 +1,190 @@
+"""
+Batch ingest against the local OpenAI stand-in (benchmarks/mock_openai.py).
+
+The Files and Batches calls go over HTTP to the mock; only PDF chunking and
+the ChromaDB writes are replaced, by fixed chunks and an in-memory store.
+"""
+
+import pytest
+from openai import OpenAI
+
+from benchmarks.mock_openai import MockConfig, base_url, fake_embedding, start_server
+from src.core import batch_ingest
+
+LIBRARY = "ibc_wa_docs"
+DIMENSIONS = 8
+CHUNKS = 10
+
+
+class Crash(Exception):
+    """Stands in for the process dying mid-run."""
+
+
+@pytest.fixture
+def mock():
+    config = MockConfig(base_ms=0, jitter_ms=0, dimensions=DIMENSIONS, batch_seconds=0.05)
+    server = start_server(config)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stored(monkeypatch, tmp_path, mock):
+    """Wire batch_ingest to the mock and a temp job dir; returns the fake collection."""
+    collection = {}
+
+    def add_chunks(library_key, ids, embeddings, texts, metadatas):
+        for chunk_id, embedding, text, metadata in zip(ids, embeddings, texts, metadatas):
+            collection[chunk_id] = (embedding, text, metadata)
+
+    client = OpenAI(api_key="test", base_url=base_url(mock), max_retries=0)
+    monkeypatch.setattr(batch_ingest, "BATCH_INGEST_DIR", str(tmp_path))
+    monkeypatch.setattr(batch_ingest, "BATCH_INGEST_JOB_CHUNKS", 4)
+    monkeypatch.setattr(batch_ingest, "BATCH_INGEST_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(batch_ingest, "get_openai_client", lambda: client)
+    monkeypatch.setattr(batch_ingest, "add_chunks", add_chunks)
+    monkeypatch.setattr(batch_ingest, "collection_stats", lambda library_key: {"count": len(collection)})
+    monkeypatch.setattr(batch_ingest, "_load_chunks", lambda library_key: {
+        "pdf_files": ["a.pdf", "b.pdf"],
+        "ids": [f"{library_key}_c{i}" for i in range(CHUNKS)],
+        "texts": [f"chunk text {i}" for i in range(CHUNKS)],
+        "metadatas": [{"source_file": "a.pdf" if i < 5 else "b.pdf", "chunk_index": i} for i in range(CHUNKS)],
+        "errors": [],
+    })
+    return collection
+
+
+def _ingest(**kwargs):
+    return batch_ingest.ingest_library_batch(LIBRARY, poll_seconds=0.02, **kwargs)
+
+
+def test_prepare_writes_jobs_and_manifest(stored, tmp_path):
+    manifest = batch_ingest.prepare(LIBRARY)
+
+    assert [job["name"] for job in manifest["jobs"]] == ["job-0000", "job-0001", "job-0002"]
+    assert [job["chunks"] for job in manifest["jobs"]] == [4, 4, 2]
+    assert all(job["state"] == "prepared" for job in manifest["jobs"])
+    assert batch_ingest.load_manifest(LIBRARY) == manifest
+    chunks = batch_ingest._read_chunks(tmp_path / LIBRARY, "job-0002")
+    assert chunks[f"{LIBRARY}_c9"] == ("chunk text 9", {"source_file": "b.pdf", "chunk_index": 9})
+
+
+def test_ingest_stores_decoded_embeddings(stored, mock):
+    summary = _ingest()
+
+    assert summary["pending_jobs"] == []
+    assert summary["collection_count"] == CHUNKS
+    assert summary["errors"] == []
+    embedding, text, metadata = stored[f"{LIBRARY}_c3"]
+    assert text == "chunk text 3"
+    # base64 float32 from the mock decodes to the same vector (to float32 precision)
+    assert embedding == pytest.approx(fake_embedding("chunk text 3", DIMENSIONS), abs=1e-6)
+    assert len(mock.RequestHandlerClass.store.batches) == 3
+
+
+def test_no_wait_run_resumes_from_manifest(stored, mock):
+    config = mock.RequestHandlerClass.config
+    config.batch_seconds = 60
+    first = _ingest(wait=False)
+    assert first["pending_jobs"] == ["job-0000", "job-0001", "job-0002"]
+    assert all(job["state"] == "submitted" for job in batch_ingest.load_manifest(LIBRARY)["jobs"])
+    assert stored == {}
+
+    config.batch_seconds = 0
+    summary = _ingest()
+
+    assert summary["pending_jobs"] == []
+    assert len(stored) == CHUNKS
+    store = mock.RequestHandlerClass.store
+    assert len(store.batches) == 3  # nothing submitted twice
+    assert len([f for f in store.files.values() if f[0].startswith("job-")]) == 3  # nor uploaded twice
+
+
+def test_interrupted_submit_is_found_again(stored, mock, monkeypatch):
+    save = batch_ingest._save_manifest
+
+    def crash_after_create(manifest):
+        if any(job["state"] == "submitted" for job in manifest["jobs"]):
+            raise Crash  # the batch exists upstream but was never recorded
+        save(manifest)
+
+    monkeypatch.setattr(batch_ingest, "_save_manifest", crash_after_create)
+    with pytest.raises(Crash):
+        _ingest()
+    monkeypatch.setattr(batch_ingest, "_save_manifest", save)
+    store = mock.RequestHandlerClass.store
+    assert len(store.batches) == 1
+    assert batch_ingest.load_manifest(LIBRARY)["jobs"][0]["state"] == "uploaded"
+
+    summary = _ingest()
+
+    assert summary["pending_jobs"] == []
+    assert len(store.batches) == 3  # job-0000 was matched by its metadata, not resubmitted
+    assert len(stored) == CHUNKS
+
+
+def test_failed_requests_are_resubmitted(stored, mock):
+    failing = {f"{LIBRARY}_c1", f"{LIBRARY}_c6"}
+    failed_once = set()
+
+    def fails(request):
+        if request["custom_id"] in failing and request["custom_id"] not in failed_once:
+            failed_once.add(request["custom_id"])
+            return True
+        return False
+
+    mock.RequestHandlerClass.config.batch_fails = fails
+    summary = _ingest()
+
+    jobs = {job["name"]: job for job in batch_ingest.load_manifest(LIBRARY)["jobs"]}
+    assert (jobs["job-0000"]["stored"], jobs["job-0000"]["failed"]) == (3, 1)
+    assert (jobs["job-0001-r2"]["chunks"], jobs["job-0001-r2"]["attempt"]) == (1, 2)
+    assert set(jobs) == {"job-0000", "job-0001", "job-0002", "job-0000-r2", "job-0001-r2"}
+    assert summary["pending_jobs"] == [] and summary["errors"] == []
+    assert len(stored) == CHUNKS
+
+
+def test_chunks_still_failing_after_max_attempts_are_reported(stored, mock):
+    mock.RequestHandlerClass.config.batch_fails = lambda request: request["custom_id"] == f"{LIBRARY}_c9"
+    summary = _ingest()
+
+    names = [job["name"] for job in batch_ingest.load_manifest(LIBRARY)["jobs"]]
+    assert names[-2:] == ["job-0002-r2", "job-0002-r3"]
+    assert summary["errors"] == ["job-0002-r3: 1 chunks not embedded"]
+    assert len(stored) == CHUNKS - 1
+
+
+def test_model_change_requires_fresh_run(stored, monkeypatch):
+    _ingest(wait=False)
+    monkeypatch.setattr(batch_ingest, "EMBEDDING_MODEL", "another-model")
+    with pytest.raises(batch_ingest.BatchIngestError):
+        _ingest()
+    assert _ingest(fresh=True)["pending_jobs"] == []
+
+
+def test_interrupted_submit_is_found_on_a_later_list_page(stored, mock, monkeypatch):
+    save = batch_ingest._save_manifest
+
+    def crash_after_create(manifest):
+        if any(job["state"] == "submitted" for job in manifest["jobs"]):
+            raise Crash
+        save(manifest)
+
+    monkeypatch.setattr(batch_ingest, "_save_manifest", crash_after_create)
+    with pytest.raises(Crash):
+        _ingest()
+    monkeypatch.setattr(batch_ingest, "_save_manifest", save)
+    # Other batches submitted since then push this run's batch off the first page
+    client = batch_ingest.get_openai_client()
+    other = client.files.create(file=("other.jsonl", b""), purpose="batch")
+    for n in range(5):
+        client.batches.create(
+            input_file_id=other.id, endpoint="/v1/embeddings", completion_window="24h",
+            metadata={"run_id": "other", "job": f"job-{n:04d}"},
+        )
+    monkeypatch.setattr(batch_ingest, "_LIST_PAGE", 2)
+
+    assert _ingest()["pending_jobs"] == []
+    ours = [b for b in mock.RequestHandlerClass.store.batches.values() if b["metadata"]["run_id"] != "other"]
+    assert len(ours) == 3
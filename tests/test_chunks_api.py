@@ -0,0 +1,70 @@
+"""/api/chunks: batch lookup and ETag / If-None-Match revalidation."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import main
+
+STORE = {
+    "ibc_wa_docs": {"c1": "Egress width", "c2": "Stair risers"},
+    "rcw_chapters": {"r9": "Chapter 19.27"},
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    store = {library: dict(docs) for library, docs in STORE.items()}
+    calls = []
+
+    def get_chunks(library, ids):
+        calls.append((library, list(ids)))
+        hits = [i for i in ids if i in store.get(library, {})]
+        return {
+            "ids": hits,
+            "documents": [store[library][i] for i in hits],
+            "metadatas": [{"source_file": f"{i}.pdf", "page_number": 1} for i in hits],
+        }
+
+    monkeypatch.setattr(main, "get_chunks", get_chunks)
+    monkeypatch.setattr(main, "API_ACCESS_KEY", "")
+    test_client = TestClient(main.app)
+    test_client.store = store
+    test_client.calls = calls
+    return test_client
+
+
+def test_batch_keeps_request_order_with_one_query_per_library(client):
+    ids = "rcw_chapters:r9,ibc_wa_docs:c2,ibc_wa_docs:c1,ibc_wa_docs:zz"
+    response = client.get("/api/chunks", params={"ids": ids})
+    assert response.status_code == 200
+    assert [c["id"] for c in response.json()["chunks"]] == [
+        "rcw_chapters:r9", "ibc_wa_docs:c2", "ibc_wa_docs:c1",
+    ]
+    assert sorted(client.calls) == [("ibc_wa_docs", ["c2", "c1", "zz"]), ("rcw_chapters", ["r9"])]
+
+
+def test_matching_etag_gets_304(client):
+    first = client.get("/api/chunks", params={"ids": "ibc_wa_docs:c1"})
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"].startswith("private")
+
+    again = client.get("/api/chunks", params={"ids": "ibc_wa_docs:c1"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+
+def test_changed_text_changes_etag(client):
+    etag = client.get("/api/chunks/ibc_wa_docs:c1").headers["etag"]
+    client.store["ibc_wa_docs"]["c1"] = "Egress width (2024 edition)"
+
+    response = client.get("/api/chunks/ibc_wa_docs:c1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["text"] == "Egress width (2024 edition)"
+    assert response.headers["etag"] != etag
+
+
+def test_single_chunk_not_found(client):
+    assert client.get("/api/chunks/ibc_wa_docs:missing").status_code == 404
+    assert client.get("/api/chunks/no_such_library:c1").status_code == 404
+    assert client.get("/api/chunks/ibc_wa_docs").status_code == 404
@@ -0,0 +1,100 @@
+"""Document index: lookups, ambiguous names, symlink escapes and refresh."""
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import main
+from src.core.document_index import DocumentIndex, DocumentIndexNotReady
+
+
+def _pdf(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"%PDF-1.4\n")
+    return path
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "docs"
+    lib = root / "codes"
+    _pdf(lib / "building" / "ibc.pdf")
+    _pdf(lib / "a" / "dup.pdf")
+    _pdf(lib / "b" / "dup.pdf")
+    (lib / "notes.txt").write_text("not a pdf")
+    _pdf(root / "other" / "shared.pdf")
+    (lib / "shared.pdf").symlink_to(root / "other" / "shared.pdf")
+    _pdf(tmp_path / "outside" / "secret.pdf")
+    (lib / "secret.pdf").symlink_to(tmp_path / "outside" / "secret.pdf")
+    return root, lib
+
+
+def _index(tree):
+    root, lib = tree
+    index = DocumentIndex({"codes": lib}, root, refresh_interval=3600)
+    index.build_all()
+    return index
+
+
+def test_lookup_resolves_nested_files(tree):
+    root, lib = tree
+    index = _index(tree)
+
+    assert index.lookup("codes", "ibc.pdf") == (lib / "building" / "ibc.pdf").resolve()
+    assert index.lookup("codes", "shared.pdf") == (root / "other" / "shared.pdf").resolve()
+
+
+def test_ambiguous_names_are_not_served(tree):
+    assert _index(tree).lookup("codes", "dup.pdf") is None
+
+
+def test_symlink_out_of_the_root_is_not_served(tree):
+    assert _index(tree).lookup("codes", "secret.pdf") is None
+
+
+@pytest.mark.parametrize("name", ["notes.txt", "../other/shared.pdf", "building/ibc.pdf", "b\\dup.pdf"])
+def test_rejects_paths_and_non_pdfs(tree, name):
+    assert _index(tree).lookup("codes", name) is None
+
+
+def test_unknown_library(tree):
+    assert _index(tree).lookup("nope", "ibc.pdf") is None
+
+
+def test_lookup_before_first_walk_is_not_ready(tree):
+    root, lib = tree
+    index = DocumentIndex({"codes": lib}, root, refresh_interval=3600)
+
+    with pytest.raises(DocumentIndexNotReady):
+        index.lookup("codes", "ibc.pdf")
+    assert index.lookup("codes", "notes.txt") is None  # Rejected before the index is consulted
+
+
+def test_endpoint_answers_503_until_indexed(tree, monkeypatch):
+    root, lib = tree
+    index = DocumentIndex({"codes": lib}, root, refresh_interval=3600)
+    monkeypatch.setattr(main, "documents", index)
+    client = TestClient(main.app)
+
+    response = client.get("/api/documents/codes/ibc.pdf")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+    index.build_all()
+    assert client.get("/api/documents/codes/ibc.pdf").status_code == 200
+    assert client.get("/api/documents/codes/secret.pdf").status_code == 404
+
+
+def test_refresh_picks_up_changed_directories(tree):
+    _, lib = tree
+    index = _index(tree)
+    new = _pdf(lib / "building" / "irc.pdf")
+    (lib / "a" / "dup.pdf").unlink()
+    for directory in (lib / "building", lib / "a"):
+        stat = os.stat(directory)
+        os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))  # coarse timestamps
+
+    index.refresh()
+    assert index.lookup("codes", "irc.pdf") == new.resolve()
+    assert index.lookup("codes", "dup.pdf") == (lib / "b" / "dup.pdf").resolve()
@@ -0,0 +1,47 @@
+"""embed_queries: request-path deadline and hedging."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import embedder
+from src.core.config import EMBED_QUERY_TIMEOUT
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Fake embeddings endpoint; records the keyword arguments of each call."""
+    calls = []
+
+    def create(*, model, input, timeout):
+        calls.append({"input": list(input), "timeout": timeout})
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t))]) for t in input])
+
+    client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    monkeypatch.setattr(embedder, "_get_client", lambda: client)
+    monkeypatch.setattr(embedder, "_query_cache", embedder.QueryEmbeddingCache(8))
+    return calls
+
+
+def test_embed_queries_uses_the_query_deadline(api):
+    assert embedder.embed_queries(["ab", "abc", "ab"]) == [[2.0], [3.0], [2.0]]
+
+    assert [c["input"] for c in api] == [["ab", "abc"]]
+    assert api[0]["timeout"] <= EMBED_QUERY_TIMEOUT
+
+
+def test_embed_queries_is_hedged_when_enabled(api, monkeypatch):
+    hedged = []
+
+    def hedged_call(fn, tracker, default_delay):
+        hedged.append(tracker)
+        return fn()
+
+    monkeypatch.setattr(embedder, "EMBED_HEDGE_ENABLED", True)
+    monkeypatch.setattr(embedder, "hedged_call", hedged_call)
+
+    embedder.embed_queries(["ab"])
+    embedder.embed_queries(["ab"])  # Cached: no second call
+
+    assert hedged == [embedder._query_latency]
+    assert len(api) == 1
@@ -0,0 +1,122 @@
+"""LogWriter: batched appends per file, and size / age rotation into gzip archives."""
+
+import builtins
+import gzip
+import json
+import os
+import time
+
+from src.core import log_writer
+from src.core.log_writer import LogWriter
+
+
+def _writer(**kwargs):
+    options = dict(
+        flush_interval=0.05, batch_size=1000, rotate_bytes=1 << 20, rotate_seconds=3600, keep=10,
+    )
+    options.update(kwargs)
+    return LogWriter(**options)
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def _settle(writer):
+    """Let rotated files go a flush interval untouched, then let the writer compress them."""
+    time.sleep(writer.flush_interval * 2)
+    writer.flush()
+
+
+def _archived(path):
+    records = []
+    for archive in sorted(path.parent.glob(f"{path.stem}.*{path.suffix}.gz")):
+        with gzip.open(archive, "rt", encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+
+def test_batch_is_one_append_per_file(tmp_path, monkeypatch):
+    opened = []
+
+    def counting_open(file, *args, **kwargs):
+        opened.append(str(file))
+        return builtins.open(file, *args, **kwargs)
+
+    monkeypatch.setattr(log_writer, "open", counting_open, raising=False)
+    chat, retrieval = tmp_path / "chat.jsonl", tmp_path / "retrieval.jsonl"
+    writer = _writer(flush_interval=10)
+    for i in range(20):
+        writer.write(chat if i % 2 else retrieval, {"n": i, "text": "§"})
+    writer.flush()
+
+    assert _records(chat) == [{"n": i, "text": "§"} for i in range(1, 20, 2)]
+    assert _records(retrieval) == [{"n": i, "text": "§"} for i in range(0, 20, 2)]
+    assert opened.count(str(chat)) == 1
+    assert opened.count(str(retrieval)) == 1
+
+
+def test_size_rotation_keeps_every_record(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    writer = _writer(rotate_bytes=200)
+    for i in range(30):
+        writer.write(path, {"n": i, "pad": "x" * 20})
+        if i % 5 == 4:
+            writer.flush()
+    writer.flush()
+    _settle(writer)
+
+    archived = _archived(path)
+    current = _records(path) if path.exists() else []
+    assert archived
+    assert sorted(r["n"] for r in archived + current) == list(range(30))
+    assert not list(tmp_path.glob("chat.*.jsonl"))  # Uncompressed copies removed
+
+
+def test_rotation_prunes_to_keep(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    writer = _writer(rotate_bytes=5, keep=2)
+    for i in range(6):
+        writer.write(path, {"n": i})
+        writer.flush()
+    _settle(writer)
+
+    assert len(list(tmp_path.glob("chat.*.jsonl.gz"))) == 2
+    assert sorted(r["n"] for r in _archived(path)) == [4, 5]
+
+
+def test_age_rotation_uses_the_shared_start_time(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    writer = _writer()
+    writer.write(path, {"n": 0})
+    writer.flush()
+    assert not _archived(path)
+
+    # The lock file's mtime is the log's start time, seen by every worker
+    started = time.time() - 7200
+    os.utime(path.with_name("chat.jsonl.lock"), (started, started))
+    other_worker = _writer()
+    other_worker.write(path, {"n": 1})
+    other_worker.flush()
+    _settle(other_worker)
+    assert sorted(r["n"] for r in _archived(path)) == [0, 1]
+    assert not path.exists()
+    assert path.with_name("chat.jsonl.lock").stat().st_mtime > started
+
+
+def test_late_append_to_a_rotated_file_is_archived(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    writer = _writer(rotate_bytes=5, flush_interval=0.2)
+    writer.write(path, {"n": 0})
+    writer.flush()
+    (rotated,) = tmp_path.glob("chat.*.jsonl")
+
+    # A worker that opened chat.jsonl before the rename still appends to it
+    with open(rotated, "ab") as f:
+        f.write(b'{"n": 1}\n')
+    writer.flush()
+    assert not _archived(path)
+
+    _settle(writer)
+    assert sorted(r["n"] for r in _archived(path)) == [0, 1]
+    assert not list(tmp_path.glob("chat.*.jsonl"))
@@ -0,0 +1,73 @@
+"""Prometheus text exposition and per-turn stage timings."""
+
+import contextvars
+import re
+
+from src.core import metrics
+from src.core.metrics import CallbackGauge, Counter, Histogram
+
+LABEL = r'[a-z_]+="(?:[^"\\]|\\.)*"'
+SAMPLE = re.compile(rf"^[a-z_]+(?:\{{{LABEL}(?:,{LABEL})*\}})? [0-9.e+-]+$")
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("t_seconds", "Test.", labels=("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        h.observe(value, "llm")
+
+    assert h.render() == [
+        "# HELP t_seconds Test.",
+        "# TYPE t_seconds histogram",
+        't_seconds_bucket{stage="llm",le="0.1"} 1',
+        't_seconds_bucket{stage="llm",le="1.0"} 3',
+        't_seconds_bucket{stage="llm",le="+Inf"} 4',
+        't_seconds_sum{stage="llm"} 4.05',
+        't_seconds_count{stage="llm"} 4',
+    ]
+
+
+def test_counter_and_gauge_lines():
+    c = Counter("t_total", "Turns.", labels=("outcome",))
+    c.inc("answered")
+    c.inc("answered", amount=2)
+    g = CallbackGauge("t_depth", "Depth.", ("stage",), lambda: {("llm",): 3}, kind="gauge")
+
+    assert c.render()[1:] == ["# TYPE t_total counter", 't_total{outcome="answered"} 3.0']
+    assert g.render()[1:] == ["# TYPE t_depth gauge", 't_depth{stage="llm"} 3']
+
+
+def test_label_values_are_escaped():
+    c = Counter("t_total", "Escapes.", labels=("q",))
+    c.inc('say "hi"\\\n')
+    assert c.render()[-1] == 't_total{q="say \\"hi\\"\\\\\\n"} 1.0'
+
+
+def test_render_is_valid_exposition():
+    metrics.record("retrieve", 0.02)
+    text = metrics.render()
+
+    assert text.endswith("\n")
+    for line in text.splitlines():
+        if line.startswith("# "):
+            assert re.match(r"^# (HELP|TYPE) \w+ .+$", line), line
+        else:
+            assert SAMPLE.match(line), line
+    assert "# TYPE rag_stage_duration_seconds histogram" in text
+    assert 'rag_stage_duration_seconds_count{stage="retrieve"}' in text
+
+
+def test_spans_accumulate_into_the_current_turn():
+    def turn():
+        timings = metrics.start_turn()
+        metrics.record("retrieve", 0.010)
+        metrics.record("retrieve", 0.005)
+        metrics.record("vector_search", 0.002, collection="rcw_chapters")
+        with metrics.span("llm"):
+            pass
+        return timings
+
+    timings = contextvars.copy_context().run(turn)
+
+    assert timings["retrieve"] == 15.0
+    assert timings["vector_search:rcw_chapters"] == 2.0
+    assert "llm" in timings
@@ -0,0 +1,102 @@
+"""Page extracts: rendering, range errors, the cache key and LRU eviction of the page cache."""
+
+import os
+
+import fitz
+import pytest
+
+from src.core import page_extract
+from src.core.config import PAGE_EXTRACT_MAX_PAGES
+from src.core.page_extract import PageCache, PageRangeError, extract_pages
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = PageCache(tmp_path / "cache", max_bytes=1 << 20)
+    monkeypatch.setattr(page_extract, "_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "code.pdf"
+    with fitz.open() as doc:
+        for n in range(1, 6):
+            doc.new_page().insert_text((72, 72), f"Page {n}")
+        doc.save(path)
+    return path
+
+
+def _pages(data: bytes) -> list:
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return [page.get_text().strip() for page in doc]
+
+
+def test_extracts_a_page_range(cache, pdf):
+    assert _pages(extract_pages(pdf, 2, 2)) == ["Page 2"]
+    assert _pages(extract_pages(pdf, 3, 5)) == ["Page 3", "Page 4", "Page 5"]
+
+
+def test_png_of_one_page(cache, pdf):
+    assert extract_pages(pdf, 1, 1, fmt="png", dpi=50).startswith(b"\x89PNG")
+
+
+@pytest.mark.parametrize("first, last, fmt", [
+    (0, 1, "pdf"),
+    (5, 6, "pdf"),
+    (3, 2, "pdf"),
+    (1, PAGE_EXTRACT_MAX_PAGES + 1, "pdf"),
+    (1, 2, "png"),
+    (1, 1, "tiff"),
+])
+def test_range_errors(cache, pdf, first, last, fmt):
+    with pytest.raises(PageRangeError):
+        extract_pages(pdf, first, last, fmt)
+
+
+def test_second_request_is_served_from_cache(cache, pdf, monkeypatch):
+    renders = []
+    render = page_extract._render
+
+    def counting_render(*args):
+        renders.append(args)
+        return render(*args)
+
+    monkeypatch.setattr(page_extract, "_render", counting_render)
+
+    first = extract_pages(pdf, 1, 1)
+    assert extract_pages(pdf, 1, 1) == first
+    assert len(renders) == 1
+
+
+def test_replaced_source_is_rendered_again(cache, pdf):
+    extract_pages(pdf, 1, 1)
+    with fitz.open() as doc:
+        doc.new_page().insert_text((72, 72), "Replaced")
+        doc.save(pdf)
+
+    assert _pages(extract_pages(pdf, 1, 1)) == ["Replaced"]
+    assert len(list(cache.directory.glob("*.pdf"))) == 2  # Old extract is left for eviction
+
+
+def test_extract_survives_immediate_eviction(tmp_path, pdf, monkeypatch):
+    # Another worker filling the cache can evict an extract right after it is written
+    monkeypatch.setattr(page_extract, "_cache", PageCache(tmp_path / "cache", max_bytes=1))
+
+    assert _pages(extract_pages(pdf, 4, 4)) == ["Page 4"]
+    assert not list((tmp_path / "cache").glob("*.pdf"))
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = PageCache(tmp_path / "cache", max_bytes=100)
+    cache.put("a.pdf", b"a" * 40)
+    cache.put("b.pdf", b"b" * 40)
+    os.utime(cache.directory / "a.pdf", (1000, 1000))
+    os.utime(cache.directory / "b.pdf", (2000, 2000))
+    assert cache.get("a.pdf") == b"a" * 40  # Touching a makes b the oldest
+
+    cache.put("c.pdf", b"c" * 40)
+    assert cache.get("b.pdf") is None
+    assert cache.get("a.pdf") == b"a" * 40
+    assert cache.get("c.pdf") == b"c" * 40
+    assert not list(cache.directory.glob(".tmp-*"))
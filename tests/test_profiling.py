@@ -0,0 +1,30 @@
+"""aprofiled: the report is finished off the event loop."""
+
+import asyncio
+import threading
+
+from src.core import profiling
+
+
+def test_aprofiled_stops_and_saves_off_the_loop(tmp_path, monkeypatch):
+    threads = {}
+    save = profiling.SamplingProfiler.save
+
+    def recording_save(self, path_stem):
+        threads["save"] = threading.get_ident()
+        return save(self, path_stem)
+
+    monkeypatch.setattr(profiling.SamplingProfiler, "save", recording_save)
+
+    async def run():
+        threads["loop"] = threading.get_ident()
+        async with profiling.aprofiled(tmp_path / "turn") as profiler:
+            await asyncio.sleep(0.05)
+        return profiler
+
+    profiler = asyncio.run(run())
+
+    assert threads["save"] != threads["loop"]
+    assert profiler.samples > 0
+    assert (tmp_path / "turn.folded").exists()
+    assert (tmp_path / "turn.txt").read_text(encoding="utf-8").startswith(f"{profiler.samples} samples")
@@ -0,0 +1,118 @@
+"""Async chat path: event order, and closing the upstream LLM stream on disconnect."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import rag_chain
+from src.core.retriever import RetrievalResult
+
+
+def _chunk(text=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=text))] if text else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeStream:
+    """Async LLM stream: yields its chunks, then blocks until closed if `hang` is set."""
+
+    def __init__(self, chunks, hang=False):
+        self.chunks = list(chunks)
+        self.hang = hang
+        self.closed = False
+        self.delivered = 0
+        self._closed = asyncio.Event()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.delivered < len(self.chunks):
+            self.delivered += 1
+            return self.chunks[self.delivered - 1]
+        if self.hang:
+            await self._closed.wait()
+        raise StopAsyncIteration
+
+    async def close(self):
+        self.closed = True
+        self._closed.set()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    calls = []
+    state = SimpleNamespace(calls=calls, stream=None)
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return state.stream
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(rag_chain, "_get_async_client", lambda: client)
+    monkeypatch.setattr(
+        rag_chain, "retrieve",
+        lambda query, **kwargs: RetrievalResult(query=query, chunks=[], libraries_searched=[]),
+    )
+    return state
+
+
+def _chat():
+    return rag_chain.achat_stream("What is the egress width?", [], top_k=5, use_cache=False)
+
+
+def test_events_in_order_and_stream_closed(llm):
+    usage = SimpleNamespace(prompt_tokens=7, completion_tokens=2)
+    llm.stream = FakeStream([_chunk("Hel"), _chunk("lo"), _chunk(usage=usage)])
+
+    async def run():
+        return [event async for event in _chat()]
+
+    events = asyncio.run(run())
+
+    assert [e["type"] for e in events] == ["sources", "token", "token", "usage", "timing", "done"]
+    assert "".join(e["data"] for e in events if e["type"] == "token") == "Hello"
+    assert events[3]["data"] == {"input_tokens": 7, "output_tokens": 2}
+    assert "retrieve" in events[4]["data"]
+    assert llm.calls[0]["stream"] is True
+    assert llm.stream.closed
+
+
+def test_aclose_mid_answer_closes_upstream(llm):
+    llm.stream = FakeStream([_chunk("a"), _chunk("b"), _chunk("c")])
+
+    async def run():
+        gen = _chat()
+        seen = []
+        async for event in gen:
+            seen.append(event["type"])
+            if event["type"] == "token":
+                break
+        await gen.aclose()
+        return seen
+
+    assert asyncio.run(run()) == ["sources", "token"]
+    assert llm.stream.closed
+    assert llm.stream.delivered == 1
+
+
+def test_cancelled_consumer_closes_upstream(llm):
+    llm.stream = FakeStream([_chunk("a")], hang=True)
+
+    async def run():
+        first_token = asyncio.Event()
+
+        async def consume():
+            async for event in _chat():
+                if event["type"] == "token":
+                    first_token.set()
+
+        task = asyncio.create_task(consume())
+        await asyncio.wait_for(first_token.wait(), 1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert llm.stream.closed
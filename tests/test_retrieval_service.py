@@ -0,0 +1,122 @@
+"""Retrieval service: frame encoding, and client ↔ server round trips over a Unix socket."""
+
+import asyncio
+import struct
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.core import vector_store
+from src.core.retrieval_service import (
+    OP_GET,
+    OP_QUERY,
+    RetrievalClient,
+    RetrievalServer,
+    RetrievalServiceError,
+    decode_request,
+    encode_request,
+    encode_response,
+    parse_address,
+)
+
+
+def _payload(frame: bytes) -> bytes:
+    (length,) = struct.unpack(">I", frame[:4])
+    assert length == len(frame) - 4
+    return frame[4:]
+
+
+def test_request_round_trip_with_float32_vectors():
+    vectors = [[0.5, -1.0, 2.0], [0.25, 0.0, 1e-3]]
+    op, header, decoded = decode_request(_payload(encode_request(OP_QUERY, {"n_results": 3}, vectors)))
+
+    assert (op, header) == (OP_QUERY, {"n_results": 3})
+    assert decoded.dtype == np.float32
+    np.testing.assert_array_equal(decoded, np.asarray(vectors, dtype=np.float32))
+
+
+def test_single_vector_is_one_row():
+    _, _, decoded = decode_request(_payload(encode_request(OP_QUERY, {}, [1.0, 2.0])))
+    assert decoded.shape == (1, 2)
+
+
+def test_request_without_vectors():
+    assert decode_request(_payload(encode_request(OP_GET, {"ids": ["a"]}))) == (OP_GET, {"ids": ["a"]}, None)
+
+
+def test_error_response_status_byte():
+    payload = _payload(encode_response({"error": "bad where"}, ok=False))
+    assert payload[0] == 1
+    assert payload[1:] == b'{"error":"bad where"}'
+
+
+@pytest.mark.parametrize("address, parsed", [
+    ("unix:/run/r.sock", ("unix", "/run/r.sock")),
+    ("tcp:127.0.0.1:7070", ("tcp", ("127.0.0.1", 7070))),
+    ("tcp:[::1]:7070", ("tcp", ("[::1]", 7070))),
+])
+def test_parse_address(address, parsed):
+    assert parse_address(address) == parsed
+
+
+@pytest.mark.parametrize("address", ["unix:", "tcp:host", "tcp:host:http", "http://host:80"])
+def test_parse_address_rejects(address):
+    with pytest.raises(ValueError):
+        parse_address(address)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    def query_local(name, vectors, n_results, where=None):
+        if where == {"bad": {"$nope": 1}}:
+            raise ValueError("Invalid where clause")
+        return {"collection": name, "rows": vectors.shape[0], "n": n_results, "first": float(vectors[0][0])}
+
+    monkeypatch.setattr(vector_store, "query_local", query_local)
+    monkeypatch.setattr(vector_store, "get_chunks_local", lambda name, ids: {"ids": ids})
+
+    address = f"unix:{tmp_path / 'retrieval.sock'}"
+    server = RetrievalServer(address, threads=2)
+    stop = threading.Event()
+
+    async def run():
+        task = asyncio.create_task(server.serve_forever())
+        await asyncio.to_thread(stop.wait)
+        task.cancel()
+
+    thread = threading.Thread(target=asyncio.run, args=(run(),), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not (tmp_path / "retrieval.sock").exists():
+        assert time.monotonic() < deadline, "retrieval server did not start"
+        time.sleep(0.01)
+
+    client = RetrievalClient(address, pool_size=2, timeout=5)
+    yield client
+    client.close()
+    stop.set()
+    thread.join(5)
+
+
+def test_query_round_trip(service):
+    result = service.query("rcw_chapters", [[0.5, 1.0], [2.0, 3.0]], n_results=4)
+    assert result == {"collection": "rcw_chapters", "rows": 2, "n": 4, "first": 0.5}
+    assert service.get("rcw_chapters", ["a", "b"]) == {"ids": ["a", "b"]}
+    assert service.ping()["ok"] is True
+
+
+def test_server_error_is_raised_and_connection_kept(service):
+    with pytest.raises(RetrievalServiceError, match="Invalid where clause"):
+        service.query("rcw_chapters", [[1.0]], n_results=1, where={"bad": {"$nope": 1}})
+
+    # The error travelled as a response, so the pooled connection still works
+    assert service.get("rcw_chapters", ["a"]) == {"ids": ["a"]}
+    assert service._idle.qsize() == 1
+
+
+def test_unreachable_service(tmp_path):
+    client = RetrievalClient(f"unix:{tmp_path / 'missing.sock'}", timeout=1)
+    with pytest.raises(RetrievalServiceError, match="Cannot reach"):
+        client.ping()
@@ -0,0 +1,99 @@
+"""retrieve_many: one batched search per library, fused with reciprocal rank fusion."""
+
+import pytest
+
+from src.core import retriever
+from src.core.retriever import RetrievalCache, retrieve_many
+
+LIB_A, LIB_B = "ibc_wa_docs", "rcw_chapters"
+
+# Per library, per query: (chunk id, cosine distance)
+HITS = {
+    LIB_A: {"egress width": [("x", 0.10), ("z", 0.30)], "egress height": []},
+    LIB_B: {"egress width": [("y", 0.20)], "egress height": [("y", 0.15), ("w", 0.25)]},
+}
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Fake embeddings and vector search; records the calls made."""
+    calls = {"embed": [], "search": []}
+
+    def embed_queries(texts):
+        calls["embed"].append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    def search_batch(lib_key, query_vecs, n_results, where=None):
+        calls["search"].append(lib_key)
+        queries = calls["embed"][-1]
+        rows = [HITS[lib_key].get(q, [])[:n_results] for q in queries]
+        return {
+            "ids": [[cid for cid, _ in row] for row in rows],
+            "distances": [[d for _, d in row] for row in rows],
+            "documents": [[f"text {cid}" for cid, _ in row] for row in rows],
+            "metadatas": [[{"source_file": f"{cid}.pdf", "page_number": 1} for cid, _ in row] for row in rows],
+        }
+
+    monkeypatch.setattr(retriever, "embed_queries", embed_queries)
+    monkeypatch.setattr(retriever, "vector_search_batch", search_batch)
+    monkeypatch.setattr(retriever, "_result_cache", RetrievalCache(0, 0))
+    return calls
+
+
+def test_rankings_are_fused_with_rrf(searches):
+    result = retrieve_many(["egress width", "egress height"], libraries=[LIB_A, LIB_B], rrf_k=60)
+
+    # width: x(1) y(2) z(3); height: y(1) w(2) → y = 1/62 + 1/61 leads
+    assert [c.chunk_id for c in result.chunks] == ["y", "x", "w", "z"]
+    assert result.total_candidates == 5
+    assert result.query == "egress width"
+
+
+def test_fused_chunk_keeps_its_best_score(searches):
+    result = retrieve_many(["egress width", "egress height"], libraries=[LIB_A, LIB_B])
+
+    y = next(c for c in result.chunks if c.chunk_id == "y")
+    assert y.score == pytest.approx(0.85)
+    assert y.library == LIB_B
+
+
+def test_one_embedding_call_and_one_search_per_library(searches):
+    retrieve_many(["egress width", "egress height", "egress width"], libraries=[LIB_A, LIB_B])
+
+    assert searches["embed"] == [["egress width", "egress height"]]
+    assert searches["search"] == [LIB_A, LIB_B]
+
+
+def test_top_k_and_min_score_apply_after_fusion(searches):
+    result = retrieve_many(
+        ["egress width", "egress height"], libraries=[LIB_A, LIB_B], top_k=2, min_score=0.75,
+    )
+
+    # z (0.70) is filtered before ranking; w (0.75) survives but falls outside top 2
+    assert [c.chunk_id for c in result.chunks] == ["y", "x"]
+
+
+def test_failed_library_makes_a_partial_result_that_is_not_cached(searches, monkeypatch):
+    monkeypatch.setattr(retriever, "_result_cache", RetrievalCache(8, 60))
+    search_batch = retriever.vector_search_batch
+    down = {LIB_B}
+
+    def flaky(lib_key, *args, **kwargs):
+        if lib_key in down:
+            raise ConnectionError("node down")
+        return search_batch(lib_key, *args, **kwargs)
+
+    monkeypatch.setattr(retriever, "vector_search_batch", flaky)
+    queries = ["egress width", "egress height"]
+
+    first = retrieve_many(queries, libraries=[LIB_A, LIB_B])
+    assert first.partial
+    assert list(first.errors) == [LIB_B]
+    assert [c.chunk_id for c in first.chunks] == ["x", "z"]
+
+    down.clear()
+    second = retrieve_many(queries, libraries=[LIB_A, LIB_B])
+    assert not second.partial
+    assert [c.chunk_id for c in second.chunks] == ["y", "x", "w", "z"]
+    assert retrieve_many(queries, libraries=[LIB_A, LIB_B]).chunks == second.chunks
+    assert len(searches["embed"]) == 2  # The complete result was cached
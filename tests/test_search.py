@@ -0,0 +1,100 @@
+"""Search cursors, and which rankings are cached, served as partial or rejected."""
+
+import base64
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import search
+from src.core.retrieval_service import RetrievalUnavailable
+from src.core.retriever import RetrievalCache, RetrievalResult, RetrievedChunk
+from src.core.search import SearchError, decode_cursor, encode_cursor, fingerprint
+
+SEARCH = fingerprint("egress width", ["ibc_wa_docs", "rcw_chapters"], None, 0.0)
+
+
+def test_cursor_round_trips():
+    cursor = encode_cursor(SEARCH, 40)
+
+    assert decode_cursor(cursor, SEARCH) == 40
+    assert "=" not in cursor  # URL-safe, unpadded
+
+
+def test_cursor_of_another_search_is_rejected():
+    other = fingerprint("egress height", ["ibc_wa_docs"], None, 0.0)
+
+    with pytest.raises(SearchError, match="does not belong"):
+        decode_cursor(encode_cursor(other, 10), SEARCH)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+    base64.urlsafe_b64encode(json.dumps({"s": SEARCH}).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps({"s": SEARCH, "o": "ten"}).encode()).decode(),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(SearchError, match="Malformed"):
+        decode_cursor(cursor, SEARCH)
+
+
+def test_negative_offset_is_rejected():
+    with pytest.raises(SearchError):
+        decode_cursor(encode_cursor(SEARCH, -10), SEARCH)
+
+
+def test_fingerprint_ignores_library_order_only():
+    assert fingerprint("egress width", ["rcw_chapters", "ibc_wa_docs"], None, 0.0) == SEARCH
+    assert fingerprint("egress width", ["ibc_wa_docs", "rcw_chapters"], None, 0.5) != SEARCH
+    assert fingerprint("egress width", ["ibc_wa_docs", "rcw_chapters"], {"library": "x"}, 0.0) != SEARCH
+
+
+@pytest.fixture
+def ranked(monkeypatch):
+    """Fake retrieve(): returns `state.errors` with a fixed ranking and counts calls."""
+    state = SimpleNamespace(errors={}, calls=0)
+
+    def retrieve(query, **kwargs):
+        state.calls += 1
+        chunks = [
+            RetrievedChunk(text=f"text {n}", score=0.9 - n / 100, library="ibc_wa_docs",
+                           source_file="ibc.pdf", page_number=n, chunk_id=f"c{n}")
+            for n in range(3)
+        ]
+        return RetrievalResult(
+            query=query, chunks=chunks, libraries_searched=["ibc_wa_docs", "rcw_chapters"],
+            errors=dict(state.errors),
+        )
+
+    monkeypatch.setattr(search, "retrieve", retrieve)
+    monkeypatch.setattr(search, "_cache", RetrievalCache(8, 60))
+    return state
+
+
+def test_complete_ranking_is_cached(ranked):
+    page = search.search_page("egress width", limit=2)
+    assert [r["id"] for r in page["results"]] == ["ibc_wa_docs:c0", "ibc_wa_docs:c1"]
+    assert page["partial"] is False
+
+    search.search_page("egress width", limit=2, cursor=page["next_cursor"])
+    assert ranked.calls == 1
+
+
+def test_unreachable_library_gives_an_uncached_partial_page(ranked):
+    ranked.errors = {"rcw_chapters": RetrievalUnavailable("node down")}
+
+    assert search.search_page("egress width")["partial"] is True
+    ranked.errors = {}
+    assert search.search_page("egress width")["partial"] is False
+    assert ranked.calls == 2
+
+
+def test_filter_rejected_at_query_time_is_a_search_error(ranked):
+    ranked.errors = {"rcw_chapters": ValueError("Expected operand value to be an list for operator $in")}
+
+    with pytest.raises(SearchError, match=r"rcw_chapters: .*\$in"):
+        search.search_page("egress width", where={"page_number": {"$in": [1, 2]}})
+    ranked.errors = {}
+    search.search_page("egress width", where={"page_number": {"$in": [1, 2]}})
+    assert ranked.calls == 2
@@ -0,0 +1,51 @@
+"""get_next_session_id: persisted counter, seeded from the log and its archives."""
+
+import gzip
+import json
+import multiprocessing
+
+import pytest
+
+from src.core import session_logger
+
+
+@pytest.fixture
+def logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_logger, "LOGS_DIR", tmp_path)
+    monkeypatch.setattr(session_logger, "LOG_FILE", tmp_path / "sessions.jsonl")
+    monkeypatch.setattr(session_logger, "COUNTER_FILE", tmp_path / "session_counter")
+    monkeypatch.setattr(session_logger, "COUNTER_LOCK", tmp_path / "session_counter.lock")
+    return tmp_path
+
+
+def _lines(*ids):
+    return "".join(json.dumps({"session_id": sid}) + "\n" for sid in ids)
+
+
+def test_counter_is_seeded_from_log_and_archives(logs):
+    (logs / "sessions.jsonl").write_text(_lines(3, "web-7", 5), encoding="utf-8")
+    with gzip.open(logs / "sessions.20260101T000000Z.jsonl.gz", "wt", encoding="utf-8") as f:
+        f.write(_lines(41, 2))
+
+    assert session_logger.get_next_session_id() == 42
+    assert session_logger.get_next_session_id() == 43
+    assert (logs / "session_counter").read_text(encoding="utf-8") == "43"
+    assert not list(logs.glob("*.tmp"))
+
+
+def _reserve(n, out):
+    out.put([session_logger.get_next_session_id() for _ in range(n)])
+
+
+@pytest.mark.skipif(session_logger.fcntl is None, reason="needs fcntl")
+def test_workers_never_reuse_an_id(logs):
+    ctx = multiprocessing.get_context("fork")
+    out = ctx.Queue()
+    workers = [ctx.Process(target=_reserve, args=(25, out)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    ids = [sid for _ in workers for sid in out.get(timeout=30)]
+    for w in workers:
+        w.join()
+
+    assert sorted(ids) == list(range(1, 101))
@@ -0,0 +1,93 @@
+"""Session store: LRU eviction from memory and reload from the backend."""
+
+import pytest
+
+from src.core.session_store import SessionStore
+from src.core.shared_state import MemoryState, SQLiteState
+
+
+def _store(backend, max_resident=2, write_through=False):
+    return SessionStore(
+        backend, max_resident=max_resident, idle_ttl=3600, flush_interval=3600,
+        retention_days=0, write_through=write_through,
+    )
+
+
+@pytest.fixture
+def store():
+    store = _store(MemoryState())
+    yield store
+    store.close()
+
+
+def _chat(store, session_id, text):
+    state = store.get(session_id)
+    state["conversation_history"].append({"role": "user", "content": text})
+    store.save(session_id, state)
+    return state
+
+
+def test_least_recently_used_session_is_evicted(store):
+    store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+
+    assert len(store) == 2
+    assert store.evicted_total == 1
+    assert store.memory_report()["resident"] == 2
+    assert {s["session_id"] for s in store.memory_report()["largest"]} == {"a", "c"}
+
+
+def test_evicted_session_is_reloaded_after_flush(store):
+    _chat(store, "a", "first question")
+    store.flush()
+    store.get("b")
+    store.get("c")  # evicts a
+
+    assert store.get("a")["conversation_history"] == [{"role": "user", "content": "first question"}]
+
+
+def test_unflushed_changes_survive_eviction(store):
+    _chat(store, "a", "not yet written")
+    store.get("b")
+    store.get("c")  # a is evicted before the write-behind ran
+
+    assert store.get("a")["conversation_history"][0]["content"] == "not yet written"
+    store.flush()
+    assert store.memory_report()["pending_writes"] == 0
+
+
+def test_peek_does_not_create_sessions(store):
+    assert store.peek("unknown") is None
+    assert len(store) == 0
+    assert store.get("unknown")["conversation_history"] == []
+
+
+def test_sessions_persist_across_restarts(tmp_path):
+    backend = SQLiteState(str(tmp_path / "state.db"))
+    first = _store(backend)
+    _chat(first, "a", "before restart")
+    first.close()
+
+    second = _store(backend)
+    try:
+        assert second.get("a")["conversation_history"][0]["content"] == "before restart"
+    finally:
+        second.close()
+        backend.close()
+
+
+def test_write_through_stores_see_each_others_saves(tmp_path):
+    # Two workers sharing one SQLite file
+    one = _store(SQLiteState(str(tmp_path / "state.db")), write_through=True)
+    two = _store(SQLiteState(str(tmp_path / "state.db")), write_through=True)
+    try:
+        _chat(one, "a", "turn 1")
+        assert len(two.get("a")["conversation_history"]) == 1
+        _chat(two, "a", "turn 2")
+        assert [m["content"] for m in one.get("a")["conversation_history"]] == ["turn 1", "turn 2"]
+    finally:
+        for store in (one, two):
+            store.close()
+            store.backend.close()
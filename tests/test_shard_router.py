@@ -0,0 +1,42 @@
+"""merge_results: global top-n of several retrieval nodes' Chroma results."""
+
+from src.core.shard_router import merge_results
+
+
+def _result(rows):
+    """Chroma-style result from rows of (id, distance)."""
+    return {
+        "ids": [[chunk_id for chunk_id, _ in row] for row in rows],
+        "distances": [[dist for _, dist in row] for row in rows],
+        "documents": [[f"text of {chunk_id}" for chunk_id, _ in row] for row in rows],
+        "metadatas": [[{"chunk": chunk_id} for chunk_id, _ in row] for row in rows],
+    }
+
+
+def test_merges_each_query_row_by_distance():
+    node_a = _result([[("a1", 0.10), ("a2", 0.40)], [("a3", 0.30)]])
+    node_b = _result([[("b1", 0.20), ("b2", 0.30)], [("b3", 0.05), ("b4", 0.50)]])
+
+    merged = merge_results([node_a, node_b], n_results=3)
+
+    assert merged["ids"] == [["a1", "b1", "b2"], ["b3", "a3", "b4"]]
+    assert merged["distances"] == [[0.10, 0.20, 0.30], [0.05, 0.30, 0.50]]
+
+
+def test_fields_stay_aligned_with_their_ids():
+    merged = merge_results([_result([[("x", 0.3)]]), _result([[("y", 0.1)]])], n_results=2)
+
+    assert merged["documents"] == [["text of y", "text of x"]]
+    assert merged["metadatas"] == [[{"chunk": "y"}, {"chunk": "x"}]]
+
+
+def test_fewer_candidates_than_n_results():
+    merged = merge_results([_result([[("a", 0.2)]]), _result([[]])], n_results=10)
+
+    assert merged["ids"] == [["a"]]
+
+
+def test_single_node_is_trimmed_to_n_results():
+    merged = merge_results([_result([[("a", 0.1), ("b", 0.2), ("c", 0.3)]])], n_results=2)
+
+    assert merged["ids"] == [["a", "b"]]
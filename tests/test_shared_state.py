@@ -0,0 +1,92 @@
+"""GCRA token bucket (take_token) and the rate-limit hit() of both backends."""
+
+import pytest
+
+from src.core.shared_state import MemoryState, SQLiteState, take_token
+
+LIMIT, WINDOW = 10, 60.0
+INTERVAL = WINDOW / LIMIT
+
+
+def _take(full_at, now, times, cost=1):
+    results = []
+    for _ in range(times):
+        allowed, full_at = take_token(full_at, now, LIMIT, WINDOW, cost)
+        results.append(allowed)
+    return results, full_at
+
+
+def test_full_bucket_allows_a_burst_of_limit():
+    results, full_at = _take(0.0, 100.0, LIMIT + 1)
+
+    assert results == [True] * LIMIT + [False]
+    assert full_at == pytest.approx(100.0 + WINDOW)
+
+
+def test_one_token_refills_per_interval():
+    _, full_at = _take(0.0, 100.0, LIMIT)
+
+    assert take_token(full_at, 100.0 + INTERVAL * 0.9, LIMIT, WINDOW)[0] is False
+    assert take_token(full_at, 100.0 + INTERVAL, LIMIT, WINDOW)[0] is True
+
+
+def test_bucket_in_the_past_is_full():
+    results, _ = _take(50.0, 1000.0, LIMIT + 1)
+
+    assert results.count(True) == LIMIT
+
+
+def test_refused_take_leaves_the_bucket_unchanged():
+    _, full_at = _take(0.0, 100.0, LIMIT - 3)
+
+    allowed, after = take_token(full_at, 100.0, LIMIT, WINDOW, cost=5)
+    assert (allowed, after) == (False, full_at)
+    assert take_token(full_at, 100.0, LIMIT, WINDOW, cost=3)[0] is True
+
+
+def test_cost_above_limit_is_never_allowed():
+    assert take_token(0.0, 100.0, LIMIT, WINDOW, cost=LIMIT + 1)[0] is False
+    assert take_token(0.0, 100.0, LIMIT, WINDOW, cost=LIMIT)[0] is True
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state(request, tmp_path):
+    backend = MemoryState() if request.param == "memory" else SQLiteState(str(tmp_path / "state.db"))
+    yield backend
+    backend.close()
+
+
+def test_hit_charges_a_batch_all_or_nothing(state):
+    assert state.hit("rate:search:1.2.3.4", 60, 60, cost=50) is True
+    assert state.hit("rate:search:1.2.3.4", 60, 60, cost=20) is False
+    assert state.hit("rate:search:1.2.3.4", 60, 60, cost=10) is True
+    assert state.hit("rate:search:1.2.3.4", 60, 60) is False
+
+
+def test_hit_buckets_are_per_key(state):
+    assert all(state.hit("rate:chat:a", 3, 60) for _ in range(3))
+    assert state.hit("rate:chat:a", 3, 60) is False
+    assert state.hit("rate:chat:b", 3, 60) is True
+
+
+def test_memory_state_bounds_tracked_keys():
+    state = MemoryState(max_rate_keys=3)
+    for n in range(5):
+        state.hit(f"rate:chat:{n}", 10, 60)
+
+    assert state.rate_keys == 3
+    assert state.rate_keys_evicted == 2
+
+
+def test_sqlite_state_bounds_stored_keys(tmp_path):
+    state = SQLiteState(str(tmp_path / "state.db"), max_rate_keys=3)
+    for _ in range(5):
+        state.hit("rate:chat:busy", 10, 60)
+    for n in range(5):
+        state.hit(f"rate:chat:{n}", 10, 60)
+
+    assert state.rate_keys == 3
+    assert state.rate_keys_evicted == 3
+    # The nearest-to-full buckets go first; the busy client keeps its bucket
+    assert state.hit("rate:chat:busy", 10, 60, cost=6) is False
+    state.close()
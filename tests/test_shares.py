@@ -0,0 +1,166 @@
+"""Shares repository: migration from the plain-JSON layouts, round trips and the body cache."""
+
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from src.core.shares import (
+    _CREATE_SHARES_TABLE,
+    SharesRepository,
+    ShareExpired,
+    encode_conversation,
+)
+
+HISTORY = [{"role": "user", "content": "Egress width?"}, {"role": "assistant", "content": "44 in."}]
+
+# Layouts written by earlier versions of main.py
+_PLAIN_JSON = """
+    CREATE TABLE shared_conversations (
+        share_id          TEXT PRIMARY KEY,
+        created_at        TEXT NOT NULL,
+        expires_at        TEXT{not_null},
+        title             TEXT NOT NULL,
+        conversation_json TEXT NOT NULL,
+        message_count     INTEGER NOT NULL
+    )
+"""
+
+
+def _legacy_db(path, rows, expiry_not_null=False):
+    conn = sqlite3.connect(str(path))
+    conn.execute(_PLAIN_JSON.format(not_null=" NOT NULL" if expiry_not_null else ""))
+    conn.executemany(
+        "INSERT INTO shared_conversations VALUES (?, ?, ?, ?, ?, ?)",
+        [(sid, "2025-01-01T00:00:00+00:00", expires, "Title " + sid, json.dumps(HISTORY), len(HISTORY))
+         for sid, expires in rows],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _repo(path, revalidate=False):
+    repo = SharesRepository(str(path), pool_size=2, cache_max_bytes=1 << 20, revalidate=revalidate)
+    repo.init_db()
+    return repo
+
+
+def _tables(path):
+    conn = sqlite3.connect(str(path))
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+
+
+def test_migrates_plain_json_rows(tmp_path):
+    path = tmp_path / "shares.db"
+    _legacy_db(path, [("a", None), ("b", "2999-01-01T00:00:00+00:00")])
+    repo = _repo(path)
+
+    body = json.loads(repo.get("a").body)
+    assert body == {"title": "Title a", "conversation": HISTORY, "created_at": "2025-01-01T00:00:00+00:00"}
+    assert repo.get("b").expires_at == "2999-01-01T00:00:00+00:00"
+    assert _tables(path) == {"shared_conversations"}
+    repo.close()
+
+
+def test_expired_legacy_row_is_reported(tmp_path):
+    path = tmp_path / "shares.db"
+    _legacy_db(path, [("old", "2000-01-01T00:00:00+00:00")])
+    repo = _repo(path)
+
+    with pytest.raises(ShareExpired):
+        repo.get("old")
+    repo.close()
+
+
+def test_not_null_expiry_layout_drops_expiry(tmp_path):
+    # Shares from the NOT NULL layout expired after 30 days; they are kept forever now
+    path = tmp_path / "shares.db"
+    _legacy_db(path, [("a", "2000-01-01T00:00:00+00:00")], expiry_not_null=True)
+    repo = _repo(path)
+
+    share = repo.get("a")
+    assert share.expires_at is None
+    assert json.loads(share.body)["conversation"] == HISTORY
+    repo.close()
+
+
+def test_init_is_idempotent(tmp_path):
+    path = tmp_path / "shares.db"
+    _legacy_db(path, [("a", None)])
+    _repo(path).close()
+    repo = _repo(path)
+
+    assert json.loads(repo.get("a").body)["conversation"] == HISTORY
+    repo.close()
+
+
+def test_resumes_an_interrupted_migration(tmp_path):
+    # Left by an earlier version that stopped between the rename and the copy;
+    # a share saved since then wins over its old copy
+    path = tmp_path / "shares.db"
+    _legacy_db(path, [("a", None), ("b", None)])
+    conn = sqlite3.connect(str(path))
+    conn.execute("ALTER TABLE shared_conversations RENAME TO _shares_old")
+    conn.execute(_CREATE_SHARES_TABLE)
+    conn.execute(
+        "INSERT INTO shared_conversations VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ("b", "2025-02-01T00:00:00+00:00", None, "Saved since", "gzip",
+         encode_conversation(HISTORY[:1], "gzip"), 1),
+    )
+    conn.commit()
+    conn.close()
+
+    repo = _repo(path)
+    assert json.loads(repo.get("a").body)["conversation"] == HISTORY
+    assert json.loads(repo.get("b").body)["title"] == "Saved since"
+    assert _tables(path) == {"shared_conversations"}
+    repo.close()
+
+
+def test_workers_migrate_concurrently(tmp_path):
+    path = tmp_path / "shares.db"
+    _legacy_db(path, [("a", None)])
+    repos = [
+        SharesRepository(str(path), pool_size=1, cache_max_bytes=1 << 20, revalidate=True) for _ in range(4)
+    ]
+    threads = [threading.Thread(target=repo.init_db) for repo in repos]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(json.loads(repo.get("a").body)["conversation"] == HISTORY for repo in repos)
+    assert _tables(path) == {"shared_conversations"}
+    for repo in repos:
+        repo.close()
+
+
+def test_save_get_and_cache(tmp_path):
+    repo = _repo(tmp_path / "shares.db")
+    repo.save("s1", "Stairs", HISTORY)
+
+    first = repo.get("s1")
+    second = repo.get("s1")
+    assert second is first
+    assert repo.stats()["hits"] == 1
+    assert repo.get("missing") is None
+
+    repo.save("s1", "Stairs", HISTORY[:1])  # replacing a share drops its cached body
+    assert json.loads(repo.get("s1").body)["conversation"] == HISTORY[:1]
+    repo.close()
+
+
+def test_revalidation_sees_another_workers_write(tmp_path):
+    path = tmp_path / "shares.db"
+    one, two = _repo(path, revalidate=True), _repo(path, revalidate=True)
+    one.save("s1", "Stairs", HISTORY)
+    assert json.loads(two.get("s1").body)["conversation"] == HISTORY
+
+    one.save("s1", "Stairs", HISTORY[:1])
+    assert json.loads(two.get("s1").body)["conversation"] == HISTORY[:1]
+    one.close()
+    two.close()
@@ -0,0 +1,158 @@
+"""SSE encoding: token coalescing by window and byte budget, ordering and source cleanup."""
+
+import asyncio
+import json
+
+import pytest
+
+from src.app.sse import _MAX_PENDING, encode_event, sse_stream
+
+
+class Source:
+    """Async event source that sleeps `pauses[i]` seconds before event i."""
+
+    def __init__(self, events, pauses=None, error=None):
+        self.events = events
+        self.pauses = pauses or {}
+        self.error = error
+        self.closed = False
+
+    async def _gen(self):
+        try:
+            for i, event in enumerate(self.events):
+                if i in self.pauses:
+                    await asyncio.sleep(self.pauses[i])
+                yield event
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.closed = True
+
+    def __call__(self):
+        return self._gen()
+
+
+def _tok(text):
+    return {"type": "token", "data": text}
+
+
+def _collect(source, **kwargs):
+    async def run():
+        return [json.loads(frame[len("data: "):]) async for frame in sse_stream(source(), **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_encode_event_is_compact_utf8():
+    assert encode_event({"type": "token", "data": "§ 1"}) == 'data: {"type":"token","data":"§ 1"}\n\n'
+
+
+def test_no_window_passes_events_through():
+    source = Source([_tok("a"), _tok("b"), {"type": "done"}])
+    assert _collect(source) == [_tok("a"), _tok("b"), {"type": "done"}]
+    assert source.closed
+
+
+def test_non_token_event_flushes_buffer_first():
+    source = Source([
+        {"type": "sources", "data": []},
+        _tok("Hel"), _tok("lo"),
+        {"type": "usage", "data": {"output_tokens": 2}},
+        _tok("!"),
+        {"type": "done"},
+    ])
+    frames = _collect(source, window_ms=1000)
+    assert frames == [
+        {"type": "sources", "data": []},
+        _tok("Hello"),
+        {"type": "usage", "data": {"output_tokens": 2}},
+        _tok("!"),
+        {"type": "done"},
+    ]
+
+
+def test_byte_budget_releases_full_frames():
+    source = Source([_tok("ab")] * 5 + [{"type": "done"}])
+    frames = _collect(source, window_ms=1000, max_bytes=4)
+    assert frames == [_tok("abab"), _tok("abab"), _tok("ab"), {"type": "done"}]
+
+
+def test_byte_budget_counts_utf8_bytes():
+    source = Source([_tok("é"), _tok("é"), _tok("x"), {"type": "done"}])
+    frames = _collect(source, window_ms=1000, max_bytes=4)
+    assert frames[0] == _tok("éé")
+
+
+def test_window_expiry_releases_a_frame():
+    source = Source([_tok("a"), _tok("b"), _tok("c"), {"type": "done"}], pauses={2: 0.05})
+    frames = _collect(source, window_ms=10)
+    assert frames == [_tok("ab"), _tok("c"), {"type": "done"}]
+
+
+def test_source_error_raised_after_buffered_tokens():
+    source = Source([_tok("a"), _tok("b")], error=RuntimeError("upstream"))
+
+    async def run():
+        frames = []
+        with pytest.raises(RuntimeError, match="upstream"):
+            async for frame in sse_stream(source(), window_ms=1000):
+                frames.append(frame)
+        return frames
+
+    assert asyncio.run(run()) == [encode_event(_tok("ab"))]
+    assert source.closed
+
+
+def test_closing_the_stream_closes_the_source():
+    source = Source([_tok("a"), {"type": "sources", "data": []}, _tok("b")], pauses={2: 10})
+
+    async def run():
+        stream = sse_stream(source(), window_ms=5)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(run()) == encode_event(_tok("a"))
+    assert source.closed
+
+
+def test_slow_reader_stops_the_pump():
+    pulled = []
+
+    async def source():
+        for n in range(100):
+            pulled.append(n)
+            yield {"type": "sources", "data": n}
+
+    async def run():
+        stream = sse_stream(source(), window_ms=5)
+        frames = [await stream.__anext__()]
+        for _ in range(20):
+            await asyncio.sleep(0)  # The reader stalls; the pump keeps running
+        stalled_at = len(pulled)
+        frames += [frame async for frame in stream]
+        return stalled_at, frames
+
+    stalled_at, frames = asyncio.run(run())
+    assert stalled_at <= _MAX_PENDING + 2
+    assert frames == [encode_event({"type": "sources", "data": n}) for n in range(100)]
+
+
+def test_cancelling_the_reader_propagates_and_closes_the_source():
+    source = Source([_tok("a"), _tok("b")], pauses={1: 10})
+
+    async def run():
+        first = asyncio.Event()
+
+        async def read():
+            async for _ in sse_stream(source(), window_ms=5):
+                first.set()
+
+        task = asyncio.create_task(read())
+        await asyncio.wait_for(first.wait(), 1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert source.closed